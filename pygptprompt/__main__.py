@@ -0,0 +1,17 @@
+"""
+pygptprompt/__main__.py
+"""
+import click
+
+from pygptprompt.cli.serve import main as serve
+
+
+@click.group()
+def cli():
+    """PyGPTPrompt: A Context Window Management System for Automating Prompting with Chat Models."""
+
+
+cli.add_command(serve, name="serve")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,145 @@
+"""
+pygptprompt/cli/benchmark.py
+
+Measure the throughput of concurrent llama.cpp chat completions.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+import click
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelDelta, ChatModelResponse
+from pygptprompt.model.factory import ChatModelFactory
+from pygptprompt.model.llama_cpp_batch import LlamaCppBatchScheduler
+
+
+def run_sessions(
+    complete: Callable[[], ChatModelDelta],
+    count_tokens: Callable[[List[str]], List[int]],
+    n_sessions: int,
+    concurrent: bool,
+) -> Tuple[float, int]:
+    """
+    Run one chat completion per session.
+
+    Args:
+        complete (Callable[[], ChatModelDelta]): Completes the chat of a session, returning its 'finish' event.
+        count_tokens (Callable[[List[str]], List[int]]): Counts the tokens of texts, including BOS.
+        n_sessions (int): The number of sessions.
+        concurrent (bool): Whether the sessions run concurrently or one at a time.
+
+    Returns:
+        Tuple[float, int]: The elapsed seconds and the number of generated tokens.
+
+    Raises:
+        click.ClickException: If a completion failed.
+
+    NOTE:
+        The generated messages are tokenized after the run, so both modes count
+        tokens the same way regardless of how their text was chunked.
+    """
+    start = perf_counter()
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+            futures = [executor.submit(complete) for _ in range(n_sessions)]
+            finishes = [future.result() for future in futures]
+    else:
+        finishes = [complete() for _ in range(n_sessions)]
+    elapsed = perf_counter() - start
+
+    for finish in finishes:
+        if finish["finish_reason"] == "error":
+            raise click.ClickException(finish["message"]["content"])
+    contents = [finish["message"].get("content") or "" for finish in finishes]
+    # NOTE: Every count includes the BOS token.
+    return elapsed, sum(count_tokens(contents)) - len(contents)
+
+
+@click.command()
+@click.argument(
+    "config_path",
+    type=click.Path(exists=True),
+)
+@click.option(
+    "--sessions",
+    "-s",
+    type=click.INT,
+    multiple=True,
+    default=(1, 4, 8, 16),
+    help="The numbers of concurrent sessions to measure.",
+)
+@click.option(
+    "--prompt",
+    type=click.STRING,
+    default="Write a short story about a lighthouse keeper.",
+    help="The user message each session sends.",
+)
+def main(config_path: str, sessions: Tuple[int, ...], prompt: str):
+    """
+    Compare serialized and continuously batched llama.cpp chat completions.
+
+    Each session sends the same system prompt and user message. The serialized
+    baseline completes the sessions one at a time on the interactive model, as
+    the server does with a concurrency of 1. The batched run submits them all to
+    a LlamaCppBatchScheduler with one slot per session.
+    """
+    config = ConfigurationManager(config_path)
+
+    logger: Logger = config.get_logger("general", Path(__file__).stem)
+    logger.info(f"Using Config: {config_path}")
+
+    chat_model = ChatModelFactory(config).create_model("llama_cpp")
+    # NOTE: Neither mode may replay completions of an earlier session or run.
+    chat_model.completion_cache = None
+    messages = [
+        ChatModelResponse(
+            role=config.get_value("llama_cpp.system_prompt.role", "system"),
+            content=config.get_value(
+                "llama_cpp.system_prompt.content", "You are a helpful assistant."
+            ),
+        ),
+        ChatModelResponse(role="user", content=prompt),
+    ]
+
+    def report(n_sessions: int, mode: str, elapsed: float, tokens: int) -> None:
+        click.echo(
+            f"{n_sessions:>8} {mode:>8} {elapsed:>8.2f} {tokens:>7} {tokens / elapsed:>8.1f}"
+        )
+
+    click.echo(f"{'sessions':>8} {'mode':>8} {'seconds':>8} {'tokens':>7} {'tok/s':>8}")
+    for n_sessions in sessions:
+        # NOTE: The interactive model is a single context, so its sessions run one at a time.
+        report(
+            n_sessions,
+            "serial",
+            *run_sessions(
+                lambda: deque(chat_model.stream_chat_completion(messages), 1)[0],
+                chat_model.count_tokens,
+                n_sessions,
+                False,
+            ),
+        )
+
+        scheduler = LlamaCppBatchScheduler(chat_model, n_parallel=n_sessions)
+        try:
+            report(
+                n_sessions,
+                "batched",
+                *run_sessions(
+                    lambda: deque(scheduler.stream_chat_completion(messages), 1)[0],
+                    chat_model.count_tokens,
+                    n_sessions,
+                    True,
+                ),
+            )
+        finally:
+            scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
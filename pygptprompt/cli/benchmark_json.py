@@ -0,0 +1,115 @@
+"""
+pygptprompt/cli/benchmark_json.py
+
+Measure the cost of loading and reading a session saved as JSON.
+"""
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Tuple
+
+import click
+
+from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.model.base import ChatModelResponse
+
+
+def measure(run: Callable[[], Any]) -> Tuple[float, int]:
+    """
+    Measure the time and peak memory of a function.
+
+    Args:
+        run (Callable[[], Any]): The function to measure.
+
+    Returns:
+        Tuple[float, int]: The elapsed seconds and the peak of allocated bytes.
+
+    NOTE:
+        Memory is traced while the function runs, which also slows it down, so
+        compare times with each other rather than with untraced code.
+    """
+    tracemalloc.start()
+    start = perf_counter()
+    result = run()
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def load_copied(file_path: str) -> Any:
+    """Load messages by copying them, as a read through a deep copy of the data did."""
+    template = JSONListTemplate(file_path)
+    template.load_json()
+    return [ChatModelResponse(**message) for message in template.snapshot()]
+
+
+def load_owned(file_path: str) -> Any:
+    """Load messages by taking ownership of the decoded data."""
+    template = JSONListTemplate(file_path)
+    template.load_json()
+    return template.mutable()
+
+
+def read_copied(template: JSONListTemplate) -> int:
+    """Count the characters of every message through a deep copy of the data."""
+    return sum(len(message["content"]) for message in template.snapshot())
+
+
+def read_viewed(template: JSONListTemplate) -> int:
+    """Count the characters of every message through a read-only view."""
+    return sum(len(message["content"]) for message in template.view())
+
+
+@click.command()
+@click.option(
+    "--messages",
+    "-n",
+    type=click.INT,
+    default=100_000,
+    help="The number of messages in the session.",
+)
+@click.option(
+    "--content-length",
+    type=click.INT,
+    default=200,
+    help="The number of characters per message.",
+)
+def main(messages: int, content_length: int):
+    """
+    Compare copying and copy-free loading and reading of a JSON session.
+
+    The copied runs deep-copy the decoded messages, as reading a JSONListTemplate
+    and building its ChatModelResponses did. The copy-free runs take ownership
+    of the decoded messages or read them through a view.
+    """
+    data = [
+        ChatModelResponse(
+            role="user" if i % 2 else "assistant",
+            content=str(i).rjust(content_length, "x"),
+        )
+        for i in range(messages)
+    ]
+
+    with TemporaryDirectory() as directory:
+        file_path = str(Path(directory) / "transcript.json")
+        JSONListTemplate(file_path).save_json(data)
+        del data
+
+        template = JSONListTemplate(file_path)
+        template.load_json()
+
+        def report(operation: str, mode: str, elapsed: float, peak: int) -> None:
+            click.echo(f"{operation:>9} {mode:>9} {elapsed:>8.3f} {peak / 2**20:>8.1f}")
+
+        click.echo(f"{'operation':>9} {'mode':>9} {'seconds':>8} {'peak MiB':>8}")
+        report("load", "copied", *measure(lambda: load_copied(file_path)))
+        report("load", "copy-free", *measure(lambda: load_owned(file_path)))
+        report("read", "copied", *measure(lambda: read_copied(template)))
+        report("read", "copy-free", *measure(lambda: read_viewed(template)))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ from pygptprompt.function.memory import AugmentedMemoryManager
 from pygptprompt.model.base import ChatModel, ChatModelResponse
 from pygptprompt.model.factory import ChatModelFactory
 from pygptprompt.model.sequence.session_manager import SessionManager
+from pygptprompt.prompt.stream import print_chat_completion
+from pygptprompt.storage.semantic_cache import SemanticResponseCache
 
 
 @click.command()
@@ -59,6 +61,11 @@ from pygptprompt.model.sequence.session_manager import SessionManager
     default="llama_cpp",
     help="Specify the model provider ('openai' or 'llama_cpp').",
 )
+@click.option(
+    "--no-semantic-cache",
+    is_flag=True,
+    help="Disable the semantic response cache for this session.",
+)
 def main(
     config_path,
     session,
@@ -66,6 +73,7 @@ def main(
     chat,
     memory,
     provider,
+    no_semantic_cache,
 ):
     if not (bool(input) ^ chat):
         print(
@@ -87,6 +95,13 @@ def main(
     model_factory = ChatModelFactory(config)
     chat_model: ChatModel = model_factory.create_model(provider)
 
+    # NOTE: Near-duplicate questions are answered from the semantic cache.
+    semantic_cache = None
+    stream_chat_completion = chat_model.stream_chat_completion
+    if config.get_value("app.semantic_cache.enabled", False) and not no_semantic_cache:
+        semantic_cache = SemanticResponseCache(config, chat_model)
+        stream_chat_completion = semantic_cache.stream_chat_completion
+
     function_factory = FunctionFactory(config)
     function_manager = FunctionManager(function_factory, config, chat_model)
 
@@ -131,8 +146,8 @@ def main(
             print("assistant")
 
             # And for assistant output:
-            assistant_message = chat_model.get_chat_completion(
-                messages=session_manager.output()
+            assistant_message = print_chat_completion(
+                stream_chat_completion(messages=session_manager.output())
             )
 
             if "function_call" in assistant_message:
@@ -182,8 +197,8 @@ def main(
                 print("assistant")
 
                 # And for assistant output:
-                assistant_message = chat_model.get_chat_completion(
-                    messages=session_manager.output()
+                assistant_message = print_chat_completion(
+                    stream_chat_completion(messages=session_manager.output())
                 )
 
                 if "function_call" in assistant_message:
@@ -202,6 +217,8 @@ def main(
                         f"Chroma Collections: {vector_store.get_collection_count()}"
                     )
                 session_manager.print_token_count()
+                if semantic_cache:
+                    logger.debug(f"Semantic Cache: {semantic_cache.stats()}")
                 # NOTE: We only write messages at the end of a cycle
                 # The context, transcript, and embedding spaces are encapsulated.
                 # The context and transcript are written to JSON.
@@ -212,6 +229,12 @@ def main(
         logger.error(f"Error generating response: {e}")
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        # NOTE: Release the embedding models held by the vector stores.
+        if semantic_cache:
+            semantic_cache.close()
+        if vector_store:
+            vector_store.close()
 
 
 if __name__ == "__main__":
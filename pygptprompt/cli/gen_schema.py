@@ -11,6 +11,7 @@ from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.introspection.schema import generate_function_schema
 from pygptprompt.model.base import ChatModel, ChatModelResponse
 from pygptprompt.model.factory import ChatModelFactory
+from pygptprompt.prompt.stream import print_chat_completion
 
 
 def extract_python_code(completion_response: dict) -> str:
@@ -67,8 +68,9 @@ def main(
     chat_model: ChatModel = model_factory.create_model(provider)
 
     # Generate function description from model
-    completion_response = chat_model.get_chat_completion(messages)
-    print()  # NOTE: Add padding to stdout; Model output is flushed.
+    completion_response = print_chat_completion(
+        chat_model.stream_chat_completion(messages)
+    )
 
     # Render the function
     parsed_code = extract_python_code(completion_response)
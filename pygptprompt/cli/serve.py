@@ -0,0 +1,69 @@
+"""
+pygptprompt/cli/serve.py
+
+Serve OpenAI compatible chat completions and embeddings from models loaded once.
+"""
+from logging import Logger
+from pathlib import Path
+from typing import Dict, Tuple
+
+import click
+from aiohttp import web
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import AsyncChatModel
+from pygptprompt.model.factory import ChatModelFactory
+from pygptprompt.server.app import ChatServer
+
+
+@click.command()
+@click.argument(
+    "config_path",
+    type=click.Path(exists=True),
+)
+@click.option(
+    "--provider",
+    "-p",
+    type=click.STRING,
+    multiple=True,
+    default=("llama_cpp",),
+    help="Specify the model providers to load ('openai' or 'llama_cpp'). The first is the default.",
+)
+@click.option(
+    "--host",
+    type=click.STRING,
+    default=None,
+    help="The host to bind to. Defaults to `server.host` or 127.0.0.1.",
+)
+@click.option(
+    "--port",
+    type=click.INT,
+    default=None,
+    help="The port to bind to. Defaults to `server.port` or 8000.",
+)
+def main(config_path: str, provider: Tuple[str, ...], host: str, port: int):
+    config = ConfigurationManager(config_path)
+
+    logger: Logger = config.get_logger("general", Path(__file__).stem)
+    logger.info(f"Using Config: {config_path}")
+    logger.info(f"Using Providers: {provider}")
+
+    model_factory = ChatModelFactory(config)
+    models: Dict[str, AsyncChatModel] = {
+        name: model_factory.create_async_model(name) for name in provider
+    }
+
+    # NOTE: The first provider is the default unless `server.provider` is set.
+    server = ChatServer(config, models)
+    web.run_app(
+        server.create_app(),
+        host=host or config.get_value("server.host", "127.0.0.1"),
+        port=port or config.get_value("server.port", 8000),
+    )
+
+    for model in models.values():
+        model_factory.release_model(model.model)
+
+
+if __name__ == "__main__":
+    main()
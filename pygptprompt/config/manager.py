@@ -1,6 +1,7 @@
 """
 pygptprompt/config/manager.py
 """
+import copy
 import logging
 import os
 from logging import Logger
@@ -30,7 +31,8 @@ class ConfigurationManager(Singleton):
 
         Args:
             file_path (str): The path to the configuration file.
-            initial_data (Optional[JSONMap], optional): Initial configuration data. Defaults to None.
+            initial_data (Optional[JSONMap], optional): Initial configuration data, used instead of the
+                contents of the file. Defaults to None, which loads the file.
         """
         super(ConfigurationManager, self).__init__()
 
@@ -38,7 +40,33 @@ class ConfigurationManager(Singleton):
         self._map_template = JSONMappingTemplate(
             file_path, initial_data=initial_data, logger=logger
         )
-        self._map_template.load_json()
+        # NOTE: Loading would replace the initial data, e.g. the configuration
+        # of the parent process passed to a worker.
+        if initial_data is None:
+            self._map_template.load_json()
+
+    @property
+    def file_path(self) -> str:
+        """
+        Get the path to the configuration file.
+
+        Returns:
+            str: The path to the configuration file.
+        """
+        return str(self._map_template.file_path)
+
+    def get_data(self) -> JSONMap:
+        """
+        Get a copy of the configuration data.
+
+        Returns:
+            JSONMap: A deep copy of the configuration data, including values set since it was loaded.
+
+        NOTE:
+            Pass the copy with `file_path` as `initial_data` to recreate the
+            configuration elsewhere, e.g. in another process.
+        """
+        return copy.deepcopy(self._map_template.data)
 
     def load(self) -> bool:
         """
@@ -56,7 +84,7 @@ class ConfigurationManager(Singleton):
         Returns:
             bool: True if the data was saved successfully, False otherwise.
         """
-        return self._map_template.save_json(self._map_template.data)
+        return self._map_template.save_json(indent=2)
 
     def backup(self) -> bool:
         """
@@ -77,9 +105,13 @@ class ConfigurationManager(Singleton):
 
         Returns:
             Any: The configuration value corresponding to the key, or the default value if not found.
+
+        NOTE:
+            Only missing or null values fall back to the default, so false and zero values are respected.
         """
         keys = key.split(".")
-        return self._map_template.read_nested(*keys) or default
+        value = self._map_template.read_nested(*keys)
+        return default if value is None else value
 
     def set_value(self, key: str, value: Any) -> bool:
         """
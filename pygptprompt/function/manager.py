@@ -5,6 +5,7 @@ from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.function.factory import FunctionFactory
 from pygptprompt.model.base import ChatModel, ChatModelResponse
 from pygptprompt.model.sequence.session_manager import SessionManager
+from pygptprompt.prompt.stream import print_chat_completion
 
 
 class FunctionManager:
@@ -43,8 +44,8 @@ class FunctionManager:
         session_manager.enqueue(function_result)
 
         # 4. Generate a new prompt to the model based on the updated session state
-        new_message = self.chat_model.get_chat_completion(
-            messages=session_manager.output()
+        new_message = print_chat_completion(
+            self.chat_model.stream_chat_completion(messages=session_manager.output())
         )
         self.logger.debug(f"New message: {new_message}")
         if new_message is None:
@@ -81,7 +82,9 @@ class FunctionManager:
         prompt_message = ChatModelResponse(role="user", content=prompt_template)
         session_manager.enqueue(prompt_message)
 
-        message = self.chat_model.get_chat_completion(messages=session_manager.output())
+        message = print_chat_completion(
+            self.chat_model.stream_chat_completion(messages=session_manager.output())
+        )
 
         if not message:
             return False
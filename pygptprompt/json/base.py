@@ -9,10 +9,14 @@ REFERENCE:
     https://docs.python.org/3/library/exceptions.html
 """
 import json
+import shutil
+from copy import deepcopy
 from logging import Logger
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Protocol, Union
 
+from pygptprompt.json.codec import JSONCodec, get_codec
+from pygptprompt.json.view import view
 from pygptprompt.pattern.logger import get_default_logger
 
 # NOTE:
@@ -23,14 +27,14 @@ JSONList = List[JSONMap]
 JSONData = Union[JSONMap, JSONList]
 
 EncodeError = (
-    TypeError,  # raised by json.dump(s)
+    TypeError,  # raised by json.dump(s) and orjson.dumps
     FileNotFoundError,
     NotADirectoryError,
     PermissionError,
 )
 
 DecodeError = (
-    json.JSONDecodeError,  # raised by json.load(s)
+    json.JSONDecodeError,  # raised by json.load(s) and orjson.loads
     FileNotFoundError,
     NotADirectoryError,
     PermissionError,
@@ -54,6 +58,7 @@ class JSONBaseTemplate(Protocol):
         file_path: str,
         initial_data: Optional[JSONData] = None,
         logger: Optional[Logger] = None,
+        codec: Optional[JSONCodec] = None,
     ):
         """
         Initialize a JSONTemplate instance.
@@ -62,9 +67,11 @@ class JSONBaseTemplate(Protocol):
             file_path (str): The path to the JSON file.
             initial_data (Optional[JSONData]): The initial data. Defaults to None.
             logger (Optional[Logger]): Optional logger for error-handling.
+            codec (Optional[JSONCodec]): The codec to encode and decode with. Defaults to the fastest installed codec.
         """
         self._file_path = Path(file_path)
         self._data: Optional[JSONData] = initial_data
+        self._codec = codec or get_codec()
 
         if logger:
             self._logger = logger
@@ -95,6 +102,38 @@ class JSONBaseTemplate(Protocol):
         """
         return self._data
 
+    def view(self) -> Any:
+        """
+        Get a read-only view of the JSON data, without copying it.
+
+        Returns:
+            Any: A JSONMapView or JSONListView of the data, or None if not loaded.
+        """
+        return view(self._data)
+
+    def snapshot(self) -> Optional[JSONData]:
+        """
+        Get an independent copy of the JSON data.
+
+        Returns:
+            Optional[JSONData]: A deep copy of the data, or None if not loaded.
+        """
+        return deepcopy(self._data)
+
+    def mutable(self) -> Optional[JSONData]:
+        """
+        Get the JSON data for in-place changes.
+
+        Returns:
+            Optional[JSONData]: The data itself, or None if not loaded.
+
+        NOTE:
+            Changes to the returned data change the template. Callers may also
+            take ownership of freshly loaded data, e.g. to use decoded messages
+            as is instead of copying them.
+        """
+        return self._data
+
     def load_json(self) -> bool:
         """
         Load JSON data from the file into the _data attribute.
@@ -103,15 +142,17 @@ class JSONBaseTemplate(Protocol):
             bool: True if the JSON data was loaded successfully, False otherwise.
         """
         try:
-            with self._file_path.open("r") as file:
-                self._data = json.load(file)
+            with self._file_path.open("rb") as file:
+                self._data = self._codec.loads(file.read())
             self._logger.debug(f"JSON successfully loaded from {self._file_path}")
             return True
         except DecodeError as e:
             self._logger.error(f"Error loading JSON from {self._file_path}: {e}")
             return False
 
-    def save_json(self, data: Optional[JSONData] = None, indent: int = 2) -> bool:
+    def save_json(
+        self, data: Optional[JSONData] = None, indent: Optional[int] = None
+    ) -> bool:
         """
         Save JSON data to the file.
 
@@ -119,18 +160,18 @@ class JSONBaseTemplate(Protocol):
 
         Parameters:
             data (Optional[JSONData]): The data to be saved. Defaults to None.
-            indent (int): The indentation level for the JSON output. Defaults to 4.
+            indent (Optional[int]): The indentation level for the JSON output. Defaults to None,
+                i.e. compact output for files which are not edited by hand.
 
         Returns:
             bool: True if the JSON data was saved successfully, False otherwise.
         """
         try:
-            with self._file_path.open("w") as file:
-                if data is not None:
-                    json.dump(data, file, indent=indent)
-                    self._data = data  # Update the _data attribute if data is provided
-                else:
-                    json.dump(self._data, file, indent=indent)
+            encoded = self._codec.dumps(self._data if data is None else data, indent)
+            with self._file_path.open("wb") as file:
+                file.write(encoded)
+            if data is not None:
+                self._data = data  # Update the _data attribute if data is provided
 
             self._logger.debug(f"JSON successfully saved to {self._file_path}")
             return True
@@ -138,25 +179,22 @@ class JSONBaseTemplate(Protocol):
             self._logger.error(f"Error saving JSON to {self._file_path}: {e}")
             return False
 
-    def backup_json(self, indent: int = 2) -> bool:
+    def backup_json(self) -> bool:
         """
         Create a backup of the JSON file.
 
-        Parameters:
-            indent (int): The indentation level for the JSON output. Defaults to 4.
-
         Returns:
             bool: True if successful, False otherwise.
+
+        NOTE:
+            The file is copied byte for byte, without being decoded.
         """
+        backup_path = self._file_path.with_suffix(".backup.json")
         try:
-            backup_path = self._file_path.with_suffix(".backup.json")
-            with self._file_path.open("r") as original_file, backup_path.open(
-                "w"
-            ) as backup_file:
-                json.dump(json.load(original_file), backup_file, indent=indent)
+            shutil.copyfile(self._file_path, backup_path)
             self._logger.debug(f"JSON successfully backed up to {backup_path}")
             return True
-        except JSONError as e:
+        except (JSONError, OSError) as e:
             self._logger.error(f"Error backing up JSON as {backup_path}: {e}")
             return False
 
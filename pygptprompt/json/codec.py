@@ -0,0 +1,220 @@
+"""
+pygptprompt/json/codec.py
+
+Pluggable encoders and decoders for JSON data.
+
+The "orjson" codec is the default when the optional orjson package is
+installed, otherwise the "json" codec of the standard library is used. Both
+encode to UTF-8 bytes and decode bytes or str, so JSON files are read and
+written in binary mode. Output is compact unless an indent is given.
+
+REFERENCE:
+    https://docs.python.org/3/library/json.html
+    https://github.com/ijl/orjson
+"""
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
+
+from pygptprompt.json.view import unwrap
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NOTE: Streamed lists are read in chunks of this many bytes.
+CHUNK_SIZE = 2**16
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _default(value: Any) -> Any:
+    """Encode read-only views as the data they wrap."""
+    data = unwrap(value)
+    if data is value:
+        raise TypeError(
+            f"Object of type {value.__class__.__name__} is not JSON serializable"
+        )
+    return data
+
+
+class JSONCodec:
+    """
+    Encodes and decodes JSON data with the standard library.
+
+    Attributes:
+        name (str): The name the codec is registered as.
+    """
+
+    name = "json"
+
+    def dumps(
+        self, data: Any, indent: Optional[int] = None, sort_keys: bool = False
+    ) -> bytes:
+        """
+        Encode data as JSON.
+
+        Args:
+            data (Any): The data to encode.
+            indent (Optional[int]): The indentation level, or None for compact output.
+            sort_keys (bool): Whether to sort the keys of maps. Defaults to False.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON.
+
+        Raises:
+            TypeError: If the data holds a value which cannot be encoded.
+        """
+        return json.dumps(
+            data,
+            indent=indent,
+            sort_keys=sort_keys,
+            separators=None if indent is not None else (",", ":"),
+            ensure_ascii=False,
+            default=_default,
+        ).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode JSON.
+
+        Args:
+            data (Union[bytes, str]): The JSON to decode.
+
+        Returns:
+            Any: The decoded data.
+
+        Raises:
+            json.JSONDecodeError: If the data is not valid JSON.
+        """
+        return json.loads(data)
+
+    def iter_list(self, file: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+        """
+        Decode the items of a JSON list one at a time.
+
+        Args:
+            file (BinaryIO): The file holding the list, opened in binary mode.
+            chunk_size (int): The number of bytes read at a time.
+
+        Yields:
+            Any: The decoded items of the list.
+
+        Raises:
+            json.JSONDecodeError: If the file does not hold a valid JSON list.
+
+        NOTE:
+            Only the item being decoded and one chunk are held in memory, so a
+            large list can be processed without loading the file as a whole.
+        """
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder("utf-8")()
+        buffer, position, eof = "", 0, False
+        expected = "["
+
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                if eof:
+                    raise json.JSONDecodeError("Unterminated list", buffer, position)
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + text.decode(chunk, eof), 0
+                continue
+
+            char = buffer[position]
+            if expected == "[":
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, position)
+                position, expected = position + 1, "first"
+            elif expected == "," and char in ",]":
+                if char == "]":
+                    return
+                position, expected = position + 1, "item"
+            elif expected == ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            elif expected == "first" and char == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    end = len(buffer)
+                # NOTE: An item ending with the buffer may continue in the next chunk.
+                if end == len(buffer) and not eof:
+                    chunk = file.read(chunk_size)
+                    eof = not chunk
+                    buffer, position = buffer[position:] + text.decode(chunk, eof), 0
+                    continue
+                yield item
+                position, expected = end, ","
+
+
+class ORJSONCodec(JSONCodec):
+    """
+    Encodes and decodes JSON data with orjson.
+
+    NOTE:
+        orjson only supports an indent of 2, so other indents are encoded by
+        the standard library. Lists are streamed by the standard library.
+    """
+
+    name = "orjson"
+
+    def dumps(
+        self, data: Any, indent: Optional[int] = None, sort_keys: bool = False
+    ) -> bytes:
+        if indent not in (None, 2):
+            return super().dumps(data, indent, sort_keys)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=_default, option=option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+CODECS: Dict[str, JSONCodec] = {JSONCodec.name: JSONCodec()}
+
+if orjson is not None:
+    CODECS[ORJSONCodec.name] = ORJSONCodec()
+
+
+def register_codec(codec: JSONCodec) -> None:
+    """
+    Register a codec under its name.
+
+    Args:
+        codec (JSONCodec): The codec.
+    """
+    CODECS[codec.name] = codec
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """
+    Get a registered codec.
+
+    Args:
+        name (Optional[str]): The name of the codec, or None for the fastest installed codec.
+
+    Returns:
+        JSONCodec: The codec.
+
+    Raises:
+        ValueError: If no codec is registered under the name.
+    """
+    if name is None:
+        name = ORJSONCodec.name if ORJSONCodec.name in CODECS else JSONCodec.name
+    if name not in CODECS:
+        raise ValueError(
+            f"Unknown JSON codec '{name}', expected one of {', '.join(CODECS)}"
+        )
+    return CODECS[name]
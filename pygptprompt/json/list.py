@@ -1,11 +1,12 @@
 """
 pygptprompt/json/list.py
 """
-from copy import deepcopy
 from logging import Logger
-from typing import Optional
+from typing import Iterator, Optional
 
 from pygptprompt.json.base import JSONBaseTemplate, JSONList, JSONMap
+from pygptprompt.json.codec import JSONCodec
+from pygptprompt.json.view import JSONListView
 
 
 class JSONListTemplate(JSONBaseTemplate):
@@ -23,6 +24,7 @@ class JSONListTemplate(JSONBaseTemplate):
         file_path: str,
         initial_data: Optional[JSONList] = None,
         logger: Optional[Logger] = None,
+        codec: Optional[JSONCodec] = None,
     ):
         """
         Initializes the JSONListTemplate.
@@ -31,9 +33,18 @@ class JSONListTemplate(JSONBaseTemplate):
             file_path (str): The path to the JSON file that stores the list.
             initial_data (Optional[JSONList]): Optional initial data to populate the list.
             logger (Optional[Logger]): Optional logger for error-handling.
+            codec (Optional[JSONCodec]): The codec to encode and decode with. Defaults to the fastest installed codec.
+
+        NOTE:
+            Only the list of initial data is copied. Its dictionaries are shared
+            with the caller, since the template replaces items rather than
+            changing them.
         """
         super(JSONListTemplate, self).__init__(
-            file_path, deepcopy(initial_data), logger
+            file_path,
+            list(initial_data) if initial_data is not None else None,
+            logger,
+            codec,
         )
 
         if initial_data is None:
@@ -45,9 +56,22 @@ class JSONListTemplate(JSONBaseTemplate):
         return len(self._data)
 
     @property
-    def data(self) -> Optional[JSONList]:
-        """Return a copy of the internal data list or None if empty."""
-        return deepcopy(self._data) if self._data else None
+    def data(self) -> Optional[JSONListView]:
+        """Return a read-only view of the internal data list or None if empty."""
+        return self.view() if self._data else None
+
+    def iter_json(self) -> Iterator[JSONMap]:
+        """
+        Decode the dictionaries of the JSON file one at a time.
+
+        Yields:
+            JSONMap: The dictionaries of the list, without loading it into the internal data list.
+
+        Raises:
+            DecodeError: If the file is missing or does not hold a valid JSON list.
+        """
+        with self._file_path.open("rb") as file:
+            yield from self._codec.iter_list(file)
 
     def append(self, item: JSONMap) -> None:
         """
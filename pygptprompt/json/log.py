@@ -0,0 +1,361 @@
+"""
+pygptprompt/json/log.py
+
+An append-only JSON Lines log of the operations applied to a list.
+
+Each line holds one record:
+    {"op": "append", "message": {...}}
+    {"op": "insert", "index": 0, "message": {...}}
+    {"op": "set", "index": 0, "message": {...}}
+    {"op": "delete", "indices": [1, 2]}
+
+Deletions are tombstones: the deleted elements stay in the log until it is
+compacted into a single "append" record per remaining element.
+"""
+import os
+import threading
+import time
+from logging import Logger
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+from pygptprompt.json.base import DecodeError, EncodeError, JSONList, JSONMap
+from pygptprompt.json.codec import JSONCodec, get_codec
+from pygptprompt.pattern.logger import get_default_logger
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def encode_record(record: JSONMap, codec: Optional[JSONCodec] = None) -> bytes:
+    """
+    Encode a record as a single compact line.
+
+    Args:
+        record (JSONMap): The record.
+        codec (Optional[JSONCodec]): The codec to encode with. Defaults to the fastest installed codec.
+
+    Returns:
+        bytes: The UTF-8 encoded line, including the newline.
+    """
+    return (codec or get_codec()).dumps(record) + b"\n"
+
+
+class JSONListLog:
+    """
+    An append-only JSON Lines log of the operations applied to a list.
+
+    Saving appends the records of the operations since the last save, so the
+    cost of a save grows with the number of new operations rather than the
+    length of the list. Once the log grows past `compact_ratio` times the size
+    of the elements it still holds, it is rewritten in a background thread.
+
+    Args:
+        file_path (str): The path to the log file.
+        fsync (str): When appended records are synced to disk: "always" after every
+            append, "interval" at most every `fsync_interval` seconds, or "never".
+        fsync_interval (float): The seconds between syncs for the "interval" policy.
+        compact_ratio (float): The ratio of the log size to the size of the live elements
+            which triggers a compaction, where 0 disables compaction.
+        compact_min_size (int): The log size in bytes below which the log is never compacted.
+        logger (Optional[Logger]): Optional logger for error-handling.
+        codec (Optional[JSONCodec]): The codec to encode and decode records with.
+
+    NOTE:
+        A crash while appending leaves at most a partial last line, which is
+        discarded on load. Compaction writes a temporary file and atomically
+        replaces the log, so the log is never left half rewritten.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        fsync: str = "always",
+        fsync_interval: float = 1.0,
+        compact_ratio: float = 2.0,
+        compact_min_size: int = 2**16,
+        logger: Optional[Logger] = None,
+        codec: Optional[JSONCodec] = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self._file_path = Path(file_path)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_size = compact_min_size
+        self._codec = codec or get_codec()
+
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = get_default_logger(self.__class__.__name__)
+
+        # NOTE: The encoded size of each live element mirrors the list,
+        # so the live size is known without re-encoding the list.
+        self._sizes: List[int] = []
+        self._live_size = 0
+        self._log_size = 0
+        self._synced = 0.0
+        self._file: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Get the path to the log file.
+
+        Returns:
+            Path: The file path.
+        """
+        return self._file_path
+
+    @property
+    def size(self) -> int:
+        """
+        Get the size of the log.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return self._log_size
+
+    def _apply(self, data: JSONList, record: JSONMap, size: int) -> None:
+        """Apply a record to a list and the sizes of its elements."""
+        op = record["op"]
+        if op == "append":
+            data.append(record["message"])
+        elif op == "insert":
+            data.insert(record["index"], record["message"])
+        elif op == "set":
+            data[record["index"]] = record["message"]
+        elif op == "delete":
+            if not all(0 <= index < len(data) for index in record["indices"]):
+                raise IndexError("tombstone index out of range")
+            for index in sorted(record["indices"], reverse=True):
+                del data[index]
+        else:
+            raise KeyError(op)
+        self._track(record, size)
+
+    def _track(self, record: JSONMap, size: int) -> None:
+        """Apply a record to the sizes of the live elements."""
+        op = record["op"]
+        if op == "append":
+            self._sizes.append(size)
+            self._live_size += size
+        elif op == "insert":
+            self._sizes.insert(record["index"], size)
+            self._live_size += size
+        elif op == "set":
+            self._live_size += size - self._sizes[record["index"]]
+            self._sizes[record["index"]] = size
+        elif op == "delete":
+            for index in sorted(record["indices"], reverse=True):
+                self._live_size -= self._sizes.pop(index)
+
+    def load(self) -> Optional[JSONList]:
+        """
+        Replay the log into a list.
+
+        Returns:
+            Optional[JSONList]: The list, or None if the log is missing or unreadable.
+
+        NOTE:
+            Replay stops at the first incomplete or invalid record, and the
+            log is truncated there so new records follow the valid ones.
+        """
+        self.wait()
+        self.close()
+        data: JSONList = []
+        self._sizes, self._live_size = [], 0
+        offset = 0
+
+        try:
+            with self._file_path.open("rb") as file:
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        self._apply(data, self._codec.loads(line), len(line))
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        self._logger.warning(
+                            f"Discarding the log {self._file_path} after byte {offset}: {e}"
+                        )
+                        break
+                    offset += len(line)
+            if offset < self._file_path.stat().st_size:
+                os.truncate(self._file_path, offset)
+        except DecodeError as e:
+            self._logger.error(f"Error loading log from {self._file_path}: {e}")
+            return None
+
+        self._log_size = offset
+        self._logger.debug(f"Log successfully loaded from {self._file_path}")
+        return data
+
+    def _open(self) -> BinaryIO:
+        """Open the log for appending, creating its directory if necessary."""
+        if self._file is None:
+            self._file_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self._file_path.open("ab")
+        return self._file
+
+    def _sync(self, force: bool = False) -> None:
+        """Flush appended records and sync them according to the fsync policy."""
+        self._file.flush()
+        now = time.monotonic()
+        if (
+            force
+            or self.fsync == "always"
+            or (self.fsync == "interval" and now - self._synced >= self.fsync_interval)
+        ):
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def append(self, records: JSONList, data: JSONList) -> bool:
+        """
+        Append records to the log, compacting it in the background if it is due.
+
+        Args:
+            records (JSONList): The records of the operations since the last append.
+            data (JSONList): The list after the operations, used if the log is compacted.
+
+        Returns:
+            bool: True if the records were appended successfully, False otherwise.
+        """
+        try:
+            with self._lock:
+                lines = [encode_record(record, self._codec) for record in records]
+                file = self._open()
+                file.write(b"".join(lines))
+                self._sync()
+                for record, line in zip(records, lines):
+                    self._track(record, len(line))
+                self._log_size += sum(map(len, lines))
+                offset = self._log_size
+        except EncodeError + (OSError, ValueError) as e:
+            self._logger.error(f"Error appending to log {self._file_path}: {e}")
+            return False
+
+        if self._compaction_due():
+            # NOTE: Elements are replaced rather than mutated, so a shallow copy is a snapshot.
+            self._compaction = threading.Thread(
+                target=self._compact, args=(list(data), offset), daemon=True
+            )
+            self._compaction.start()
+        return True
+
+    def _compaction_due(self) -> bool:
+        """Check whether the log has outgrown the elements it holds."""
+        return (
+            bool(self.compact_ratio)
+            and self._log_size >= self.compact_min_size
+            and self._log_size > self.compact_ratio * self._live_size
+            and not (self._compaction and self._compaction.is_alive())
+        )
+
+    def _compact(self, data: JSONList, offset: int) -> bool:
+        """
+        Rewrite the log as one record per element of a snapshot.
+
+        Args:
+            data (JSONList): The list as of `offset`.
+            offset (int): The size of the log when the snapshot was taken.
+
+        Returns:
+            bool: True if the log was compacted successfully, False otherwise.
+        """
+        try:
+            lines = [
+                encode_record({"op": "append", "message": m}, self._codec) for m in data
+            ]
+        except EncodeError as e:
+            self._logger.error(f"Error compacting log {self._file_path}: {e}")
+            return False
+        return self._rewrite(lines, offset)
+
+    def _rewrite(self, lines: List[bytes], offset: Optional[int]) -> bool:
+        """
+        Atomically replace the log with the given lines.
+
+        Args:
+            lines (List[bytes]): The encoded records of the list as of `offset`.
+            offset (Optional[int]): The size of the log the lines replace, or None to replace all of it.
+
+        Returns:
+            bool: True if the log was replaced successfully, False otherwise.
+
+        NOTE:
+            Records appended after `offset`, e.g. while a background compaction
+            writes its snapshot, are copied after the lines before the log is replaced.
+        """
+        temp_path = self._file_path.with_suffix(".compact.jsonl")
+        try:
+            self._file_path.parent.mkdir(parents=True, exist_ok=True)
+            with temp_path.open("wb") as temp_file:
+                temp_file.write(b"".join(lines))
+                with self._lock:
+                    if self._file is not None:
+                        self._file.flush()
+                    if offset is not None and self._file_path.exists():
+                        with self._file_path.open("rb") as file:
+                            file.seek(offset)
+                            temp_file.write(file.read())
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+                    size = temp_file.tell()
+                    old_size = self._log_size
+                    os.replace(temp_path, self._file_path)
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    self._log_size = size
+        except OSError as e:
+            self._logger.error(f"Error rewriting log {self._file_path}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return False
+
+        self._logger.debug(
+            f"Rewrote log {self._file_path} from {old_size} to {size} bytes"
+        )
+        return True
+
+    def write(self, data: JSONList) -> bool:
+        """
+        Replace the log with one record per element of a list.
+
+        Args:
+            data (JSONList): The list.
+
+        Returns:
+            bool: True if the log was written successfully, False otherwise.
+        """
+        self.wait()
+        try:
+            lines = [
+                encode_record({"op": "append", "message": m}, self._codec) for m in data
+            ]
+        except EncodeError as e:
+            self._logger.error(f"Error writing log {self._file_path}: {e}")
+            return False
+
+        if not self._rewrite(lines, None):
+            return False
+        self._sizes = [len(line) for line in lines]
+        self._live_size = sum(self._sizes)
+        return True
+
+    def wait(self) -> None:
+        """Wait for a background compaction to finish."""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def close(self) -> None:
+        """Sync and close the log file."""
+        if self._file is not None:
+            self._sync(force=True)
+            self._file.close()
+            self._file = None
@@ -5,6 +5,7 @@ from logging import Logger
 from typing import Any, Optional
 
 from pygptprompt.json.base import JSONBaseTemplate, JSONMap
+from pygptprompt.json.codec import JSONCodec
 
 
 class JSONMappingTemplate(JSONBaseTemplate):
@@ -22,6 +23,7 @@ class JSONMappingTemplate(JSONBaseTemplate):
         file_path: str,
         initial_data: Optional[JSONMap] = None,
         logger: Optional[Logger] = None,
+        codec: Optional[JSONCodec] = None,
     ):
         """
         Initializes the JSONMappingTemplate.
@@ -30,8 +32,11 @@ class JSONMappingTemplate(JSONBaseTemplate):
             file_path (str): The path to the JSON file.
             initial_data (Optional[JSONMap]): Optional initial data to populate the mapping.
             logger (Optional[Logger]): Optional logger for error-handling.
+            codec (Optional[JSONCodec]): The codec to encode and decode with. Defaults to the fastest installed codec.
         """
-        super(JSONMappingTemplate, self).__init__(file_path, initial_data, logger)
+        super(JSONMappingTemplate, self).__init__(
+            file_path, initial_data, logger, codec
+        )
 
         if initial_data is None:
             self._data = {}
@@ -0,0 +1,415 @@
+"""
+pygptprompt/json/segments.py
+
+A list of JSON maps stored in fixed-size JSON Lines segments.
+
+The directory holds:
+    index.json: The segment size, length, generation, and metadata of the list.
+    {generation}-{segment}.jsonl: The items of each segment, one per line.
+    {generation}-counts.bin: An unsigned 32 bit integer per item, e.g. its token count.
+
+The index is written last and is the commit point of a save: lines and counts
+beyond its length are discarded on load. Rewriting the whole list writes a new
+generation, and a modified segment is written to a temporary file which then
+replaces it, so a crash leaves the saved items intact.
+"""
+import os
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from copy import deepcopy
+from logging import Logger
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Set, Union
+
+from pygptprompt.json.base import DecodeError, JSONList, JSONMap
+from pygptprompt.json.codec import JSONCodec, get_codec
+from pygptprompt.pattern.logger import get_default_logger
+
+# NOTE: Counts are stored as native unsigned integers, e.g. 4 bytes each.
+COUNT_TYPE = "I"
+COUNT_SIZE = array(COUNT_TYPE).itemsize
+
+
+class JSONSegmentedList(MutableSequence):
+    """
+    A list of JSON maps whose segments are paged in on demand.
+
+    Loading reads only the index and the per-item counts. Segments are read
+    when their items are accessed and at most `cache_size` unmodified segments
+    are kept in memory. Saving appends new items to the last segment and
+    rewrites only modified segments; inserting or deleting items before the
+    end loads and rewrites the whole list.
+
+    Items of a missing, truncated, or undecodable segment are read as copies of
+    `placeholder`, so the list keeps its length, and the segment is rewritten on
+    the next save. Other errors reading a segment are raised.
+
+    Args:
+        directory (str): The directory holding the segments.
+        segment_size (int): The number of items per segment. Defaults to 256.
+        cache_size (int): The number of unmodified segments kept in memory. Defaults to 8.
+        fsync (bool): Sync the segments and index to disk on every save. Defaults to True.
+        logger (Optional[Logger]): Optional logger for error-handling.
+        codec (Optional[JSONCodec]): The codec to encode and decode items with.
+        placeholder (Optional[JSONMap]): Stands in for items which cannot be read. Defaults to an empty map.
+
+    Attributes:
+        metadata (JSONMap): Saved with the index, e.g. to validate the counts.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 256,
+        cache_size: int = 8,
+        fsync: bool = True,
+        logger: Optional[Logger] = None,
+        codec: Optional[JSONCodec] = None,
+        placeholder: Optional[JSONMap] = None,
+    ):
+        self._directory = Path(directory)
+        self.segment_size = max(1, segment_size)
+        self.cache_size = max(1, cache_size)
+        self.fsync = fsync
+        self._codec = codec or get_codec()
+        self.placeholder: JSONMap = placeholder or {}
+        self.metadata: JSONMap = {}
+
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = get_default_logger(self.__class__.__name__)
+
+        self._length = 0
+        self._saved_length = 0
+        self._generation = 0
+        self._pages: "OrderedDict[int, JSONList]" = OrderedDict()
+        self._dirty: Set[int] = set()
+        # NOTE: A list which was never saved, or was modified before its end, is rewritten.
+        self._rewrite = True
+
+    @property
+    def directory(self) -> Path:
+        """
+        Get the directory holding the segments.
+
+        Returns:
+            Path: The directory path.
+        """
+        return self._directory
+
+    @property
+    def loaded_segments(self) -> int:
+        """
+        Get the number of segments held in memory.
+
+        Returns:
+            int: The number of segments.
+        """
+        return len(self._pages)
+
+    def _segment_path(self, segment: int, generation: Optional[int] = None) -> Path:
+        generation = self._generation if generation is None else generation
+        return self._directory / f"{generation}-{segment:06d}.jsonl"
+
+    def _counts_path(self, generation: Optional[int] = None) -> Path:
+        generation = self._generation if generation is None else generation
+        return self._directory / f"{generation}-counts.bin"
+
+    @property
+    def _index_path(self) -> Path:
+        return self._directory / "index.json"
+
+    def _segment_length(self, segment: int) -> int:
+        """Get the number of items in a segment."""
+        return max(
+            0, min(self.segment_size, self._length - segment * self.segment_size)
+        )
+
+    def _pinned(self, segment: int) -> bool:
+        """Check whether a segment holds changes which have not been saved."""
+        return (
+            self._rewrite
+            or segment in self._dirty
+            or (segment + 1) * self.segment_size > self._saved_length
+        )
+
+    def _page(self, segment: int) -> JSONList:
+        """
+        Get the items of a segment, reading it if it is not in memory.
+
+        Args:
+            segment (int): The segment number.
+
+        Returns:
+            JSONList: The items of the segment.
+
+        Raises:
+            OSError: If the segment exists but cannot be read.
+        """
+        if segment in self._pages:
+            self._pages.move_to_end(segment)
+            return self._pages[segment]
+
+        length = self._segment_length(segment)
+        items: JSONList = []
+        # NOTE: Other I/O errors may be transient, so they are raised rather
+        # than replacing the segment on the next save.
+        try:
+            with self._segment_path(segment).open("rb") as file:
+                for _, line in zip(range(length), file):
+                    items.append(self._codec.loads(line))
+        except DecodeError + (FileNotFoundError,) as e:
+            self._logger.error(
+                f"Error reading segment {segment} of {self._directory}: {e}"
+            )
+
+        if len(items) < length:
+            self._logger.error(
+                f"Segment {segment} of {self._directory} is missing {length - len(items)} items"
+            )
+            items.extend(deepcopy(self.placeholder) for _ in range(length - len(items)))
+            # NOTE: Appending to a damaged segment would misplace the new items.
+            self._dirty.add(segment)
+
+        self._pages[segment] = items
+        self._trim()
+        return items
+
+    def _trim(self) -> None:
+        """Evict the least recently used segments which have no unsaved changes."""
+        excess = len(self._pages) - self.cache_size
+        for segment in [s for s in self._pages if not self._pinned(s)]:
+            if excess <= 0:
+                break
+            del self._pages[segment]
+            excess -= 1
+
+    def _index(self, index: int) -> int:
+        """Normalize an index, raising IndexError if it is out of range."""
+        return range(self._length)[index]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[JSONMap, JSONList]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(self._length)[index]]
+        index = self._index(index)
+        return self._page(index // self.segment_size)[index % self.segment_size]
+
+    def __setitem__(self, index: int, value: JSONMap) -> None:
+        if isinstance(index, slice):
+            items = list(self)
+            items[index] = value
+            self.replace(items)
+            return
+        index = self._index(index)
+        segment = index // self.segment_size
+        self._page(segment)[index % self.segment_size] = value
+        if index < self._saved_length:
+            self._dirty.add(segment)
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        items = list(self)
+        del items[index]
+        self.replace(items)
+
+    def __iter__(self) -> Iterator[JSONMap]:
+        for segment in range(-(-self._length // self.segment_size)):
+            yield from self._page(segment)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def insert(self, index: int, value: JSONMap) -> None:
+        if index >= self._length:
+            self.append(value)
+            return
+        items = list(self)
+        items.insert(index, value)
+        self.replace(items)
+
+    def append(self, value: JSONMap) -> None:
+        segment = self._length // self.segment_size
+        if self._length % self.segment_size:
+            self._page(segment).append(value)
+        else:
+            self._pages[segment] = [value]
+        self._length += 1
+
+    def replace(self, items: JSONList) -> None:
+        """
+        Replace the items of the list, which is rewritten on the next save.
+
+        Args:
+            items (JSONList): The items.
+        """
+        self._pages = OrderedDict(
+            (segment, items[start : start + self.segment_size])
+            for segment, start in enumerate(range(0, len(items), self.segment_size))
+        )
+        self._length = len(items)
+        self._dirty.clear()
+        self._rewrite = True
+
+    def load(self) -> Optional[List[int]]:
+        """
+        Load the index and counts, without reading any segments.
+
+        Returns:
+            Optional[List[int]]: The count of each item, or None if the list is missing or unreadable.
+        """
+        try:
+            index = self._codec.loads(self._index_path.read_bytes())
+            length = index["length"]
+            counts = array(COUNT_TYPE)
+            with self._counts_path(index["generation"]).open("rb") as file:
+                counts.fromfile(file, length)
+        except DecodeError + (KeyError, TypeError, EOFError, OSError) as e:
+            self._logger.error(f"Error loading segments from {self._directory}: {e}")
+            return None
+
+        self.segment_size = index["segment_size"]
+        self.metadata = index.get("metadata", {})
+        self._generation = index["generation"]
+        self._length = self._saved_length = length
+        self._pages.clear()
+        self._dirty.clear()
+        self._rewrite = False
+        self._discard_uncommitted()
+        self._logger.debug(f"Segments successfully indexed from {self._directory}")
+        return counts.tolist()
+
+    def _discard_uncommitted(self) -> None:
+        """Truncate lines and counts written after the last committed index."""
+        os.truncate(self._counts_path(), self._length * COUNT_SIZE)
+        segment = self._length // self.segment_size
+        path = self._segment_path(segment)
+        if path.exists():
+            with path.open("rb") as file:
+                size = sum(
+                    len(line)
+                    for _, line in zip(range(self._segment_length(segment)), file)
+                )
+            os.truncate(path, size)
+        self._segment_path(segment + 1).unlink(missing_ok=True)
+
+    def _write(
+        self, path: Path, data: bytes, mode: str = "wb", offset: int = 0
+    ) -> None:
+        """Write bytes to a file, syncing it if required."""
+        with path.open(mode) as file:
+            if offset:
+                file.seek(offset)
+            file.write(data)
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _replace(self, path: Path, data: bytes) -> None:
+        """Write bytes to a temporary file, then replace a file with it."""
+        temp_path = path.with_name(f"{path.name}.tmp")
+        self._write(temp_path, data)
+        os.replace(temp_path, path)
+
+    def _encode(self, items: JSONList) -> bytes:
+        return b"".join(self._codec.dumps(item) + b"\n" for item in items)
+
+    def save(self, counts: Sequence[int], metadata: Optional[JSONMap] = None) -> bool:
+        """
+        Save the changes since the last save.
+
+        Args:
+            counts (Sequence[int]): The count of each item.
+            metadata (Optional[JSONMap]): The metadata to save with the index.
+
+        Returns:
+            bool: True if saving was successful, False on error.
+
+        NOTE:
+            After a failed save, the next save rewrites the whole list.
+        """
+        if metadata is not None:
+            self.metadata = metadata
+
+        generation = self._generation + 1 if self._rewrite else self._generation
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            if self._rewrite:
+                self._save_generation(counts, generation)
+            else:
+                self._save_changes(counts)
+
+            index = {
+                "segment_size": self.segment_size,
+                "length": self._length,
+                "generation": generation,
+                "metadata": self.metadata,
+            }
+            self._replace(self._index_path, self._codec.dumps(index))
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            self._logger.error(f"Error saving segments to {self._directory}: {e}")
+            self._rewrite = True
+            return False
+
+        if self._rewrite:
+            for path in self._directory.glob("*-*"):
+                if not path.name.startswith(f"{generation}-"):
+                    path.unlink(missing_ok=True)
+
+        self._generation = generation
+        self._saved_length = self._length
+        self._dirty.clear()
+        self._rewrite = False
+        self._trim()
+        self._logger.debug(f"Segments successfully saved to {self._directory}")
+        return True
+
+    def _save_generation(self, counts: Sequence[int], generation: int) -> None:
+        """Write every segment and the counts as a new generation."""
+        items = list(self)
+        for segment, start in enumerate(range(0, len(items), self.segment_size)):
+            self._write(
+                self._segment_path(segment, generation),
+                self._encode(items[start : start + self.segment_size]),
+            )
+        self._write(self._counts_path(generation), array(COUNT_TYPE, counts).tobytes())
+
+    def _save_changes(self, counts: Sequence[int]) -> None:
+        """Rewrite the modified segments, then append the new items and counts."""
+        for segment in sorted(self._dirty):
+            self._replace(
+                self._segment_path(segment), self._encode(self._page(segment))
+            )
+            start = segment * self.segment_size
+            stop = min(start + self.segment_size, self._saved_length)
+            self._write(
+                self._counts_path(),
+                array(COUNT_TYPE, counts[start:stop]).tobytes(),
+                mode="r+b",
+                offset=start * COUNT_SIZE,
+            )
+
+        for segment in range(
+            self._saved_length // self.segment_size,
+            -(-self._length // self.segment_size),
+        ):
+            # NOTE: A rewritten segment already holds its new items.
+            if segment in self._dirty:
+                continue
+            offset = max(0, self._saved_length - segment * self.segment_size)
+            self._write(
+                self._segment_path(segment),
+                self._encode(self._page(segment)[offset:]),
+                mode="ab",
+            )
+
+        self._write(
+            self._counts_path(),
+            array(COUNT_TYPE, counts[self._saved_length :]).tobytes(),
+            mode="ab",
+        )
@@ -1,11 +1,12 @@
 """
 pygptprompt/json/utils.py
 """
-import json
 from json import JSONDecodeError
 from pathlib import Path
 from typing import Any, Union
 
+from pygptprompt.json.codec import get_codec
+
 
 def read_json(filepath: Union[str, Path]) -> Any:
     """
@@ -21,8 +22,8 @@ def read_json(filepath: Union[str, Path]) -> Any:
         FileNotFoundError: If the specified file does not exist.
         JSONDecodeError: If there is an error decoding the JSON data.
     """
-    with open(filepath, "r") as file:
-        return json.load(file)
+    with open(filepath, "rb") as file:
+        return get_codec().loads(file.read())
 
 
 def dump_json(filepath: Union[str, Path]) -> str:
@@ -35,8 +36,7 @@ def dump_json(filepath: Union[str, Path]) -> str:
     Returns:
         str: The serialized JSON data in a formatted string.
     """
-    with open(filepath, "r") as file:
-        return json.dumps(json.load(file), indent=4)
+    return get_codec().dumps(read_json(filepath), indent=4).decode("utf-8")
 
 
 def write_json(filepath: Union[str, Path], content: Any) -> None:
@@ -47,8 +47,8 @@ def write_json(filepath: Union[str, Path], content: Any) -> None:
         filepath (Union[str, Path]): The path to the JSON file.
         content (Any): The data to be serialized and written as JSON.
     """
-    with open(filepath, "w") as f:
-        json.dump(content, f)
+    with open(filepath, "wb") as f:
+        f.write(get_codec().dumps(content))
 
 
 def force_read_json(filepath: Union[str, Path], content: Any) -> Any:
@@ -0,0 +1,136 @@
+"""
+pygptprompt/json/view.py
+
+Read-only views of JSON data.
+
+A view wraps the data it is created from instead of copying it, so reading
+through a view costs no more than reading the data itself. Nested maps and
+lists are wrapped as they are accessed, so they are read-only as well.
+Changes made to the underlying data are visible through its views; use
+`snapshot()` for an independent copy.
+"""
+from collections.abc import Mapping, Sequence
+from copy import deepcopy
+from typing import Any, Dict, Iterator, List, Union
+
+# NOTE: The JSON aliases are redefined here, since the templates of
+# pygptprompt.json.base import this module.
+JSONMap = Dict[str, Any]
+JSONList = List[JSONMap]
+
+
+def view(value: Any) -> Any:
+    """
+    Wrap a JSON map or list in a read-only view.
+
+    Args:
+        value (Any): A JSON value.
+
+    Returns:
+        Any: A view of a map or list, or any other value as is.
+    """
+    if isinstance(value, dict):
+        return JSONMapView(value)
+    if isinstance(value, list):
+        return JSONListView(value)
+    return value
+
+
+def unwrap(value: Any) -> Any:
+    """
+    Get the data underlying a view.
+
+    Args:
+        value (Any): A view or JSON value.
+
+    Returns:
+        Any: The data of a view, or any other value as is.
+    """
+    if isinstance(value, (JSONMapView, JSONListView)):
+        return value._data
+    return value
+
+
+class JSONMapView(Mapping):
+    """
+    A read-only view of a JSON map.
+
+    Args:
+        data (JSONMap): The map to view.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: JSONMap):
+        self._data = data
+
+    def __getitem__(self, key: str) -> Any:
+        return view(self._data[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __eq__(self, other: object) -> bool:
+        return self._data == unwrap(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def snapshot(self) -> JSONMap:
+        """
+        Get an independent copy of the map.
+
+        Returns:
+            JSONMap: A deep copy of the map.
+        """
+        return deepcopy(self._data)
+
+
+class JSONListView(Sequence):
+    """
+    A read-only view of a JSON list.
+
+    Args:
+        data (JSONList): The list to view.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: JSONList):
+        self._data = data
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return JSONListView(self._data[index])
+        return view(self._data[index])
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(view, self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        return self._data == unwrap(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def snapshot(self) -> JSONList:
+        """
+        Get an independent copy of the list.
+
+        Returns:
+            JSONList: A deep copy of the list.
+        """
+        return deepcopy(self._data)
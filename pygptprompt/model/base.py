@@ -2,7 +2,22 @@
 pygptprompt/model/base.py
 """
 from abc import ABC, abstractmethod
-from typing import List, Literal, NotRequired, Protocol, Required, TypedDict, Union
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    NotRequired,
+    Optional,
+    Protocol,
+    Required,
+    TypedDict,
+    Union,
+)
 
 # Represents a vector in the chat model,
 # which could be either a list of integers or floats.
@@ -84,14 +99,199 @@ class ChatModelResponse(ChatCompletionMessage):
     user: NotRequired[str]
 
 
+class ChatModelTiming(TypedDict):
+    """
+    Represents the timing of a streamed chat completion.
+
+    Attributes:
+        - first_token: Seconds until the first content token, or None if no content was generated.
+        - total: Seconds until the completion finished.
+        - chunks: The number of chunks received.
+    """
+
+    first_token: Optional[float]
+    total: float
+    chunks: int
+
+
+class ChatModelDelta(TypedDict):
+    """
+    Represents an event yielded while streaming a chat completion.
+
+    Attributes:
+        - type: The type of event. It can be 'content', 'function_call', or 'finish'.
+        - elapsed: Seconds since the completion was requested.
+        - content: The content token, for 'content' events.
+        - function_name: A fragment of the function call name, for 'function_call' events.
+        - function_args: A fragment of the function call arguments, for 'function_call' events.
+        - finish_reason: The reason the completion finished, for 'finish' events.
+        - message: The complete message, for 'finish' events.
+        - timing: The timing of the completion, for 'finish' events.
+    """
+
+    type: Required[Literal["content", "function_call", "finish"]]
+    elapsed: Required[float]
+    content: NotRequired[str]
+    function_name: NotRequired[str]
+    function_args: NotRequired[str]
+    finish_reason: NotRequired[Optional[str]]
+    message: NotRequired[ChatModelResponse]
+    timing: NotRequired[ChatModelTiming]
+
+
+class ChatCompletionAccumulator:
+    """
+    Converts chat completion chunks into delta events while accumulating the message.
+
+    Args:
+        handle_finish_reason (Callable[[Optional[str], str, str, str], ChatModelResponse]):
+            Creates the complete message from the finish reason, function call name,
+            function call arguments, and content.
+
+    Attributes:
+        finish_reason (Optional[str]): The finish reason, once a chunk has given one.
+
+    NOTE:
+        Content and arguments are buffered as lists of fragments and joined
+        once, avoiding quadratic string concatenation on long outputs.
+    """
+
+    def __init__(
+        self,
+        handle_finish_reason: Callable[
+            [Optional[str], str, str, str], ChatModelResponse
+        ],
+    ):
+        self._handle_finish_reason = handle_finish_reason
+        self._start = perf_counter()
+        self._first_token: Optional[float] = None
+        self._chunks = 0
+        self._content: List[str] = []
+        self._function_call_name = ""
+        self._function_call_args: List[str] = []
+        self.finish_reason: Optional[str] = None
+
+    def update(self, chunk: Dict[str, Any]) -> List[ChatModelDelta]:
+        """
+        Accumulate a chunk.
+
+        Args:
+            chunk (Dict[str, Any]): A chat completion chunk.
+
+        Returns:
+            List[ChatModelDelta]: The content and function call events within the chunk.
+        """
+        self._chunks += 1
+        choice = chunk["choices"][0]
+        delta = choice["delta"] or {}
+        elapsed = perf_counter() - self._start
+        deltas = []
+
+        token = delta.get("content")
+        if token:
+            if self._first_token is None:
+                self._first_token = elapsed
+            self._content.append(token)
+            deltas.append(
+                ChatModelDelta(type="content", elapsed=elapsed, content=token)
+            )
+
+        function_call = delta.get("function_call")
+        if function_call:
+            name = function_call.get("name") or ""
+            arguments = str(function_call.get("arguments") or "")
+            if not self._function_call_name:
+                self._function_call_name = name
+            self._function_call_args.append(arguments)
+            deltas.append(
+                ChatModelDelta(
+                    type="function_call",
+                    elapsed=elapsed,
+                    function_name=name,
+                    function_args=arguments,
+                )
+            )
+
+        self.finish_reason = choice["finish_reason"]
+        return deltas
+
+    def finish(self) -> ChatModelDelta:
+        """
+        Create the 'finish' event holding the complete message and timing.
+
+        Returns:
+            ChatModelDelta: The 'finish' event.
+        """
+        total = perf_counter() - self._start
+        return ChatModelDelta(
+            type="finish",
+            elapsed=total,
+            finish_reason=self.finish_reason,
+            message=self._handle_finish_reason(
+                self.finish_reason,
+                self._function_call_name,
+                "".join(self._function_call_args),
+                "".join(self._content),
+            ),
+            timing=ChatModelTiming(
+                first_token=self._first_token,
+                total=total,
+                chunks=self._chunks,
+            ),
+        )
+
+
+def replay_chat_completion(
+    message: ChatModelResponse, finish_reason: Optional[str], start: float
+) -> Iterator[ChatModelDelta]:
+    """
+    Replay a stored chat completion as delta events.
+
+    Args:
+        message (ChatModelResponse): The stored message.
+        finish_reason (Optional[str]): The stored finish reason.
+        start (float): The `perf_counter` time the completion was requested.
+
+    Returns:
+        Iterator[ChatModelDelta]: The whole content and function call as single events,
+            followed by the 'finish' event holding the message.
+    """
+    elapsed = perf_counter() - start
+    if message.get("content"):
+        yield ChatModelDelta(
+            type="content", elapsed=elapsed, content=message["content"]
+        )
+    if message.get("function_call"):
+        yield ChatModelDelta(
+            type="function_call",
+            elapsed=elapsed,
+            function_name=message["function_call"]["name"],
+            function_args=message["function_call"].get("arguments", ""),
+        )
+    yield ChatModelDelta(
+        type="finish",
+        elapsed=elapsed,
+        finish_reason=finish_reason,
+        message=message,
+        timing=ChatModelTiming(
+            first_token=elapsed if message.get("content") else None,
+            total=elapsed,
+            chunks=0,
+        ),
+    )
+
+
 class ChatModel(ABC):
     """
     Abstract base class for a ChatModel.
 
     Attributes:
         config (ConfigurationManager): The configuration template for the model.
+        completion_cache (Optional[CompletionCache]): The cache of deterministic completions, if enabled.
     """
 
+    completion_cache: Optional[Any] = None
+
     @abstractmethod
     def __init__(self, config: object):
         """
@@ -102,6 +302,60 @@ class ChatModel(ABC):
         """
         raise NotImplementedError
 
+    @property
+    def model_id(self) -> str:
+        """
+        Get an identifier for the model used to encode text.
+
+        Returns:
+            str: The model identifier. Defaults to the class name.
+        """
+        return self.__class__.__name__
+
+    @property
+    def resident_size(self) -> int:
+        """
+        Get the estimated memory held by the loaded model.
+
+        Returns:
+            int: The resident size in bytes. Defaults to 0 for hosted models.
+        """
+        return 0
+
+    def save_context_state(self, file_path: str, fingerprint: str) -> bool:
+        """
+        Save the model's evaluated context state to a file.
+
+        Args:
+            file_path (str): The path to the state file.
+            fingerprint (str): A digest identifying the conversation the state belongs to.
+
+        Returns:
+            bool: True if the state was saved, False if saving is unsupported or failed.
+        """
+        return False
+
+    def load_context_state(self, file_path: str, fingerprint: str) -> bool:
+        """
+        Restore the model's evaluated context state from a file.
+
+        Args:
+            file_path (str): The path to the state file.
+            fingerprint (str): A digest identifying the conversation the state must belong to.
+
+        Returns:
+            bool: True if the state was restored, False if it is unsupported, stale, or failed to load.
+        """
+        return False
+
+    def close(self) -> None:
+        """
+        Release the memory held by the loaded model.
+
+        NOTE:
+            The model must not be used once it is closed. Defaults to a no-op for hosted models.
+        """
+
     @abstractmethod
     def get_completion(self, prompt: str) -> ChatModelTextCompletion:
         """
@@ -119,6 +373,154 @@ class ChatModel(ABC):
         raise NotImplementedError
 
     @abstractmethod
+    def stream_chat_completion(
+        self,
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[ChatModelDelta]:
+        """
+        Stream a text completion for a conversation based on the provided messages.
+
+        Args:
+            messages (List[ChatModelResponse]): The list of ChatModelResponse objects representing the conversation.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
+
+        Returns:
+            Iterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
+
+        NOTE:
+            Rendering is left to the caller; the model never writes to stdout.
+        """
+        raise NotImplementedError
+
+    def _handle_finish_reason(
+        self,
+        finish_reason: Optional[str],
+        function_call_name: str,
+        function_call_args: str,
+        content: str,
+    ) -> ChatModelResponse:
+        """
+        Create the complete message for the given finish reason.
+
+        Args:
+            finish_reason (Optional[str]): The finish reason from the response.
+            function_call_name (str): The function call name.
+            function_call_args (str): The function call arguments.
+            content (str): The generated content.
+
+        Returns:
+            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+
+        Raises:
+            ValueError: If the finish reason is unexpected.
+        """
+        if finish_reason == "function_call":
+            return ChatModelResponse(
+                role="assistant",
+                content=None,
+                function_call=FunctionCall(
+                    name=function_call_name,
+                    arguments=function_call_args,
+                ),
+            )
+        # NOTE: A missing finish reason is a bug upstream, but content is always generated.
+        if finish_reason in ("stop", "length", None):
+            return ChatModelResponse(role="assistant", content=content)
+        raise ValueError(f"Warning: Unexpected finish_reason '{finish_reason}'")
+
+    def _stream_chat_completion(
+        self, response_generator: Iterator[Any]
+    ) -> Iterator[ChatModelDelta]:
+        """
+        Convert a stream of chat completion chunks into delta events.
+
+        Args:
+            response_generator (Iterator[Any]): An iterator of chat completion chunks.
+
+        Returns:
+            Iterator[ChatModelDelta]: The delta events, ending with a 'finish' event.
+        """
+        accumulator = ChatCompletionAccumulator(self._handle_finish_reason)
+
+        for chunk in response_generator:
+            yield from accumulator.update(chunk)
+            if accumulator.finish_reason:
+                break
+
+        if not accumulator.finish_reason:
+            self.logger.debug("Stream ended without a finish_reason.")
+
+        yield accumulator.finish()
+
+    def _error_delta(self, error: Exception) -> ChatModelDelta:
+        """
+        Create the 'finish' event for a completion that failed.
+
+        Args:
+            error (Exception): The error raised while generating the completion.
+
+        Returns:
+            ChatModelDelta: A 'finish' event whose message content is the error.
+        """
+        self.logger.error(f"Error generating chat completions: {error}")
+        return ChatModelDelta(
+            type="finish",
+            elapsed=0.0,
+            finish_reason="error",
+            message=ChatModelResponse(role="assistant", content=str(error)),
+        )
+
+    def _cached_chat_completion(
+        self,
+        params: Dict[str, Any],
+        generate: Callable[[], Iterator[ChatModelDelta]],
+    ) -> Iterator[ChatModelDelta]:
+        """
+        Stream a chat completion, replaying it from the completion cache when possible.
+
+        Args:
+            params (Dict[str, Any]): Everything determining the completion: the messages,
+                function definitions, and sampling parameters.
+            generate (Callable[[], Iterator[ChatModelDelta]]): Streams the completion from the model.
+
+        Returns:
+            Iterator[ChatModelDelta]: The content and function call events, followed by
+                a single 'finish' event holding the complete message.
+
+        NOTE:
+            Only completions sampled at a temperature of 0 are cached. A hit yields
+            the whole content as a single event, so callers render it as usual.
+        """
+        if self.completion_cache is None or params.get("temperature") != 0:
+            yield from generate()
+            return
+
+        start = perf_counter()
+        key = self.completion_cache.make_key(
+            self.__class__.__name__, self.model_id, params
+        )
+        cached = self.completion_cache.get(key)
+
+        if cached is None:
+            for delta in generate():
+                if delta["type"] == "finish" and delta["finish_reason"] != "error":
+                    self.completion_cache.put(
+                        key,
+                        {
+                            "finish_reason": delta["finish_reason"],
+                            "message": delta["message"],
+                        },
+                    )
+                yield delta
+            return
+
+        yield from replay_chat_completion(
+            cached["message"], cached["finish_reason"], start
+        )
+
     def get_chat_completion(
         self, messages: List[ChatModelResponse]
     ) -> ChatModelResponse:
@@ -130,8 +532,15 @@ class ChatModel(ABC):
 
         Returns:
             ChatModelResponse (Dict[LiteralString, str]): The text completion for the conversation.
+
+        Raises:
+            ValueError: If the 'messages' argument is empty or None.
         """
-        raise NotImplementedError
+        message = None
+        for delta in self.stream_chat_completion(messages):
+            if delta["type"] == "finish":
+                message = delta["message"]
+        return message
 
     @abstractmethod
     def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
@@ -159,15 +568,141 @@ class ChatModel(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def get_encodings(self, texts: List[str]) -> List[ChatModelEncoding]:
+        """
+        Get the encodings for a batch of texts.
+
+        Args:
+            texts (List[str]): The strings of text to encode.
+
+        Returns:
+            List[ChatModelEncoding] (List[List[int]]): The encodings, in the same order as the texts.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens for a batch of texts without returning the encodings.
+
+        Args:
+            texts (List[str]): The strings of text to count.
+
+        Returns:
+            List[int]: The number of tokens for each text, in the same order as the texts.
+        """
+        raise NotImplementedError
+
+
+class AsyncChatModel(ABC):
+    """
+    Abstract base class for an asyncio ChatModel.
+
+    Async models wrap a synchronous ChatModel, which remains responsible for
+    tokenization and for converting chunks into messages.
+
+    Attributes:
+        config (ConfigurationManager): The configuration template for the model.
+        model (ChatModel): The synchronous chat model being wrapped.
+    """
+
+    @abstractmethod
+    def __init__(self, config: object, model: Optional[ChatModel] = None):
+        """
+        Constructor method for AsyncChatModel.
+
+        Args:
+            config (ConfigurationManager): The configuration template for the model.
+            model (Optional[ChatModel]): The synchronous chat model to wrap. Created from the config if omitted.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_chat_completion(
+        self,
+        messages: List[ChatModelResponse],
+        session_name: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[ChatModelDelta]:
+        """
+        Stream a text completion for a conversation based on the provided messages.
+
+        Args:
+            messages (List[ChatModelResponse]): The list of ChatModelResponse objects representing the conversation.
+            session_name (Optional[str]): The session the conversation belongs to, used by models
+                with multiple workers to route a session to the same worker. Defaults to None.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
+
+        Returns:
+            AsyncIterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
+        """
+        raise NotImplementedError
+
+    async def get_chat_completion(
+        self, messages: List[ChatModelResponse], session_name: Optional[str] = None
+    ) -> ChatModelResponse:
+        """
+        Get a text completion for a conversation based on the provided messages.
+
+        Args:
+            messages (List[ChatModelResponse]): The list of ChatModelResponse objects representing the conversation.
+            session_name (Optional[str]): The session the conversation belongs to. Defaults to None.
+
+        Returns:
+            ChatModelResponse (Dict[LiteralString, str]): The text completion for the conversation.
+
+        Raises:
+            ValueError: If the 'messages' argument is empty or None.
+        """
+        message = None
+        async for delta in self.stream_chat_completion(messages, session_name):
+            if delta["type"] == "finish":
+                message = delta["message"]
+        return message
+
+    @abstractmethod
+    async def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
+        """
+        Get the embedding for a given input.
+
+        Args:
+            input (Union[str, List[str]]): The input text or list of texts to get embeddings for.
+
+        Returns:
+            ChatModelEmbedding (List[List[float]]): The embedding representation of the input.
+        """
+        raise NotImplementedError
+
+    def get_encoding(self, text: str) -> ChatModelEncoding:
+        """
+        Get the encoding for a single text with the wrapped model.
+
+        Args:
+            text (str): The string of text to encode.
+
+        Returns:
+            ChatModelEncoding (List[int]): The encoding for the text.
+        """
+        return self.model.get_encoding(text)
+
+    async def close(self) -> None:
+        """Release the resources held by the model, e.g. connections or worker threads."""
+
 
 class EmbeddingFunction(Protocol):
     @abstractmethod
-    def __call__(self, texts: ChatModelDocuments) -> ChatModelEmbedding:
+    def __call__(self, input: ChatModelDocuments) -> ChatModelEmbedding:
         """
         An abstract method defining the embedding function's call signature.
 
         Args:
-            texts (List[str]): A list of text documents.
+            input (List[str]): A list of text documents.
+
+        NOTE:
+            Chroma rejects embedding functions whose argument is not named `input`.
 
         Returns:
             ChatModelEmbedding (List[List[float]]): The resulting embedding for the given text documents.
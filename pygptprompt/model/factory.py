@@ -1,10 +1,14 @@
 """
 pygptprompt/model/factory.py
 """
+from functools import partial
+from typing import Optional
+
 from pygptprompt.config.manager import ConfigurationManager
-from pygptprompt.model.base import ChatModel
-from pygptprompt.model.llama_cpp import LlamaCppModel
-from pygptprompt.model.openai import OpenAIModel
+from pygptprompt.model.base import AsyncChatModel, ChatModel
+from pygptprompt.model.llama_cpp import AsyncLlamaCppModel, LlamaCppModel
+from pygptprompt.model.openai import AsyncOpenAIModel, OpenAIModel
+from pygptprompt.model.registry import ModelRegistry
 
 
 class ChatModelFactory:
@@ -14,6 +18,13 @@ class ChatModelFactory:
     Attributes:
         config (ConfigurationManager): The configuration manager instance.
         provider_map (dict): A dictionary mapping provider keys to their corresponding classes.
+        async_provider_map (dict): A dictionary mapping provider keys to their corresponding async classes.
+        embedding_provider_map (dict): A dictionary mapping provider keys to their embedding model constructors.
+        registry (ModelRegistry): The process-wide registry sharing loaded models.
+
+    NOTE:
+        Models are shared through the registry, so every factory in a process
+        returns the same instance for the same model and load parameters.
     """
 
     def __init__(self, config: ConfigurationManager):
@@ -28,16 +39,28 @@ class ChatModelFactory:
             "openai": OpenAIModel,
             "llama_cpp": LlamaCppModel,
         }
+        self.async_provider_map = {
+            "openai": AsyncOpenAIModel,
+            "llama_cpp": AsyncLlamaCppModel,
+        }
+        self.embedding_provider_map = {
+            "openai": OpenAIModel,
+            "llama_cpp": partial(LlamaCppModel, section="embedding"),
+        }
+        self.registry = ModelRegistry()
+        self.registry.max_memory = config.get_value(
+            "app.model_registry.max_memory", self.registry.max_memory
+        )
 
-    def create_model(self, provider: str) -> ChatModel:
+    def _provider_key(self, provider: str) -> str:
         """
-        Creates and returns a chat model instance based on the provider.
+        Get the provider key configured for the provider.
 
         Args:
-            provider (str): The provider key.
+            provider (str): The provider section within the configuration.
 
         Returns:
-            ChatModel: The chat model instance.
+            str: The provider key.
 
         Raises:
             ValueError: If the provider is unknown.
@@ -52,4 +75,104 @@ class ChatModelFactory:
         if provider_key not in self.provider_map:
             raise ValueError(f"Unknown provider: {provider}")
 
-        return self.provider_map[provider_key](self.config)
+        return provider_key
+
+    def create_model(self, provider: str, vocab_only: bool = False) -> ChatModel:
+        """
+        Returns the shared chat model instance for the provider, loading it on first use.
+
+        Args:
+            provider (str): The provider key.
+            vocab_only (bool): Load only the vocabulary of a llama.cpp model, e.g. to count
+                tokens for worker processes. Defaults to False.
+
+        Returns:
+            ChatModel: The chat model instance. Release it with `release_model` once it is no longer used.
+
+        Raises:
+            ValueError: If the provider is unknown.
+
+        NOTE:
+            Models are keyed by the provider and its `model` subsection (the repo id,
+            filename, local path, and load parameters), or the whole provider section
+            if it has none.
+        """
+        provider_key = self._provider_key(provider)
+        params = self.config.get_value(
+            f"{provider_key}.model"
+        ) or self.config.get_value(provider_key)
+        constructor = partial(self.provider_map[provider_key], self.config)
+        if vocab_only:
+            params = {**params, "vocab_only": True}
+            constructor = partial(constructor, vocab_only=True)
+        return self.registry.acquire(
+            ModelRegistry.make_key(provider_key, params), constructor
+        )
+
+    def create_embedding_model(self) -> Optional[ChatModel]:
+        """
+        Returns the shared embedding model configured by the `embedding` section, loading it on first use.
+
+        Returns:
+            Optional[ChatModel]: The embedding model instance, or None if the `embedding`
+                section names no provider. Release it with `release_model` once it is no longer used.
+
+        Raises:
+            ValueError: If the provider is unknown.
+
+        NOTE:
+            A llama.cpp embedding model with the same `model` settings as the chat
+            model shares the chat model's instance.
+        """
+        provider_key = self.config.get_value("embedding.provider")
+
+        if provider_key is None:
+            return None
+
+        if provider_key not in self.embedding_provider_map:
+            raise ValueError(f"Unknown embedding provider: {provider_key}")
+
+        params = self.config.get_value("embedding.model") or self.config.get_value(
+            provider_key
+        )
+        return self.registry.acquire(
+            ModelRegistry.make_key(provider_key, params),
+            partial(self.embedding_provider_map[provider_key], self.config),
+        )
+
+    def release_model(self, model: ChatModel) -> None:
+        """
+        Releases a chat model returned by `create_model`, so it may be evicted once idle.
+
+        Args:
+            model (ChatModel): The chat model instance.
+        """
+        self.registry.release(model)
+
+    def create_async_model(
+        self, provider: str, model: Optional[ChatModel] = None
+    ) -> AsyncChatModel:
+        """
+        Creates and returns an async chat model instance based on the provider.
+
+        Args:
+            provider (str): The provider key.
+            model (Optional[ChatModel]): An existing synchronous model to wrap. Defaults to the shared model from `create_model`.
+
+        Returns:
+            AsyncChatModel: The async chat model instance.
+
+        Raises:
+            ValueError: If the provider is unknown.
+
+        NOTE:
+            With `llama_cpp.workers.count`, the workers hold the weights, so the
+            shared llama.cpp model only loads the vocabulary for tokenization.
+        """
+        provider_key = self._provider_key(provider)
+        if model is None:
+            vocab_only = provider_key == "llama_cpp" and bool(
+                self.config.get_value("llama_cpp.workers.count", 0)
+            )
+            model = self.create_model(provider, vocab_only=vocab_only)
+        return self.async_provider_map[provider_key](self.config, model)
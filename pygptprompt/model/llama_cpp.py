@@ -1,10 +1,28 @@
 """
 pygptprompt/model/llama_cpp.py
 """
+import asyncio
+import ctypes
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Tuple, Union
+from threading import Event, Lock
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
+import numpy as np
 from huggingface_hub import hf_hub_download
 from huggingface_hub.hf_api import HfApi
 from huggingface_hub.utils import (
@@ -12,17 +30,103 @@ from huggingface_hub.utils import (
     LocalEntryNotFoundError,
     RepositoryNotFoundError,
 )
-from llama_cpp import ChatCompletionChunk, Llama
+from llama_cpp import (
+    Llama,
+    llama_get_embeddings,
+    llama_get_state_size,
+    llama_load_session_file,
+    llama_save_session_file,
+    llama_token,
+    llama_tokenize,
+)
 
 from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.mapping import JSONMappingTemplate
 from pygptprompt.model.base import (
+    AsyncChatModel,
     ChatModel,
+    ChatModelDelta,
     ChatModelEmbedding,
     ChatModelEncoding,
     ChatModelResponse,
     ChatModelTextCompletion,
-    DeltaContent,
 )
+from pygptprompt.model.llama_cpp_batch import LlamaCppBatchScheduler
+from pygptprompt.model.llama_cpp_pool import LlamaCppWorkerPool
+from pygptprompt.storage.completion_cache import CompletionCache
+from pygptprompt.storage.prompt_cache import PromptStateCache
+
+
+class PrefixTrackingLlama(Llama):
+    """
+    Llama language model that records how much of each prompt is reused from its context.
+
+    llama.cpp keeps the evaluated tokens resident in its context, and `Llama.generate`
+    only evaluates the suffix of a prompt that differs from the resident tokens. This
+    class records the size of the reused prefix so it can be reported per turn.
+
+    Attributes:
+        prompt_text (Union[str, List[int]]): The last prompt passed to `create_completion`.
+        prompt_tokens (int): The number of tokens in the last prompt.
+        prefix_tokens (int): The number of tokens of the last prompt reused from the context.
+        prompt_hook (Optional[Callable[[Sequence[int]], int]]): Called once with the tokens
+            of the next prompt before it is evaluated, e.g. to seed the context. Returns
+            the number of prompt tokens it evaluated.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prompt_text = ""
+        self.prompt_tokens = 0
+        self.prefix_tokens = 0
+        self.prompt_hook: Optional[Callable[[Sequence[int]], int]] = None
+
+    @property
+    def resident_tokens(self) -> List[int]:
+        """
+        Get the tokens currently resident in the llama context.
+
+        Returns:
+            List[int]: The resident tokens.
+        """
+        return self._input_ids.tolist()
+
+    def longest_prefix(self, tokens: Sequence[int]) -> int:
+        """
+        Get the length of the longest common prefix between the resident tokens and a prompt.
+
+        Args:
+            tokens (Sequence[int]): The prompt tokens.
+
+        Returns:
+            int: The number of leading prompt tokens already resident in the context.
+
+        NOTE:
+            The last prompt token is always evaluated to produce logits, matching `Llama.generate`.
+        """
+        length = min(self.n_tokens, len(tokens) - 1)
+        if length <= 0:
+            return 0
+        mismatches = np.flatnonzero(
+            self.input_ids[:length] != np.asarray(tokens[:length], dtype=np.intc)
+        )
+        return int(mismatches[0]) if mismatches.size else length
+
+    def generate(
+        self, tokens: Sequence[int], *args, **kwargs
+    ) -> Generator[int, Optional[Sequence[int]], None]:
+        evaluated = 0
+        if self.prompt_hook is not None:
+            prompt_hook, self.prompt_hook = self.prompt_hook, None
+            evaluated = prompt_hook(tokens)
+        self.prompt_tokens = len(tokens)
+        self.prefix_tokens = self.longest_prefix(tokens) - evaluated
+        return super().generate(tokens, *args, **kwargs)
+
+    def create_completion(self, prompt: Union[str, List[int]], *args, **kwargs):
+        # NOTE: Chat handlers render messages into a prompt and complete it here.
+        self.prompt_text = prompt
+        return super().create_completion(prompt, *args, **kwargs)
 
 
 class LlamaCppModel(ChatModel):
@@ -31,51 +135,175 @@ class LlamaCppModel(ChatModel):
 
     Args:
         config (ConfigurationManager): The configuration manager instance.
+        section (str): The configuration section whose `model` settings are loaded,
+            e.g. 'embedding' for a dedicated embedding model. Defaults to 'llama_cpp'.
+        vocab_only (Optional[bool]): Load only the vocabulary, e.g. to tokenize for worker
+            processes. Defaults to the section's `model.vocab_only` setting.
 
     Attributes:
+        section (str): The configuration section the model is loaded from.
         repo_id (str): The ID of the model repository.
         filename (str): The name of the model file.
         cache_dir (str): The directory to cache the downloaded model.
         model_path (str): The path to the downloaded model file.
-        model (Llama): The Llama language model instance.
+        vocab_only (bool): Whether only the vocabulary is loaded.
+        model (PrefixTrackingLlama): The Llama language model instance.
+        prompt_cache (Optional[PromptStateCache]): The shared system prompt cache, if enabled.
+        completion_cache (Optional[CompletionCache]): The cache of deterministic completions, if enabled.
+
+    NOTE:
+        Text is tokenized into a reusable buffer that only grows when a text
+        requires more tokens than the buffer can hold.
+
+    NOTE:
+        The evaluated prompt stays resident in the llama context between turns, so only the
+        suffix following the longest common prefix (system prompt + unchanged history) is
+        evaluated. Embedding with the chat model resets the context and forfeits the prefix.
     """
 
-    def __init__(self, config: ConfigurationManager):
+    def __init__(
+        self,
+        config: ConfigurationManager,
+        section: str = "llama_cpp",
+        vocab_only: Optional[bool] = None,
+    ):
         self.config = config
+        self.section = section
         self.logger = config.get_logger("general", self.__class__.__name__)
         self.repo_id = config.get_value(
-            "llama_cpp.model.repo_id", "TheBloke/Llama-2-7B-Chat-GGML"
+            f"{self.section}.model.repo_id", "TheBloke/Llama-2-7B-Chat-GGML"
         )
         self.filename = config.get_value(
-            "llama_cpp.model.filename", "llama-2-7b-chat.ggmlv3.q5_1.bin"
+            f"{self.section}.model.filename", "llama-2-7b-chat.ggmlv3.q5_1.bin"
         )
         self.cache_dir = Path(Path.home(), ".cache", "huggingface", "hub")
+        self.vocab_only = (
+            vocab_only
+            if vocab_only is not None
+            else config.get_value(f"{self.section}.model.vocab_only", False)
+        )
         self.model_path = self._discover_model()
-        self.model = Llama(
+        self.model = PrefixTrackingLlama(
             model_path=self.model_path,
-            n_ctx=config.get_value("llama_cpp.model.n_ctx", 4096),
-            n_batch=config.get_value("llama_cpp.model.n_batch", 512),
-            n_gpu_layers=config.get_value("llama_cpp.model.n_gpu_layers", 0),
-            low_vram=config.get_value("llama_cpp.model.low_vram", False),
-            verbose=config.get_value("llama_cpp.model.verbose", False),
-            n_parts=config.get_value("llama_cpp.model.n_parts", -1),
-            seed=config.get_value("llama_cpp.model.seed", 1337),
-            f16_kv=config.get_value("llama_cpp.model.f16_kv", True),
-            logits_all=config.get_value("llama_cpp.model.logits_all", False),
-            vocab_only=config.get_value("llama_cpp.model.vocab_only", False),
-            use_mmap=config.get_value("llama_cpp.model.use_mmap", True),
-            use_mlock=config.get_value("llama_cpp.model.use_mlock", False),
-            embedding=config.get_value("llama_cpp.model.embedding", True),
-            n_threads=config.get_value("llama_cpp.model.n_threads", None),
+            n_ctx=config.get_value(f"{self.section}.model.n_ctx", 4096),
+            n_batch=config.get_value(f"{self.section}.model.n_batch", 512),
+            n_gpu_layers=config.get_value(f"{self.section}.model.n_gpu_layers", 0),
+            low_vram=config.get_value(f"{self.section}.model.low_vram", False),
+            verbose=config.get_value(f"{self.section}.model.verbose", False),
+            n_parts=config.get_value(f"{self.section}.model.n_parts", -1),
+            seed=config.get_value(f"{self.section}.model.seed", 1337),
+            f16_kv=config.get_value(f"{self.section}.model.f16_kv", True),
+            logits_all=config.get_value(f"{self.section}.model.logits_all", False),
+            vocab_only=self.vocab_only,
+            use_mmap=config.get_value(f"{self.section}.model.use_mmap", True),
+            use_mlock=config.get_value(f"{self.section}.model.use_mlock", False),
+            embedding=config.get_value(f"{self.section}.model.embedding", True),
+            n_threads=config.get_value(f"{self.section}.model.n_threads", None),
+            n_threads_batch=config.get_value(
+                f"{self.section}.model.n_threads_batch", None
+            ),
             last_n_tokens_size=config.get_value(
-                "llama_cpp.model.last_n_tokens_size", 64
+                f"{self.section}.model.last_n_tokens_size", 64
+            ),
+            lora_base=config.get_value(f"{self.section}.model.lora_base", None),
+            lora_path=config.get_value(f"{self.section}.model.lora_path", None),
+            tensor_split=config.get_value(f"{self.section}.model.tensor_split", None),
+            rope_freq_base=config.get_value(
+                f"{self.section}.model.rope_freq_base", 10000.0
+            ),
+            rope_freq_scale=config.get_value(
+                f"{self.section}.model.rope_freq_scale", 1.0
             ),
-            lora_base=config.get_value("llama_cpp.model.lora_base", None),
-            lora_path=config.get_value("llama_cpp.model.lora_path", None),
-            tensor_split=config.get_value("llama_cpp.model.tensor_split", None),
-            rope_freq_base=config.get_value("llama_cpp.model.rope_freq_base", 10000.0),
-            rope_freq_scale=config.get_value("llama_cpp.model.rope_freq_scale", 1.0),
         )
+        self._token_buffer = (llama_token * self.model.n_ctx())()
+        self._token_buffer_lock = Lock()
+        self.prompt_cache = None
+        if config.get_value("llama_cpp.prompt_cache.enabled", False):
+            self.prompt_cache = PromptStateCache(
+                directory=f"{config.evaluate_path('app.cache')}/prompts",
+                max_size=config.get_value("llama_cpp.prompt_cache.max_size", 2**30),
+                logger=self.logger,
+            )
+        self.completion_cache = CompletionCache.from_config(config, self.logger)
+
+    @property
+    def model_id(self) -> str:
+        """
+        Get an identifier for the model used to encode text.
+
+        Returns:
+            str: The path to the loaded model file.
+        """
+        return self.model_path
+
+    @property
+    def resident_size(self) -> int:
+        """
+        Get the estimated memory held by the loaded model.
+
+        Returns:
+            int: The size of the model file plus the size of the context state (KV cache and logits),
+                or only the context state if only the vocabulary is loaded.
+        """
+        state_size = llama_get_state_size(self.model.ctx)
+        if self.vocab_only:
+            return state_size
+        return os.path.getsize(self.model_path) + state_size
+
+    def close(self) -> None:
+        """
+        Free the llama.cpp model weights and context.
+
+        NOTE:
+            Dropping the last reference to the Llama instance frees its model and context
+            immediately instead of whenever every other holder is garbage collected.
+        """
+        if hasattr(self, "model"):
+            del self.model
+
+    def _tokenize(self, text: str) -> int:
+        """
+        Tokenize the given text into the reusable token buffer.
+
+        Args:
+            text (str): The input text to tokenize.
+
+        Returns:
+            int: The number of tokens written to the buffer.
+
+        Raises:
+            RuntimeError: If the text could not be tokenized.
+
+        NOTE:
+            The caller must hold the token buffer lock while reading the buffer.
+        """
+        text_bytes = text.encode("utf-8")
+        n_tokens = llama_tokenize(
+            self.model.model,
+            text_bytes,
+            len(text_bytes),
+            self._token_buffer,
+            len(self._token_buffer),
+            True,  # add_bos
+            False,  # special
+        )
+
+        # A negative count is the required buffer size
+        if n_tokens < 0:
+            self._token_buffer = (llama_token * abs(n_tokens))()
+            n_tokens = llama_tokenize(
+                self.model.model,
+                text_bytes,
+                len(text_bytes),
+                self._token_buffer,
+                len(self._token_buffer),
+                True,  # add_bos
+                False,  # special
+            )
+            if n_tokens < 0:
+                raise RuntimeError(f"Failed to tokenize text: n_tokens={n_tokens}")
+
+        return n_tokens
 
     def _discover_model(self) -> str:
         """
@@ -84,7 +312,7 @@ class LlamaCppModel(ChatModel):
         Returns:
             str: The path to the model to be used.
         """
-        local_model_path = self.config.get_value("llama_cpp.model.local")
+        local_model_path = self.config.get_value(f"{self.section}.model.local")
 
         # Check if a local model path is provided and is valid
         if local_model_path:
@@ -142,159 +370,210 @@ class LlamaCppModel(ChatModel):
         self.logger.error("Max retries exceeded. Failed to download the model.")
         sys.exit(1)
 
-    def _extract_content(self, delta: DeltaContent, content: str) -> str:
+    def _context_state_metadata(self, fingerprint: str) -> Dict[str, Any]:
         """
-        Extracts content from the given delta and appends it to the existing content.
+        Get the metadata a saved context state must match to be restored.
 
         Args:
-            delta (DeltaContent): The delta object containing new content.
-            content (str): The existing content.
+            fingerprint (str): A digest identifying the conversation the state belongs to.
 
         Returns:
-            str: The updated content after appending the new token.
-        """
-        self.logger.debug("Entering _extract_content method.")
-        self.logger.debug(f"Initial delta: {delta}, content: {content}")
-
-        if delta and "content" in delta and delta["content"]:
-            token = delta["content"]
-            print(token, end="")
-            sys.stdout.flush()
-            content += token
-        return content
+            Dict[str, Any]: The model file identity, context size, and fingerprint.
 
-    def _extract_function_call(
-        self,
-        delta: DeltaContent,
-        function_call_name: str,
-        function_call_args: str,
-    ) -> Tuple[str, str]:
+        NOTE:
+            The model file is identified by its path, size, and modification time
+            because hashing a multi-gigabyte file would defeat the purpose.
+        """
+        model_stat = os.stat(self.model_path)
+        return {
+            "model_path": str(self.model_path),
+            "model_size": model_stat.st_size,
+            "model_mtime": model_stat.st_mtime,
+            "n_ctx": self.model.n_ctx(),
+            "fingerprint": fingerprint,
+        }
+
+    def save_context_state(self, file_path: str, fingerprint: str) -> bool:
         """
-        Extracts function call information from the given delta and updates the function call name and arguments.
+        Save the llama context state (KV cache and resident tokens) to a file.
+
+        The metadata required to validate the state is saved next to it as JSON.
 
         Args:
-            delta (DeltaContent): The delta object containing function call information.
-            function_call_name (str): The existing function call name.
-            function_call_args (str): The existing function call arguments.
+            file_path (str): The path to the state file.
+            fingerprint (str): A digest identifying the conversation the state belongs to.
 
         Returns:
-            Tuple[str, str]: A tuple containing the updated function call name and arguments.
+            bool: True if the state was saved, False otherwise.
         """
-        self.logger.debug("Entering _extract_function_call method.")
-        self.logger.debug(
-            f"Initial delta: {delta}, "
-            f"function_call_name: {function_call_name}, "
-            f"function_call_args: {function_call_args}, "
+        n_tokens = self.model.n_tokens
+        if n_tokens == 0:
+            return False
+
+        tokens = (llama_token * n_tokens)(*self.model.input_ids[:n_tokens])
+        if not llama_save_session_file(
+            self.model.ctx, str(file_path).encode("utf-8"), tokens, n_tokens
+        ):
+            self.logger.error(f"Failed to save context state to {file_path}")
+            return False
+
+        metadata = JSONMappingTemplate(
+            str(Path(file_path).with_suffix(".json")),
+            {
+                **self._context_state_metadata(fingerprint),
+                "state_size": llama_get_state_size(self.model.ctx),
+            },
+            self.logger,
         )
+        if not metadata.save_json():
+            return False
 
-        if delta and "function_call" in delta and delta["function_call"]:
-            function_call = delta["function_call"]
-            if not function_call_name:
-                function_call_name = function_call.get("name", "")
-            function_call_args += str(function_call.get("arguments", ""))
-        return function_call_name, function_call_args
+        self.logger.info(f"Saved {n_tokens} context tokens to {file_path}")
+        return True
 
-    def _handle_finish_reason(
-        self,
-        finish_reason: str,
-        function_call_name: str,
-        function_call_args: str,
-        content: str,
-    ) -> ChatModelResponse:
+    def _match_state_size(self, state_size: int) -> bool:
         """
-        Handles the finish reason and returns an ChatModelResponse.
+        Grow the logits buffer of a fresh context to match a saved state.
 
         Args:
-            finish_reason (str): The finish reason from the response.
-            function_call_name (str): The function call name.
-            function_call_args (str): The function call arguments.
-            content (str): The generated content.
+            state_size (int): The state size recorded when the state was saved.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
-        """
-        self.logger.debug("Entering _handle_finish_reason method.")
-        self.logger.debug(
-            f"Initial finish_reason: {finish_reason}, "
-            f"function_call_name: {function_call_name}, "
-            f"function_call_args: {function_call_args}, "
-            f"content: {content}"
-        )
-
-        if finish_reason:
-            if finish_reason == "function_call":
-                return ChatModelResponse(
-                    role="function",
-                    function_call=function_call_name,
-                    function_args=function_call_args,
-                )
-            elif finish_reason == "stop":
-                print()  # Add newline to model output
-                sys.stdout.flush()
-                return ChatModelResponse(role="assistant", content=content)
-            else:
-                # Handle unexpected finish_reason
-                raise ValueError(f"Warning: Unexpected finish_reason '{finish_reason}'")
-
-    def _stream_chat_completion(
-        self, response_generator: Iterator[ChatCompletionChunk]
-    ) -> ChatModelResponse:
+            bool: True if the context state size matches, False otherwise.
+
+        NOTE:
+            llama.cpp aborts the process when the logits capacity of a saved state
+            differs from the capacity of the context it is restored into. The
+            capacity grows with the largest batch a context has decoded, so a
+            fresh context decodes one batch of the same size before restoring.
+            The batch is overwritten by the restored state.
         """
-        Streams the chat completion response and handles the content and function call information.
+        difference = state_size - llama_get_state_size(self.model.ctx)
+        logits_size = self.model.n_vocab() * ctypes.sizeof(ctypes.c_float)
+
+        if (
+            difference > 0
+            and difference % logits_size == 0
+            and self.model.n_tokens == 0
+        ):
+            n_batch = 1 + difference // logits_size
+            if n_batch <= self.model.n_batch:
+                self.model.eval([self.model.token_bos()] * n_batch)
+                self.model.reset()
+
+        return llama_get_state_size(self.model.ctx) == state_size
+
+    def load_context_state(self, file_path: str, fingerprint: str) -> bool:
+        """
+        Restore the llama context state (KV cache and resident tokens) from a file.
+
+        The state is only restored if the model file, context size, and fingerprint match.
 
         Args:
-            response_generator (Iterator[ChatCompletionChunk]): An iterator of ChatCompletionChunk objects.
+            file_path (str): The path to the state file.
+            fingerprint (str): A digest identifying the conversation the state must belong to.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+            bool: True if the state was restored, False otherwise.
         """
-        function_call_name = None
-        function_call_args = ""
-        content = ""
+        if not Path(file_path).exists():
+            return False
 
-        self.logger.debug("Entering _stream_chat_completion method.")
-        self.logger.debug(
-            f"Initial function_call_name: {function_call_name}, function_call_args: {function_call_args}, content: {content}"
+        metadata = JSONMappingTemplate(
+            str(Path(file_path).with_suffix(".json")), logger=self.logger
         )
+        if not metadata.load_json():
+            return False
 
-        for chunk in response_generator:
-            self.logger.debug(f"Processing chunk: {chunk}")
+        state_size = metadata.data.pop("state_size", 0)
+        if metadata.data != self._context_state_metadata(fingerprint):
+            self.logger.info(f"Context state {file_path} is stale; skipping restore")
+            return False
 
-            delta = chunk["choices"][0]["delta"]
-            content = self._extract_content(delta, content)
-            function_call_name, function_call_args = self._extract_function_call(
-                delta, function_call_name, function_call_args
+        if not self._match_state_size(state_size):
+            self.logger.warning(
+                f"Context state {file_path} does not fit this context; skipping restore"
             )
+            return False
+
+        n_ctx = self.model.n_ctx()
+        tokens = (llama_token * n_ctx)()
+        n_tokens = ctypes.c_size_t(0)
+        if not llama_load_session_file(
+            self.model.ctx,
+            str(file_path).encode("utf-8"),
+            tokens,
+            n_ctx,
+            ctypes.byref(n_tokens),
+        ):
+            self.logger.error(f"Failed to load context state from {file_path}")
+            return False
+
+        self.model.input_ids[: n_tokens.value] = tokens[: n_tokens.value]
+        self.model.n_tokens = n_tokens.value
+        self.logger.info(f"Restored {n_tokens.value} context tokens from {file_path}")
+        return True
+
+    def _seed_context(self, system_prompt: str, tokens: Sequence[int]) -> int:
+        """
+        Seed the llama context with the evaluated state of the system prompt.
 
-            self.logger.debug(f"Extracted delta: {delta}")
-            self.logger.debug(f"Current content: {content}")
-            self.logger.debug(
-                f"Current function_call_name: {function_call_name}, function_call_args: {function_call_args}"
-            )
+        The state is restored from the prompt cache when available. Otherwise the
+        system prompt is evaluated on its own and its state is added to the cache
+        before the rest of the prompt is evaluated, so the next session or process
+        starting with the same prefix skips its prefill.
 
-            finish_reason = chunk["choices"][0]["finish_reason"]
-            self.logger.debug(f"Finish reason: {finish_reason}")
+        Args:
+            system_prompt (str): The content of the system message.
+            tokens (Sequence[int]): The tokens of the rendered prompt.
 
-            message = self._handle_finish_reason(
-                finish_reason,
-                function_call_name,
-                function_call_args,
-                content,
-            )
+        Returns:
+            int: The number of system prompt tokens evaluated to seed the context.
+
+        NOTE:
+            States are keyed by the model file identity, context size, chat format,
+            rendered system prompt, and function schema.
+        """
+        prompt = self.model.prompt_text
+        end = prompt.find(system_prompt) if isinstance(prompt, str) else -1
+        if not system_prompt or end < 0:
+            return 0
+
+        prefix = prompt[: end + len(system_prompt)]
+        prefix_tokens = self.model.tokenize(prefix.encode("utf-8"), special=True)
+        n_prefix = min(len(prefix_tokens), len(tokens) - 1)
+        mismatches = np.flatnonzero(
+            np.asarray(prefix_tokens[:n_prefix]) != np.asarray(tokens[:n_prefix])
+        )
+        if mismatches.size:
+            n_prefix = int(mismatches[0])
+
+        # The resident context already begins with the system prompt.
+        n_resident = self.model.longest_prefix(tokens)
+        if n_prefix == 0 or n_resident >= n_prefix:
+            return 0
+
+        fingerprint = self.prompt_cache.make_key(
+            self.model.chat_format,
+            prefix,
+            self.config.get_value("function.definitions", []),
+        )
+        key = self.prompt_cache.make_key(self._context_state_metadata(fingerprint))
+        state_path = self.prompt_cache.get(key)
 
-            self.logger.debug(f"Generated message: {message}")
+        if state_path and self.load_context_state(state_path, fingerprint):
+            return 0
 
-            if message:  # NOTE: Exit early if a finish reason is given.
-                self.logger.debug(f"Returning message: {message}")
-                return message
+        self.model.n_tokens = n_resident
+        self.model.eval(tokens[n_resident:n_prefix])
 
-        # NOTE: The finish reason should be present, but vanished regardless.
-        # The reason for it vanishing is unknown; This is a bug.
-        self.logger.debug(f"Generated content: {content}")
-        self.logger.debug("Exiting _stream_chat_completion without a finish_reason.")
-        # NOTE: There is no message, but content is always generated.
-        # Return the generated content even though no finish reason was given.
-        return ChatModelResponse(role="assistant", content=content)
+        # NOTE: A state that exists but does not fit this context is kept for fresh contexts.
+        if not state_path and self.save_context_state(
+            self.prompt_cache.path(key), fingerprint
+        ):
+            self.prompt_cache.add(key)
+
+        return n_prefix - n_resident
 
     def get_completion(self, prompt: str) -> ChatModelTextCompletion:
         """
@@ -305,17 +584,22 @@ class LlamaCppModel(ChatModel):
         """
         raise NotImplementedError
 
-    def get_chat_completion(
-        self, messages: List[ChatModelResponse]
-    ) -> ChatModelResponse:
+    def stream_chat_completion(
+        self,
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[ChatModelDelta]:
         """
-        Generate chat completions using the Llama language model.
+        Stream chat completions using the Llama language model.
 
         Args:
             messages (List[ChatModelResponse]): List of chat completion messages.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+            Iterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
 
         Raises:
             ValueError: If the 'messages' argument is empty or None.
@@ -323,31 +607,158 @@ class LlamaCppModel(ChatModel):
         if not messages:
             raise ValueError("'messages' argument cannot be empty or None")
 
+        params = self._chat_completion_params(messages, options)
+        yield from self._cached_chat_completion(
+            {**params, "chat_format": self.model.chat_format},
+            partial(self._generate_chat_completion, params),
+        )
+
+    def _chat_completion_params(
+        self,
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the parameters for a streamed chat completion.
+
+        Args:
+            messages (List[ChatModelResponse]): List of chat completion messages.
+            options (Optional[Dict[str, Any]]): Overrides of the parameters. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: The parameters set by `llama_cpp.chat_completions` and the overrides.
+        """
+        params = dict(
+            messages=messages,
+            functions=self.config.get_value("function.definitions", []),
+            function_call=self.config.get_value("function.call", "auto"),
+            max_tokens=self.config.get_value(
+                "llama_cpp.chat_completions.max_tokens", 1024
+            ),
+            temperature=self.config.get_value(
+                "llama_cpp.chat_completions.temperature", 0.8
+            ),
+            top_p=self.config.get_value("llama_cpp.chat_completions.top_p", 0.95),
+            top_k=self.config.get_value("llama_cpp.chat_completions.top_k", 40),
+            stream=True,
+            stop=self.config.get_value("llama_cpp.chat_completions.stop", []),
+            repeat_penalty=self.config.get_value(
+                "llama_cpp.chat_completions.repeat_penalty", 1.1
+            ),
+        )
+        params.update(options or {})
+        return params
+
+    def _generate_chat_completion(
+        self, params: Dict[str, Any]
+    ) -> Iterator[ChatModelDelta]:
+        """
+        Stream a chat completion generated by the Llama language model.
+
+        Args:
+            params (Dict[str, Any]): The chat completion parameters.
+
+        Returns:
+            Iterator[ChatModelDelta]: The delta events, ending with a 'finish' event.
+        """
+        messages = params["messages"]
+        if self.prompt_cache is not None and messages[0]["role"] == "system":
+            self.model.prompt_hook = partial(self._seed_context, messages[0]["content"])
+
         # NOTE: Larger sequence lengths, or context windows, will delay
         # load times. The load time varies from model to model.
         try:
-            response = self.model.create_chat_completion(
-                messages=messages,
-                functions=self.config.get_value("function.definitions", []),
-                function_call=self.config.get_value("function.call", "auto"),
-                max_tokens=self.config.get_value(
-                    "llama_cpp.chat_completions.max_tokens", 1024
-                ),
-                temperature=self.config.get_value(
-                    "llama_cpp.chat_completions.temperature", 0.8
-                ),
-                top_p=self.config.get_value("llama_cpp.chat_completions.top_p", 0.95),
-                top_k=self.config.get_value("llama_cpp.chat_completions.top_k", 40),
-                stream=True,
-                stop=self.config.get_value("llama_cpp.chat_completions.stop", []),
-                repeat_penalty=self.config.get_value(
-                    "llama_cpp.chat_completions.repeat_penalty", 1.1
-                ),
+            response = self.model.create_chat_completion(**params)
+            yield from self._stream_chat_completion(response)
+            self.logger.info(
+                f"Prompt prefix tokens reused: {self.model.prefix_tokens}, "
+                f"evaluated: {self.model.prompt_tokens - self.model.prefix_tokens}"
             )
-            return self._stream_chat_completion(response)
         except Exception as e:
-            self.logger.error(f"Error generating chat completions: {e}")
-            return ChatModelResponse(role="assistant", content=str(e))
+            yield self._error_delta(e)
+        finally:
+            self.model.prompt_hook = None
+
+    def _embed_tokens(self, tokens: List[int], output: np.ndarray) -> None:
+        """
+        Evaluate a token sequence that fits the context and copy its embedding.
+
+        Args:
+            tokens (List[int]): The tokens to embed, at most `n_ctx` of them.
+            output (np.ndarray): The float32 row the embedding is written to.
+
+        NOTE:
+            The leading tokens shared with the resident context are not evaluated
+            again, and `Llama.eval` decodes the rest in `n_batch` sized batches.
+        """
+        self.model.n_tokens = self.model.longest_prefix(tokens)
+        self.model.eval(tokens[self.model.n_tokens :])
+        output[:] = np.ctypeslib.as_array(
+            llama_get_embeddings(self.model.ctx), shape=output.shape
+        )
+
+    def get_embedding_array(
+        self, input: Union[str, List[str]], normalize: bool = False
+    ) -> np.ndarray:
+        """
+        Generate embeddings as a contiguous float32 array.
+
+        Each input is tokenized once into the reusable token buffer. Inputs are
+        embedded in the lexicographic order of their tokens, so inputs sharing
+        leading tokens (e.g. an instruction prefix) reuse the evaluated prefix.
+        Inputs longer than the context are split into context sized chunks
+        whose embeddings are averaged, weighted by their number of tokens.
+
+        Args:
+            input (Union[str, List[str]]): The input string or list of strings.
+            normalize (bool): Scale each embedding to unit length. Defaults to False.
+
+        Returns:
+            np.ndarray: The embeddings with shape (number of inputs, n_embd), in input order.
+
+        Raises:
+            ValueError: If the 'input' argument is empty or None.
+            RuntimeError: If the model was loaded without embeddings enabled.
+
+        NOTE:
+            llama.cpp returns a single embedding per context, so sequences are
+            evaluated one at a time rather than packed into a shared batch.
+        """
+        if not input:
+            raise ValueError("'input' argument cannot be empty or None")
+        if not self.model.context_params.embedding:
+            raise RuntimeError(
+                f"Embeddings are disabled; set {self.section}.model.embedding to true"
+            )
+
+        texts = [input] if isinstance(input, str) else input
+        encodings = self.get_encodings(texts)
+
+        n_ctx = self.model.n_ctx()
+        embeddings = np.empty((len(texts), self.model.n_embd()), dtype=np.float32)
+        chunk = np.empty(embeddings.shape[1], dtype=np.float32)
+
+        for index in sorted(range(len(texts)), key=lambda i: encodings[i]):
+            tokens = encodings[index]
+            if len(tokens) <= n_ctx:
+                self._embed_tokens(tokens, embeddings[index])
+                continue
+
+            # NOTE: Every chunk begins with BOS, as the first one does.
+            bos, content, window = tokens[:1], tokens[1:], n_ctx - 1
+            embeddings[index], n_pooled = 0.0, 0
+            for start in range(0, len(content), window):
+                chunk_tokens = bos + content[start : start + window]
+                self._embed_tokens(chunk_tokens, chunk)
+                embeddings[index] += chunk * len(chunk_tokens)
+                n_pooled += len(chunk_tokens)
+            embeddings[index] /= n_pooled
+
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+        return embeddings
 
     def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
         """
@@ -357,22 +768,25 @@ class LlamaCppModel(ChatModel):
             input (Union[str, List[str]]): The input string or list of strings.
 
         Returns:
-            ChatModelEmbedding (List[List[float]]): The generated embedding vector.
+            ChatModelEmbedding (List[List[float]]): The generated embedding vectors.
 
         Raises:
             ValueError: If the 'input' argument is empty or None.
+
+        NOTE:
+            Embeddings are scaled to unit length if `{section}.embeddings.normalize`
+            is true. See `get_embedding_array` for how inputs are batched.
         """
         if not input:
             raise ValueError("'input' argument cannot be empty or None")
 
         try:
-            embedding: Dict[str, Any] = self.model.create_embedding(input=input)
-            sorted_embeddings: List[Dict[str, Any]] = sorted(
-                embedding["data"],
-                key=lambda e: e["index"],
-            )
-            # Return Embedding Vectors as List[float]
-            return [result["embedding"] for result in sorted_embeddings]
+            return self.get_embedding_array(
+                input,
+                normalize=self.config.get_value(
+                    f"{self.section}.embeddings.normalize", False
+                ),
+            ).tolist()
         except Exception as e:
             self.logger.error(f"Error generating embeddings: {e}")
             return []
@@ -393,10 +807,213 @@ class LlamaCppModel(ChatModel):
         if not text:
             raise ValueError("'text' argument cannot be empty or None")
 
-        # Convert input text from string to bytes using utf-8 encoding
-        text_bytes = text.encode("utf-8")
+        with self._token_buffer_lock:
+            n_tokens = self._tokenize(text)
+            return self._token_buffer[:n_tokens]
+
+    def get_encodings(self, texts: List[str]) -> List[ChatModelEncoding]:
+        """
+        Get the token encodings for a batch of texts using the Llama language model.
+
+        Args:
+            texts (List[str]): The input texts to encode.
+
+        Returns:
+            List[ChatModelEncoding] (List[List[int]]): The token encodings, in the same order as the texts.
+
+        Raises:
+            ValueError: If the 'texts' argument is empty or None.
+        """
+        if not texts:
+            raise ValueError("'texts' argument cannot be empty or None")
+
+        encodings: List[ChatModelEncoding] = []
+        with self._token_buffer_lock:
+            for text in texts:
+                n_tokens = self._tokenize(text)
+                encodings.append(self._token_buffer[:n_tokens])
+        return encodings
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens for a batch of texts using the Llama language model.
+
+        Args:
+            texts (List[str]): The input texts to count.
+
+        Returns:
+            List[int]: The number of tokens for each text, in the same order as the texts.
+
+        Raises:
+            ValueError: If the 'texts' argument is empty or None.
+
+        NOTE:
+            Tokens are never copied out of the token buffer; only the counts are returned.
+        """
+        if not texts:
+            raise ValueError("'texts' argument cannot be empty or None")
+
+        with self._token_buffer_lock:
+            return [self._tokenize(text) for text in texts]
+
+
+class AsyncLlamaCppModel(AsyncChatModel):
+    """
+    AsyncChatModel class for interacting with the Llama language model.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        model (Optional[ChatModel]): The synchronous model to run. Defaults to a new LlamaCppModel.
+
+    Attributes:
+        config (ConfigurationManager): The configuration manager instance.
+        model (ChatModel): The synchronous model run by the worker thread.
+
+        scheduler (Optional[LlamaCppBatchScheduler]): The batch scheduler, if `llama_cpp.batch.enabled`.
+        pool (Optional[LlamaCppWorkerPool]): The worker processes, if `llama_cpp.workers.count` is set.
+
+    NOTE:
+        A llama context is not thread safe, so generation and embedding run on a
+        single dedicated worker thread. Tokens are bridged to the event loop
+        through an asyncio queue, keeping the loop free to serve other sessions.
+        With `llama_cpp.batch.enabled`, chat completions instead run on one
+        thread per batch slot and are decoded together by a
+        LlamaCppBatchScheduler. With `llama_cpp.workers.count`,
+        chat completions and embeddings run in a LlamaCppWorkerPool, and the
+        wrapped model is only used for tokenization, so it loads only the vocabulary.
+    """
+
+    def __init__(self, config: ConfigurationManager, model: Optional[ChatModel] = None):
+        self.config = config
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.model = model or LlamaCppModel(
+            config, vocab_only=bool(config.get_value("llama_cpp.workers.count", 0))
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=self.__class__.__name__
+        )
+        self.scheduler: Optional[LlamaCppBatchScheduler] = None
+        self.pool: Optional[LlamaCppWorkerPool] = None
+        if config.get_value("llama_cpp.workers.count", 0):
+            self.pool = LlamaCppWorkerPool(config)
+        elif config.get_value("llama_cpp.batch.enabled", False):
+            self.scheduler = LlamaCppBatchScheduler(self.model)
+            self._batch_executor = ThreadPoolExecutor(
+                max_workers=self.scheduler.n_parallel,
+                thread_name_prefix=LlamaCppBatchScheduler.__name__,
+            )
+
+    async def stream_chat_completion(
+        self,
+        messages: List[ChatModelResponse],
+        session_name: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[ChatModelDelta]:
+        """
+        Stream chat completions using the Llama language model.
+
+        Args:
+            messages (List[ChatModelResponse]): List of chat completion messages.
+            session_name (Optional[str]): The session the conversation belongs to. Routes it to the same worker when `llama_cpp.workers.count` is set.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
+
+        Returns:
+            AsyncIterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
+
+        Raises:
+            ValueError: If the 'messages' argument is empty or None.
+
+        NOTE:
+            Closing the iterator early stops generation at the next token.
+        """
+        if not messages:
+            raise ValueError("'messages' argument cannot be empty or None")
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Optional[ChatModelDelta]] = asyncio.Queue()
+        cancelled = Event()
 
-        # Tokenize the text using the Llama language model
-        encoding_tokens = self.model.tokenize(text_bytes)
+        def put(delta: Optional[ChatModelDelta]) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, delta)
+
+        def generate(stream: Callable[..., Iterator[ChatModelDelta]]) -> None:
+            try:
+                for delta in stream(messages, options):
+                    if cancelled.is_set():
+                        break
+                    put(delta)
+            except Exception as e:
+                put(self.model._error_delta(e))
+            finally:
+                put(None)
+
+        def handle(kind: str, payload: Any) -> None:
+            if kind == "delta":
+                put(payload)
+                return
+            if kind == "error":
+                put(self.model._error_delta(RuntimeError(payload)))
+            put(None)
+
+        if self.pool is not None:
+            cancel = self.pool.submit("chat", (messages, options), handle, session_name)
+        elif self.scheduler is not None:
+            loop.run_in_executor(
+                self._batch_executor, generate, self.scheduler.stream_chat_completion
+            )
+            cancel = cancelled.set
+        else:
+            loop.run_in_executor(
+                self._executor, generate, self.model.stream_chat_completion
+            )
+            cancel = cancelled.set
+
+        try:
+            while (delta := await queue.get()) is not None:
+                yield delta
+        finally:
+            cancel()
 
-        return encoding_tokens
+    async def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
+        """
+        Generate embeddings using the Llama language model.
+
+        Args:
+            input (Union[str, List[str]]): The input text or list of texts to generate embeddings for.
+
+        Returns:
+            ChatModelEmbedding (List[List[float]]): The generated embedding vectors.
+        """
+        loop = asyncio.get_running_loop()
+        if self.pool is None:
+            return await loop.run_in_executor(
+                self._executor, self.model.get_embedding, input
+            )
+
+        future: asyncio.Future[ChatModelEmbedding] = loop.create_future()
+
+        def resolve(kind: str, payload: Any) -> None:
+            if not future.done():
+                if kind == "result":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+
+        self.pool.submit(
+            "embed",
+            input,
+            lambda kind, payload: loop.call_soon_threadsafe(resolve, kind, payload),
+        )
+        return await future
+
+    async def close(self) -> None:
+        """Stop the worker thread once pending calls complete."""
+        self._executor.shutdown(wait=False)
+        if self.scheduler is not None:
+            self._batch_executor.shutdown(wait=False)
+            self.scheduler.close()
+        if self.pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
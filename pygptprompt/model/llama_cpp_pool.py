@@ -0,0 +1,471 @@
+"""
+pygptprompt/model/llama_cpp_pool.py
+"""
+import hashlib
+import itertools
+import multiprocessing
+from collections import deque
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from queue import Empty
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from pygptprompt import CPU_COUNT
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.base import JSONMap
+
+# NOTE: Messages are (kind, request id, payload) tuples in both directions.
+WorkerMessage = Tuple[str, int, Any]
+WorkerHandler = Callable[[str, Any], None]
+
+
+def _drain(
+    requests: Queue,
+    pending: Deque[WorkerMessage],
+    cancelled: Set[int],
+) -> None:
+    """Record cancellations queued while the worker was busy."""
+    while True:
+        try:
+            message = requests.get_nowait()
+        except Empty:
+            return
+        if message is not None and message[0] == "cancel":
+            cancelled.add(message[1])
+        else:
+            pending.append(message)
+
+
+def _heartbeat(responses: Queue, interval: float) -> None:
+    """
+    Report that the worker process is alive every interval.
+
+    NOTE:
+        llama.cpp releases the GIL while it evaluates, so heartbeats continue
+        during long prompt evaluations and embedding batches.
+    """
+    while True:
+        responses.put(("heartbeat", 0, None))
+        sleep(interval)
+
+
+def _worker_config(
+    file_path: str, data: JSONMap, n_threads: int
+) -> ConfigurationManager:
+    """
+    Recreate the configuration of the parent process in a worker process.
+
+    Args:
+        file_path (str): The path to the configuration file.
+        data (JSONMap): The configuration data of the parent process.
+        n_threads (int): The number of threads the model may use.
+
+    Returns:
+        ConfigurationManager: The parent's configuration, limited to the worker's threads.
+    """
+    config = ConfigurationManager(file_path, initial_data=data)
+    config.set_value("llama_cpp.model.n_threads", n_threads)
+    config.set_value("llama_cpp.model.n_threads_batch", n_threads)
+    return config
+
+
+def _worker_main(
+    file_path: str,
+    data: JSONMap,
+    n_threads: int,
+    heartbeat_interval: float,
+    requests: Queue,
+    responses: Queue,
+) -> None:
+    """
+    Serve chat completions and embeddings from a LlamaCppModel in a worker process.
+
+    Args:
+        file_path (str): The path to the configuration file.
+        data (JSONMap): The configuration data of the parent process.
+        n_threads (int): The number of threads the model may use.
+        heartbeat_interval (float): The seconds between heartbeats.
+        requests (Queue): The queue of messages from the pool.
+        responses (Queue): The queue of messages to the pool.
+    """
+    # NOTE: Imported here since llama_cpp.py imports this module.
+    from pygptprompt.model.llama_cpp import LlamaCppModel
+
+    model = LlamaCppModel(_worker_config(file_path, data, n_threads))
+    responses.put(("ready", 0, None))
+    Thread(target=_heartbeat, args=(responses, heartbeat_interval), daemon=True).start()
+
+    pending: Deque[WorkerMessage] = deque()
+    cancelled: Set[int] = set()
+
+    while True:
+        message = pending.popleft() if pending else requests.get()
+        if message is None:
+            return
+
+        kind, request_id, payload = message
+        if kind == "cancel":
+            cancelled.add(request_id)
+        elif kind == "chat" and request_id in cancelled:
+            cancelled.discard(request_id)
+        elif kind == "chat":
+            for delta in model.stream_chat_completion(*payload):
+                if request_id in cancelled:
+                    break
+                responses.put(("delta", request_id, delta))
+                _drain(requests, pending, cancelled)
+            cancelled.discard(request_id)
+            responses.put(("end", request_id, None))
+        elif kind == "embed":
+            try:
+                responses.put(("result", request_id, model.get_embedding(payload)))
+            except Exception as e:
+                responses.put(("error", request_id, str(e)))
+
+
+class LlamaCppWorker:
+    """
+    A worker process holding its own LlamaCppModel.
+
+    Args:
+        index (int): The index of the worker within the pool.
+        config (ConfigurationManager): The configuration manager instance.
+        n_threads (int): The number of threads the worker's model may use.
+        heartbeat_interval (float): The seconds between the worker's heartbeats.
+
+    Attributes:
+        process (BaseProcess): The worker process.
+        ready (Event): Set once the worker has loaded its model.
+        last_seen (float): The monotonic time the worker last sent a message.
+        error (Optional[str]): Why the worker failed, after which its requests fail immediately.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        config: ConfigurationManager,
+        n_threads: int,
+        heartbeat_interval: float = 5.0,
+    ):
+        self.index = index
+        # NOTE: Forking a process holding a llama context is unsafe, so workers are spawned.
+        context = multiprocessing.get_context("spawn")
+        self.requests: Queue = context.Queue()
+        self.responses: Queue = context.Queue()
+        self.process: BaseProcess = context.Process(
+            target=_worker_main,
+            args=(
+                config.file_path,
+                config.get_data(),
+                n_threads,
+                heartbeat_interval,
+                self.requests,
+                self.responses,
+            ),
+            name=f"{self.__class__.__name__}-{index}",
+            daemon=True,
+        )
+        self.ready = Event()
+        self.last_seen = monotonic()
+        self.error: Optional[str] = None
+        self._handlers: Dict[int, WorkerHandler] = {}
+        self._lock = Lock()
+        self._running = True
+        self.process.start()
+        self._reader = Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    @property
+    def load(self) -> int:
+        """Get the number of requests in flight on the worker."""
+        return len(self._handlers)
+
+    def send(
+        self,
+        kind: str,
+        request_id: int,
+        payload: Any = None,
+        handler: Optional[WorkerHandler] = None,
+    ) -> None:
+        """
+        Send a message to the worker.
+
+        Args:
+            kind (str): The message kind: 'chat', 'embed', or 'cancel'.
+            request_id (int): The id of the request.
+            payload (Any): The messages and options, or embedding input.
+            handler (Optional[WorkerHandler]): Receives the (kind, payload) of each response to the request.
+
+        NOTE:
+            A request sent to a failed worker fails immediately.
+        """
+        with self._lock:
+            error = self.error
+            if error is None and handler is not None:
+                self._handlers[request_id] = handler
+        if error is not None:
+            if handler is not None:
+                handler("error", error)
+            return
+        self.requests.put((kind, request_id, payload))
+
+    def cancel(self, request_id: int) -> None:
+        """
+        Cancel a request if it is still in flight.
+
+        Args:
+            request_id (int): The id of the request.
+        """
+        with self._lock:
+            in_flight = self._handlers.pop(request_id, None) is not None
+        if in_flight:
+            self.requests.put(("cancel", request_id, None))
+
+    def fail(self, error: str) -> None:
+        """
+        Fail every request in flight on the worker, and any request sent to it later.
+
+        Args:
+            error (str): The error passed to the handlers.
+        """
+        with self._lock:
+            self.error = error
+            handlers, self._handlers = self._handlers, {}
+        for handler in handlers.values():
+            handler("error", error)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the worker, terminating it if it does not exit within the timeout.
+
+        Args:
+            timeout (float): The seconds to wait for the worker to exit.
+        """
+        self._running = False
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self._reader.join(timeout)
+
+    def _read(self) -> None:
+        """Dispatch the worker's responses to the handlers of their requests."""
+        while self._running:
+            try:
+                kind, request_id, payload = self.responses.get(timeout=1.0)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            self.last_seen = monotonic()
+            if kind == "ready":
+                self.ready.set()
+                continue
+            if kind == "heartbeat":
+                continue
+
+            with self._lock:
+                if kind in ("end", "result", "error"):
+                    handler = self._handlers.pop(request_id, None)
+                else:
+                    handler = self._handlers.get(request_id)
+            if handler is not None:
+                handler(kind, payload)
+
+
+class LlamaCppWorkerPool:
+    """
+    A pool of worker processes, each holding a LlamaCppModel.
+
+    A llama context generates one completion at a time, and the GIL keeps
+    threads from helping. The pool runs one model per process instead; the
+    workers map the same model file, so the weights are shared through the
+    page cache. Requests naming a session are routed to the worker chosen by a
+    stable hash of the session name, so the worker's context keeps the
+    session's prompt prefix evaluated between turns. Other requests go to the
+    least loaded worker.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        n_workers (Optional[int]): The number of workers. Defaults to `llama_cpp.workers.count`.
+
+    Attributes:
+        n_workers (int): The number of workers.
+        n_threads (int): The number of threads each worker's model may use.
+        workers (List[LlamaCppWorker]): The workers by index.
+        respawns (int): The number of workers replaced after exiting or becoming unresponsive.
+
+    NOTE:
+        Workers send a heartbeat every `llama_cpp.workers.health_interval`
+        seconds, even while busy. A worker that exits, or sends nothing for
+        `llama_cpp.workers.health_timeout` seconds after loading, is replaced
+        after a backoff, and its requests in flight fail. The backoff starts at
+        `llama_cpp.workers.respawn_backoff` seconds and doubles with every
+        worker that exits before loading its model. After
+        `llama_cpp.workers.max_respawns` such failures in a row, the worker is
+        not replaced and its requests fail, e.g. when the model is missing.
+    """
+
+    def __init__(self, config: ConfigurationManager, n_workers: Optional[int] = None):
+        self.config = config
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.n_workers = max(
+            1, n_workers or config.get_value("llama_cpp.workers.count", 1)
+        )
+        # NOTE: Splitting the cores between workers avoids oversubscribing the CPU.
+        self.n_threads = config.get_value(
+            "llama_cpp.workers.n_threads", max(1, CPU_COUNT // self.n_workers)
+        )
+        self.health_interval = config.get_value(
+            "llama_cpp.workers.health_interval", 5.0
+        )
+        self.health_timeout = config.get_value("llama_cpp.workers.health_timeout", 60.0)
+        self.respawn_backoff = config.get_value(
+            "llama_cpp.workers.respawn_backoff", 1.0
+        )
+        self.max_respawns = config.get_value("llama_cpp.workers.max_respawns", 5)
+        self.respawns = 0
+        # NOTE: Failures to load count per worker index, and reset once a worker loads.
+        self._failures = [0] * self.n_workers
+        self._respawn_at: Dict[int, float] = {}
+        self._request_ids = itertools.count(1)
+        self._lock = Lock()
+        self.workers: List[LlamaCppWorker] = [
+            self._spawn(index) for index in range(self.n_workers)
+        ]
+        self._closed = Event()
+        self._monitor = Thread(
+            target=self._check_health, name=self.__class__.__name__, daemon=True
+        )
+        self._monitor.start()
+
+    def route(self, session_name: Optional[str] = None) -> LlamaCppWorker:
+        """
+        Get the worker for a session.
+
+        Args:
+            session_name (Optional[str]): The session name. Defaults to None.
+
+        Returns:
+            LlamaCppWorker: The session's worker, or the least loaded worker without a session.
+
+        NOTE:
+            Python's `hash` is salted per process, so sessions are hashed with
+            blake2b to keep their worker stable across restarts.
+        """
+        with self._lock:
+            if session_name:
+                digest = hashlib.blake2b(session_name.encode("utf-8"), digest_size=8)
+                return self.workers[int(digest.hexdigest(), 16) % self.n_workers]
+            return min(
+                self.workers, key=lambda worker: (worker.error is not None, worker.load)
+            )
+
+    def submit(
+        self,
+        kind: str,
+        payload: Any,
+        handler: WorkerHandler,
+        session_name: Optional[str] = None,
+    ) -> Callable[[], None]:
+        """
+        Submit a request to a worker.
+
+        Args:
+            kind (str): The request kind: 'chat' or 'embed'.
+            payload (Any): The chat completion messages and options, or embedding input.
+            handler (WorkerHandler): Receives the (kind, payload) of each response: 'delta'
+                events followed by 'end' for chats, 'result' for embeddings, or 'error'.
+            session_name (Optional[str]): The session the request belongs to. Defaults to None.
+
+        Returns:
+            Callable[[], None]: Cancels the request.
+        """
+        worker = self.route(session_name)
+        request_id = next(self._request_ids)
+        worker.send(kind, request_id, payload, handler)
+        return lambda: worker.cancel(request_id)
+
+    def stats(self) -> Dict[str, Union[int, List[Dict[str, Any]]]]:
+        """
+        Get the state of the workers for monitoring.
+
+        Returns:
+            Dict[str, Union[int, List[Dict[str, Any]]]]: The respawn count, and the pid,
+                readiness, requests in flight, and error of each worker.
+        """
+        return {
+            "respawns": self.respawns,
+            "workers": [
+                {
+                    "pid": worker.process.pid,
+                    "ready": worker.ready.is_set(),
+                    "load": worker.load,
+                    "error": worker.error,
+                }
+                for worker in self.workers
+            ],
+        }
+
+    def close(self) -> None:
+        """Stop the health checks and the workers."""
+        self._closed.set()
+        self._monitor.join()
+        for worker in self.workers:
+            worker.fail("Worker pool closed")
+            worker.stop()
+
+    def _spawn(self, index: int) -> LlamaCppWorker:
+        """Start a worker process."""
+        return LlamaCppWorker(index, self.config, self.n_threads, self.health_interval)
+
+    def _check_health(self) -> None:
+        """Replace the workers that exited or stopped responding, backing off on failures."""
+        while not self._closed.wait(self.health_interval):
+            now = monotonic()
+            for index, worker in enumerate(self.workers):
+                if worker.error is not None:
+                    if now >= self._respawn_at.get(index, float("inf")):
+                        del self._respawn_at[index]
+                        with self._lock:
+                            self.workers[index] = self._spawn(index)
+                        self.respawns += 1
+                    continue
+
+                if not worker.process.is_alive():
+                    reason = f"exited with code {worker.process.exitcode}"
+                elif (
+                    worker.ready.is_set()
+                    and now - worker.last_seen > self.health_timeout
+                ):
+                    reason = f"did not respond for {self.health_timeout} seconds"
+                else:
+                    continue
+
+                if worker.ready.is_set():
+                    self._failures[index] = 0
+                else:
+                    self._failures[index] += 1
+                failures = self._failures[index]
+
+                if failures > self.max_respawns:
+                    self.logger.error(
+                        f"Worker {index} {reason}; giving up after "
+                        f"{failures} attempts to load the model"
+                    )
+                    worker.fail(f"Worker {index} could not load the model: {reason}")
+                    worker.stop()
+                    continue
+
+                delay = self.respawn_backoff * 2 ** max(0, failures - 1)
+                self.logger.error(
+                    f"Worker {index} {reason}; respawning in {delay:.1f} seconds"
+                )
+                worker.fail(f"Worker {index} {reason}")
+                worker.stop()
+                self._respawn_at[index] = now + delay
@@ -4,23 +4,25 @@ pygptprompt/model/openai.py
 "Embrace the journey of discovery and evolution in the world of software development, and remember that adaptability is key to staying resilient in the face of change."
     - OpenAI's GPT-3.5
 """
-import sys
-from typing import Any, Dict, Iterator, List, Tuple, Union
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
-import openai
-from llama_cpp import ChatCompletionChunk
 from tiktoken import Encoding, encoding_for_model
 
+from pygptprompt import CPU_COUNT
 from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.model.base import (
+    AsyncChatModel,
+    ChatCompletionAccumulator,
     ChatModel,
+    ChatModelDelta,
     ChatModelEmbedding,
     ChatModelEncoding,
     ChatModelResponse,
     ChatModelTextCompletion,
-    DeltaContent,
-    FunctionCall,
 )
+from pygptprompt.model.openai_client import OpenAIClient
+from pygptprompt.storage.completion_cache import CompletionCache
 
 
 class OpenAIModel(ChatModel):
@@ -32,6 +34,9 @@ class OpenAIModel(ChatModel):
 
     Attributes:
         config (ConfigurationManager): The configuration manager instance.
+        encoding (Encoding): The tiktoken encoding for the configured chat model.
+        client (OpenAIClient): The rate limited client, shared with AsyncOpenAIModel.
+        completion_cache (Optional[CompletionCache]): The cache of deterministic completions, if enabled.
     """
 
     def __init__(self, config: ConfigurationManager):
@@ -43,186 +48,269 @@ class OpenAIModel(ChatModel):
         """
         self.config = config
         self.logger = config.get_logger("general", self.__class__.__name__)
-        openai.api_key = config.get_environment()
+        self.client = OpenAIClient(config, config.get_environment(), self.count_tokens)
+        self.completion_cache = CompletionCache.from_config(config, self.logger)
+        # NOTE: Resolving an encoding is expensive, so it is resolved once
+        # per model name and rebuilt only when the configured model changes.
+        self._encoding: Optional[Encoding] = None
+        self._encoding_model: Optional[str] = None
+
+    @property
+    def model_id(self) -> str:
+        """
+        Get an identifier for the model used to encode text.
 
-    def _extract_content(self, delta: DeltaContent, content: str) -> str:
+        Returns:
+            str: The name of the chat completions model.
         """
-        Extracts content from the given delta and appends it to the existing content.
+        return self.config.get_value("openai.chat_completions.model", "gpt-3.5-turbo")
 
-        Args:
-            delta (DeltaContent): The delta object containing new content.
-            content (str): The existing content.
+    @property
+    def encoding(self) -> Encoding:
+        """
+        Get the tiktoken encoding for the configured chat model.
 
         Returns:
-            str: The updated content after appending the new token.
+            Encoding: The cached encoding, rebuilt if the configured model changed.
         """
-        self.logger.debug("Entering _extract_content method.")
-        self.logger.debug(f"Initial delta: {delta}, content: {content}")
+        model_name = self.model_id
+        if self._encoding is None or self._encoding_model != model_name:
+            self.logger.debug(f"Resolving tiktoken encoding for {model_name}")
+            self._encoding = encoding_for_model(model_name=model_name)
+            self._encoding_model = model_name
+        return self._encoding
+
+    def get_completion(self, prompt: str) -> ChatModelTextCompletion:
+        """
+        Get completions from the OpenAI language models.
 
-        if delta and "content" in delta and delta["content"]:
-            token = delta["content"]
-            print(token, end="")
-            sys.stdout.flush()
-            content += token
-        return content
+        Raises:
+            NotImplementedError: This method is not implemented in the OpenAIAPI class.
+        """
+        raise NotImplementedError
 
-    def _extract_function_call(
+    def _chat_completion_params(
         self,
-        delta: DeltaContent,
-        function_call_name: str,
-        function_call_args: str,
-    ) -> Tuple[str, str]:
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
-        Extracts function call information from the given delta and updates the function call name and arguments.
+        Get the parameters for a streamed chat completion request.
 
         Args:
-            delta (DeltaContent): The delta object containing function call information.
-            function_call_name (str): The existing function call name.
-            function_call_args (str): The existing function call arguments.
+            messages (List[ChatModelResponse]): The list of chat completion messages.
+            options (Optional[Dict[str, Any]]): Overrides of the parameters. Defaults to None.
 
         Returns:
-            Tuple[str, str]: A tuple containing the updated function call name and arguments.
+            Dict[str, Any]: The request parameters set by `openai.chat_completions` and the overrides.
         """
-        self.logger.debug("Entering _extract_function_call method.")
-        self.logger.debug(
-            f"Initial delta: {delta}, "
-            f"function_call_name: {function_call_name}, "
-            f"function_call_args: {function_call_args}, "
+        params = dict(
+            messages=messages,
+            functions=self.config.get_value("function.definitions", []),
+            function_call=self.config.get_value("function.call", "auto"),
+            model=self.config.get_value(
+                "openai.chat_completions.model", "gpt-3.5-turbo"
+            ),
+            temperature=self.config.get_value(
+                "openai.chat_completions.temperature", 0.8
+            ),
+            max_tokens=self.config.get_value(
+                "openai.chat_completions.max_tokens", 1024
+            ),
+            top_p=self.config.get_value("openai.chat_completions.top_p", 0.95),
+            n=self.config.get_value("openai.chat_completions.n", 1),
+            stop=self.config.get_value("openai.chat_completions.stop", []),
+            presence_penalty=self.config.get_value(
+                "openai.chat_completions.presence_penalty", 0
+            ),
+            frequency_penalty=self.config.get_value(
+                "openai.chat_completions.frequency_penalty", 0
+            ),
+            logit_bias=self.config.get_value("openai.chat_completions.logit_bias", {}),
+            stream=True,  # NOTE: Always coerce streaming
         )
+        params.update(options or {})
+        return params
 
-        if delta and "function_call" in delta and delta["function_call"]:
-            function_call = delta["function_call"]
-            if not function_call_name:
-                function_call_name = function_call.get("name", "")
-            function_call_args += str(function_call.get("arguments", ""))
-        return function_call_name, function_call_args
-
-    def _handle_finish_reason(
+    def stream_chat_completion(
         self,
-        finish_reason: str,
-        function_call_name: str,
-        function_call_args: str,
-        content: str,
-    ) -> ChatModelResponse:
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[ChatModelDelta]:
         """
-        Handles the finish reason and returns an ChatModelResponse.
+        Stream chat completions using the OpenAI language models.
 
         Args:
-            finish_reason (str): The finish reason from the response.
-            function_call_name (str): The function call name.
-            function_call_args (str): The function call arguments.
-            content (str): The generated content.
+            messages (List[ChatModelResponse]): The list of chat completion messages.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+            Iterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
+
+        Raises:
+            ValueError: If `messages` argument is empty or `None`.
         """
-        self.logger.debug("Entering _handle_finish_reason method.")
-        self.logger.debug(
-            f"Initial finish_reason: {finish_reason}, "
-            f"function_call_name: {function_call_name}, "
-            f"function_call_args: {function_call_args}, "
-            f"content: {content}"
+        if not messages:
+            raise ValueError("'messages' argument cannot be empty or None")
+
+        params = self._chat_completion_params(messages, options)
+        yield from self._cached_chat_completion(
+            params, partial(self._generate_chat_completion, params)
         )
 
-        if finish_reason:
-            if finish_reason == "function_call":
-                return ChatModelResponse(
-                    role="assistant",
-                    content=None,
-                    function_call=FunctionCall(
-                        name=function_call_name,
-                        arguments=function_call_args,
-                    ),
-                )
-            elif finish_reason == "stop":
-                print()  # Add newline to model output
-                sys.stdout.flush()
-                return ChatModelResponse(role="assistant", content=content)
-            else:
-                # Handle unexpected finish_reason
-                raise ValueError(f"Warning: Unexpected finish_reason '{finish_reason}'")
-
-    def _stream_chat_completion(
-        self, response_generator: Iterator[ChatCompletionChunk]
-    ) -> ChatModelResponse:
+    def _generate_chat_completion(
+        self, params: Dict[str, Any]
+    ) -> Iterator[ChatModelDelta]:
         """
-        Streams the chat completion response and handles the content and function call information.
+        Stream a chat completion generated by the OpenAI language models.
 
         Args:
-            response_generator (Iterator[ChatCompletionChunk]): An iterator of ChatCompletionChunk objects.
+            params (Dict[str, Any]): The chat completion parameters.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+            Iterator[ChatModelDelta]: The delta events, ending with a 'finish' event.
         """
-        function_call_name = None
-        function_call_args = ""
-        content = ""
+        try:
+            # Call the OpenAI API's /v1/chat/completions endpoint
+            response = self.client.create_chat_completion(params)
+            yield from self._stream_chat_completion(
+                chunk.model_dump() for chunk in response
+            )
+        except Exception as e:
+            yield self._error_delta(e)
 
-        self.logger.debug("Entering _stream_chat_completion method.")
-        self.logger.debug(
-            f"Initial function_call_name: {function_call_name}, function_call_args: {function_call_args}, content: {content}"
-        )
+    def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
+        """
+        Generate embeddings using the OpenAI language models.
 
-        for chunk in response_generator:
-            self.logger.debug(f"Processing chunk: {chunk}")
+        Args:
+            input (Union[str, List[str]]): The input text or list of texts to generate embeddings for.
 
-            delta = chunk["choices"][0]["delta"]
-            content = self._extract_content(delta, content)
-            function_call_name, function_call_args = self._extract_function_call(
-                delta, function_call_name, function_call_args
-            )
+        Returns:
+            ChatModelEmbedding (List[List[float]]): The generated embedding vector.
 
-            self.logger.debug(f"Extracted delta: {delta}")
-            self.logger.debug(f"Current content: {content}")
-            self.logger.debug(
-                f"Current function_call_name: {function_call_name}, function_call_args: {function_call_args}"
-            )
+        Raises:
+            ValueError: If the 'input' argument is empty or None.
 
-            finish_reason = chunk["choices"][0]["finish_reason"]
-            self.logger.debug(f"Finish reason: {finish_reason}")
+        NOTE:
+            Inputs are packed into batches sent concurrently within the rate limits.
+        """
+        if not input:
+            raise ValueError("'input' argument cannot be empty or None")
 
-            message = self._handle_finish_reason(
-                finish_reason,
-                function_call_name,
-                function_call_args,
-                content,
+        try:
+            # Call the OpenAI API's /v1/embeddings endpoint
+            return self.client.create_embedding(
+                [input] if isinstance(input, str) else input
             )
+        except Exception as e:
+            self.logger.error(f"Error generating embeddings: {e}")
+            return []
 
-            self.logger.debug(f"Generated message: {message}")
+    def get_encoding(self, text: str) -> ChatModelEncoding:
+        """
+        Get the token encoding for a single text using the OpenAI language model.
 
-            if message:  # NOTE: Exit early if a finish reason is given.
-                self.logger.debug(f"Returning message: {message}")
-                return message
+        Args:
+            text (str): The input text to encode.
 
-        # NOTE: The finish reason should be present.
-        # If the finish reason vanishes, then something unexpected happened.
-        self.logger.debug(f"Generated content: {content}")
-        self.logger.debug("Exiting _stream_chat_completion without a finish_reason.")
-        # NOTE: There is no message, but content is always generated.
-        # Return the generated content even though no finish reason was given.
-        return ChatModelResponse(role="assistant", content=content)
+        Returns:
+            ChatModelEncoding (List[int]): The token encoding for the given text.
 
-    def get_completion(self, prompt: str) -> ChatModelTextCompletion:
+        Raises:
+            ValueError: If the 'text' argument is empty or None.
         """
-        Get completions from the OpenAI language models.
+        if not text:
+            raise ValueError("'text' argument cannot be empty or None")
+
+        return self.encoding.encode(text=text)
+
+    def get_encodings(self, texts: List[str]) -> List[ChatModelEncoding]:
+        """
+        Get the token encodings for a batch of texts using the OpenAI language model.
+
+        Args:
+            texts (List[str]): The input texts to encode.
+
+        Returns:
+            List[ChatModelEncoding] (List[List[int]]): The token encodings, in the same order as the texts.
 
         Raises:
-            NotImplementedError: This method is not implemented in the OpenAIAPI class.
+            ValueError: If the 'texts' argument is empty or None.
+
+        NOTE:
+            tiktoken encodes batches in a thread pool, releasing the GIL, so large transcripts are encoded in parallel.
         """
-        raise NotImplementedError
+        if not texts:
+            raise ValueError("'texts' argument cannot be empty or None")
+
+        return self.encoding.encode_batch(
+            texts,
+            num_threads=self.config.get_value("openai.encoding.num_threads", CPU_COUNT),
+        )
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens for a batch of texts using the OpenAI language model.
+
+        Args:
+            texts (List[str]): The input texts to count.
+
+        Returns:
+            List[int]: The number of tokens for each text, in the same order as the texts.
+
+        Raises:
+            ValueError: If the 'texts' argument is empty or None.
+        """
+        return [len(encoding) for encoding in self.get_encodings(texts)]
+
+
+class AsyncOpenAIModel(AsyncChatModel):
+    """
+    AsyncChatModel class for interacting with the OpenAI language models.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        model (Optional[OpenAIModel]): The synchronous model used for tokenization.
+
+    Attributes:
+        config (ConfigurationManager): The configuration manager instance.
+        model (OpenAIModel): The synchronous model used for tokenization.
+        client (OpenAIClient): The rate limited client of the synchronous model.
+
+    NOTE:
+        A single client is shared by every request, so concurrent sessions reuse
+        its pooled HTTP connections and rate limits instead of each their own.
+    """
 
-    def get_chat_completion(
+    def __init__(
+        self, config: ConfigurationManager, model: Optional[OpenAIModel] = None
+    ):
+        self.config = config
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.model = model or OpenAIModel(config)
+        self.client = self.model.client
+
+    async def stream_chat_completion(
         self,
         messages: List[ChatModelResponse],
-    ) -> ChatModelResponse:
+        session_name: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[ChatModelDelta]:
         """
-        Generate chat completions using the OpenAI language models.
+        Stream chat completions using the OpenAI language models.
 
         Args:
             messages (List[ChatModelResponse]): The list of chat completion messages.
+            session_name (Optional[str]): The session the conversation belongs to. Unused.
+            options (Optional[Dict[str, Any]]): Overrides of the configured chat completion
+                parameters, e.g. 'temperature', 'max_tokens', or 'stop'. Defaults to None.
 
         Returns:
-            ChatModelResponse (Dict[LiteralString, str]): The model's response as a message.
+            AsyncIterator[ChatModelDelta]: The content and function call events as they are generated,
+                followed by a single 'finish' event holding the complete message.
 
         Raises:
             ValueError: If `messages` argument is empty or `None`.
@@ -231,40 +319,22 @@ class OpenAIModel(ChatModel):
             raise ValueError("'messages' argument cannot be empty or None")
 
         try:
-            # Call the OpenAI API's /v1/chat/completions endpoint
-            response = openai.ChatCompletion.create(
-                messages=messages,
-                functions=self.config.get_value("function.definitions", []),
-                function_call=self.config.get_value("function.call", "auto"),
-                model=self.config.get_value(
-                    "openai.chat_completions.model", "gpt-3.5-turbo"
-                ),
-                temperature=self.config.get_value(
-                    "openai.chat_completions.temperature", 0.8
-                ),
-                max_tokens=self.config.get_value(
-                    "openai.chat_completions.max_tokens", 1024
-                ),
-                top_p=self.config.get_value("openai.chat_completions.top_p", 0.95),
-                n=self.config.get_value("openai.chat_completions.n", 1),
-                stop=self.config.get_value("openai.chat_completions.stop", []),
-                presence_penalty=self.config.get_value(
-                    "openai.chat_completions.presence_penalty", 0
-                ),
-                frequency_penalty=self.config.get_value(
-                    "openai.chat_completions.frequency_penalty", 0
-                ),
-                logit_bias=self.config.get_value(
-                    "openai.chat_completions.logit_bias", {}
-                ),
-                stream=True,  # NOTE: Always coerce streaming
+            response = await self.client.acreate_chat_completion(
+                self.model._chat_completion_params(messages, options)
             )
-            return self._stream_chat_completion(response)
+            accumulator = ChatCompletionAccumulator(self.model._handle_finish_reason)
+
+            async for chunk in response:
+                for delta in accumulator.update(chunk.model_dump()):
+                    yield delta
+                if accumulator.finish_reason:
+                    break
+
+            yield accumulator.finish()
         except Exception as e:
-            self.logger.error(f"Error generating chat completions: {e}")
-            return ChatModelResponse(role="assistant", content=str(e))
+            yield self.model._error_delta(e)
 
-    def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
+    async def get_embedding(self, input: Union[str, List[str]]) -> ChatModelEmbedding:
         """
         Generate embeddings using the OpenAI language models.
 
@@ -272,7 +342,7 @@ class OpenAIModel(ChatModel):
             input (Union[str, List[str]]): The input text or list of texts to generate embeddings for.
 
         Returns:
-            ChatModelEmbedding (List[List[float]]): The generated embedding vector.
+            ChatModelEmbedding (List[List[float]]): The generated embedding vectors.
 
         Raises:
             ValueError: If the 'input' argument is empty or None.
@@ -281,43 +351,13 @@ class OpenAIModel(ChatModel):
             raise ValueError("'input' argument cannot be empty or None")
 
         try:
-            # Call the OpenAI API's /v1/embeddings endpoint
-            embedding: Dict[str, Any] = openai.Embedding.create(
-                input=input,
-                model=self.config.get_value(
-                    "openai.embedding.model", "text-embedding-ada-002"
-                ),
-            )
-            sorted_embeddings: List[Dict[str, Any]] = sorted(
-                embedding["data"],
-                key=lambda e: e["index"],
+            return await self.client.acreate_embedding(
+                [input] if isinstance(input, str) else input
             )
-            # Return Embedding Vectors as List[float]
-            return [result["embedding"] for result in sorted_embeddings]
         except Exception as e:
             self.logger.error(f"Error generating embeddings: {e}")
             return []
 
-    def get_encoding(self, text: str) -> ChatModelEncoding:
-        """
-        Get the token encoding for a single text using the OpenAI language model.
-
-        Args:
-            text (str): The input text to encode.
-
-        Returns:
-            ChatModelEncoding (List[int]): The token encoding for the given text.
-
-        Raises:
-            ValueError: If the 'text' argument is empty or None.
-        """
-        if not text:
-            raise ValueError("'text' argument cannot be empty or None")
-
-        encoding: Encoding = encoding_for_model(
-            model_name=self.config.get_value(
-                "openai.chat_completions.model", "gpt-3.5-turbo"
-            )
-        )
-
-        return encoding.encode(text=text)
+    async def close(self) -> None:
+        """Close the pooled connections of the async client."""
+        await self.client.aclose()
@@ -0,0 +1,332 @@
+"""
+pygptprompt/model/openai_client.py
+"""
+import asyncio
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import openai
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelEmbedding
+
+T = TypeVar("T")
+
+# NOTE: A batch is composed of (input texts, number of tokens in the texts).
+EmbeddingBatch = Tuple[List[str], int]
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at a per minute rate.
+
+    Reservations are granted in arrival order: a reservation larger than the
+    available amount drives the bucket negative, and the caller waits until
+    the deficit has been refilled.
+
+    Args:
+        per_minute (float): The capacity and refill rate per minute, where 0 is unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(0.0, float(per_minute))
+        self.available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Reserve an amount from the bucket.
+
+        Args:
+            amount (float): The amount to reserve, capped at the capacity.
+
+        Returns:
+            float: The seconds the caller must wait before using the reservation.
+        """
+        if not self.capacity:
+            return 0.0
+
+        rate = self.capacity / 60.0
+        with self._lock:
+            now = time.monotonic()
+            self.available = min(
+                self.capacity, self.available + (now - self._updated) * rate
+            )
+            self._updated = now
+            self.available -= min(amount, self.capacity)
+            return max(0.0, -self.available / rate)
+
+
+class OpenAIClient:
+    """
+    A rate limited OpenAI client shared by the synchronous and async models.
+
+    Requests reserve one request and their estimated tokens from the
+    `requests_per_minute` and `tokens_per_minute` buckets before they are sent.
+    Rate limited (429), server (5xx), and connection errors are retried with
+    full jitter exponential backoff, waiting at least as long as the
+    `Retry-After` header asks. Embedding inputs are packed into batches of at
+    most `openai.embedding.batch_size` inputs and `openai.embedding.batch_tokens`
+    tokens, sent up to `max_concurrency` at a time.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        api_key (str): The OpenAI API key.
+        count_tokens (Callable[[List[str]], List[int]]): Counts the tokens of each text.
+
+    Attributes:
+        client (openai.OpenAI): The synchronous client.
+        async_client (openai.AsyncOpenAI): The async client.
+        requests (TokenBucket): The requests per minute budget.
+        tokens (TokenBucket): The tokens per minute budget.
+        retries (int): The number of requests retried.
+
+    NOTE:
+        The SDK's own retries are disabled so every attempt passes through the
+        buckets. Settings are read from `openai.client`, e.g. `base_url` to
+        point the client at a compatible or stub server.
+    """
+
+    def __init__(
+        self,
+        config: ConfigurationManager,
+        api_key: str,
+        count_tokens: Callable[[List[str]], List[int]],
+    ):
+        self.config = config
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.count_tokens = count_tokens
+
+        client_params = dict(
+            api_key=api_key,
+            base_url=config.get_value("openai.client.base_url", None),
+            timeout=config.get_value("openai.client.timeout", 60.0),
+            max_retries=0,
+        )
+        self.client = openai.OpenAI(**client_params)
+        self.async_client = openai.AsyncOpenAI(**client_params)
+
+        self.requests = TokenBucket(
+            config.get_value("openai.client.requests_per_minute", 3500)
+        )
+        self.tokens = TokenBucket(
+            config.get_value("openai.client.tokens_per_minute", 90000)
+        )
+        self.max_concurrency = max(
+            1, config.get_value("openai.client.max_concurrency", 8)
+        )
+        self.max_retries = config.get_value("openai.client.max_retries", 6)
+        self.backoff_base = config.get_value("openai.client.backoff_base", 0.5)
+        self.backoff_max = config.get_value("openai.client.backoff_max", 30.0)
+        self.batch_size = config.get_value("openai.embedding.batch_size", 2048)
+        # NOTE: A batch larger than a minute's token budget could never be sent on time.
+        self.batch_tokens = config.get_value("openai.embedding.batch_tokens", 100000)
+        if self.tokens.capacity:
+            self.batch_tokens = min(self.batch_tokens, int(self.tokens.capacity))
+        self.retries = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _reserve(self, n_tokens: int) -> float:
+        """Reserve a request and its tokens, returning the seconds to wait."""
+        return max(self.requests.reserve(1), self.tokens.reserve(n_tokens))
+
+    def _retry_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Get the delay before retrying a failed request.
+
+        Args:
+            attempt (int): The number of attempts that failed before this one.
+            error (Exception): The error raised by the request.
+
+        Returns:
+            Optional[float]: The seconds to wait, or None if the request must not be retried.
+        """
+        retry_after = None
+        if isinstance(error, openai.APIStatusError):
+            if error.status_code != 429 and error.status_code < 500:
+                return None
+            retry_after = error.response.headers.get("retry-after")
+        elif not isinstance(error, openai.APIConnectionError):
+            return None
+
+        if attempt >= self.max_retries:
+            return None
+
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+
+        self.retries += 1
+        self.logger.warning(f"Retrying in {delay:.2f}s after error: {error}")
+        return delay
+
+    def _call(self, request: Callable[[], T], n_tokens: int) -> T:
+        """Send a request within the budgets, retrying transient errors."""
+        for attempt in itertools.count():
+            time.sleep(self._reserve(n_tokens))
+            try:
+                return request()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def _acall(self, request: Callable[[], Awaitable[T]], n_tokens: int) -> T:
+        """Send a request within the budgets and concurrency limit, retrying transient errors."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        for attempt in itertools.count():
+            await asyncio.sleep(self._reserve(n_tokens))
+            try:
+                async with self._semaphore:
+                    return await request()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def batch_inputs(self, texts: List[str]) -> List[EmbeddingBatch]:
+        """
+        Pack embedding inputs into the fewest batches within the batch limits.
+
+        Args:
+            texts (List[str]): The input texts.
+
+        Returns:
+            List[EmbeddingBatch]: The batches and their token counts, in input order.
+        """
+        batches: List[EmbeddingBatch] = []
+        batch: List[str] = []
+        batch_tokens = 0
+
+        for text, n_tokens in zip(texts, self.count_tokens(texts)):
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + n_tokens > self.batch_tokens
+            ):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += n_tokens
+
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    def _embedding_params(self, texts: List[str]) -> Dict[str, Any]:
+        """Get the parameters of an embeddings request."""
+        return dict(
+            input=texts,
+            model=self.config.get_value(
+                "openai.embedding.model", "text-embedding-ada-002"
+            ),
+        )
+
+    def _chat_completion_tokens(self, params: Dict[str, Any]) -> int:
+        """Estimate the tokens of a chat completion: its message contents plus max_tokens."""
+        contents = [m["content"] for m in params["messages"] if m.get("content")]
+        prompt_tokens = sum(self.count_tokens(contents)) if contents else 0
+        return prompt_tokens + (params.get("max_tokens") or 0)
+
+    def create_embedding(self, texts: List[str]) -> ChatModelEmbedding:
+        """
+        Generate embeddings, sending the batches concurrently.
+
+        Args:
+            texts (List[str]): The input texts.
+
+        Returns:
+            ChatModelEmbedding (List[List[float]]): The embedding vectors, in input order.
+        """
+
+        def embed(batch: EmbeddingBatch) -> ChatModelEmbedding:
+            response = self._call(
+                lambda: self.client.embeddings.create(
+                    **self._embedding_params(batch[0])
+                ),
+                batch[1],
+            )
+            return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+        batches = self.batch_inputs(texts)
+        with ThreadPoolExecutor(min(self.max_concurrency, len(batches))) as executor:
+            return list(itertools.chain.from_iterable(executor.map(embed, batches)))
+
+    async def acreate_embedding(self, texts: List[str]) -> ChatModelEmbedding:
+        """
+        Generate embeddings, sending the batches concurrently.
+
+        Args:
+            texts (List[str]): The input texts.
+
+        Returns:
+            ChatModelEmbedding (List[List[float]]): The embedding vectors, in input order.
+        """
+
+        async def embed(batch: EmbeddingBatch) -> ChatModelEmbedding:
+            response = await self._acall(
+                lambda: self.async_client.embeddings.create(
+                    **self._embedding_params(batch[0])
+                ),
+                batch[1],
+            )
+            return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+        results = await asyncio.gather(*map(embed, self.batch_inputs(texts)))
+        return list(itertools.chain.from_iterable(results))
+
+    def create_chat_completion(self, params: Dict[str, Any]) -> Any:
+        """
+        Create a chat completion.
+
+        Args:
+            params (Dict[str, Any]): The request parameters.
+
+        Returns:
+            Any: The completion, or a stream of chunks if `stream` is set.
+
+        NOTE:
+            Only creating the completion is retried, not reading a stream.
+        """
+        return self._call(
+            lambda: self.client.chat.completions.create(**params),
+            self._chat_completion_tokens(params),
+        )
+
+    async def acreate_chat_completion(self, params: Dict[str, Any]) -> Any:
+        """
+        Create a chat completion.
+
+        Args:
+            params (Dict[str, Any]): The request parameters.
+
+        Returns:
+            Any: The completion, or an async stream of chunks if `stream` is set.
+
+        NOTE:
+            Only creating the completion is retried, not reading a stream.
+        """
+        return await self._acall(
+            lambda: self.async_client.chat.completions.create(**params),
+            self._chat_completion_tokens(params),
+        )
+
+    def close(self) -> None:
+        """Close the pooled connections of the synchronous client."""
+        self.client.close()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the async client."""
+        await self.async_client.close()
@@ -0,0 +1,226 @@
+"""
+pygptprompt/model/registry.py
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from logging import Logger
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pygptprompt.model.base import ChatModel
+from pygptprompt.pattern.logger import get_default_logger
+from pygptprompt.pattern.singleton import Singleton
+
+# NOTE: A key is composed of (provider, digest of the model and load parameters).
+ModelRegistryKey = Tuple[str, str]
+
+
+@dataclass
+class ModelRegistryEntry:
+    """
+    A loaded model tracked by the registry.
+
+    Attributes:
+        model (ChatModel): The shared model instance.
+        references (int): The number of holders that have not released the model.
+        resident_size (int): The estimated memory held by the model in bytes.
+    """
+
+    model: ChatModel
+    references: int = 0
+    resident_size: int = 0
+
+
+class ModelRegistry(Singleton):
+    """
+    A process-wide registry of loaded models shared by every holder.
+
+    Loading a model is expensive: a llama.cpp model maps gigabytes of weights
+    and allocates its own KV cache. The registry loads each distinct model
+    once, hands the same instance to every holder, and counts references so
+    idle models can be evicted, least recently used first, and closed when the
+    resident size of all models exceeds `max_memory`.
+
+    Args:
+        max_memory (int): The memory budget in bytes. Defaults to 0 (unbounded).
+        logger (Optional[Logger]): The logger instance. Defaults to a default logger.
+
+    Attributes:
+        loads (int): The number of models loaded.
+        hits (int): The number of acquisitions served by a loaded model.
+        evictions (int): The number of idle models evicted to respect max_memory.
+
+    NOTE:
+        Models are loaded while holding the registry lock, so concurrent
+        acquisitions of the same model can never load it twice.
+    """
+
+    def __init__(self, max_memory: int = 0, logger: Optional[Logger] = None):
+        super(ModelRegistry, self).__init__()
+        self._max_memory = max(0, max_memory)
+        self._entries: OrderedDict[ModelRegistryKey, ModelRegistryEntry] = OrderedDict()
+        self._lock = Lock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = get_default_logger(self.__class__.__name__)
+
+    def __len__(self) -> int:
+        """Get the number of loaded models."""
+        return len(self._entries)
+
+    @property
+    def max_memory(self) -> int:
+        """
+        Get the memory budget in bytes, where 0 is unbounded.
+
+        Returns:
+            int: The memory budget.
+        """
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, value: int) -> None:
+        """
+        Set the memory budget, evicting idle models if necessary.
+
+        Args:
+            value (int): The new memory budget in bytes, where 0 is unbounded.
+        """
+        with self._lock:
+            self._max_memory = max(0, value)
+            self._evict()
+
+    @property
+    def resident_size(self) -> int:
+        """
+        Get the estimated memory held by all loaded models.
+
+        Returns:
+            int: The total resident size in bytes.
+        """
+        return sum(entry.resident_size for entry in self._entries.values())
+
+    @staticmethod
+    def make_key(provider: str, params: Any) -> ModelRegistryKey:
+        """
+        Create a registry key for a model.
+
+        Args:
+            provider (str): The provider of the chat model, e.g. 'llama_cpp'.
+            params (Any): JSON serializable parameters identifying the model and how it
+                is loaded, e.g. the repo id, filename, local path, and context size.
+
+        Returns:
+            ModelRegistryKey (Tuple[str, str]): The registry key.
+        """
+        serialized = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+        return provider, digest
+
+    def acquire(
+        self, key: ModelRegistryKey, load: Callable[[], ChatModel]
+    ) -> ChatModel:
+        """
+        Get the model for a key, loading it on first use.
+
+        Args:
+            key (ModelRegistryKey): The registry key.
+            load (Callable[[], ChatModel]): Loads the model if it is not loaded.
+
+        Returns:
+            ChatModel: The shared model instance. Release it once it is no longer used.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                model = load()
+                entry = ModelRegistryEntry(model, resident_size=model.resident_size)
+                self._entries[key] = entry
+                self.loads += 1
+                self._logger.info(
+                    f"Loaded {key[0]} model ({entry.resident_size} bytes resident)"
+                )
+            else:
+                self.hits += 1
+
+            entry.references += 1
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry.model
+
+    def release(self, model: ChatModel) -> None:
+        """
+        Release a model acquired from the registry, evicting idle models if over budget.
+
+        Args:
+            model (ChatModel): The model to release.
+        """
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.model is model:
+                    entry.references = max(0, entry.references - 1)
+                    self._entries.move_to_end(key)
+                    break
+            self._evict()
+
+    def clear(self) -> None:
+        """Drop all loaded models and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.loads = 0
+            self.hits = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Union[int, List[Dict[str, Any]]]]:
+        """
+        Get the registry counters and loaded models for monitoring.
+
+        Returns:
+            Dict[str, Union[int, List[Dict[str, Any]]]]: The counters, memory use, and the
+                provider, references, and resident size of each model, least recently used first.
+        """
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "resident_size": self.resident_size,
+                "max_memory": self._max_memory,
+                "models": [
+                    {
+                        "provider": provider,
+                        "references": entry.references,
+                        "resident_size": entry.resident_size,
+                    }
+                    for (provider, _), entry in self._entries.items()
+                ],
+            }
+
+    def _evict(self) -> None:
+        """Evict the least recently used idle models until the registry fits max_memory."""
+        if not self._max_memory:
+            return
+
+        for key, entry in list(self._entries.items()):
+            if self.resident_size <= self._max_memory:
+                return
+            if entry.references == 0:
+                del self._entries[key]
+                entry.model.close()
+                self.evictions += 1
+                self._logger.info(
+                    f"Evicted idle {key[0]} model ({entry.resident_size} bytes)"
+                )
+
+        if self.resident_size > self._max_memory:
+            self._logger.warning(
+                f"Models in use hold {self.resident_size} bytes, "
+                f"exceeding the budget of {self._max_memory} bytes"
+            )
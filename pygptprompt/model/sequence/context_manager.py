@@ -1,10 +1,16 @@
 """
 pygptprompt/model/sequence/context.py
 """
-from typing import Optional
+from pathlib import Path
+from typing import List, Optional
 
 from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.log import JSONListLog
 from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.model.sequence.eviction_policy import (
+    EvictionPolicy,
+    create_eviction_policy,
+)
 from pygptprompt.model.sequence.sequence_manager import SequenceManager
 from pygptprompt.storage.chroma import ChromaVectorStore
 
@@ -29,6 +35,7 @@ class ContextWindowManager(SequenceManager):
         list_template (JSONListTemplate): The template for working with JSON lists.
         token_manager (ContextWindowTokenManager): The token manager for handling chat tokens.
         sequence (List[ChatModelResponse]): The list of ChatModelResponse objects.
+        eviction_policy (EvictionPolicy): The policy selecting messages to evict, set by `<provider>.context.policy`.
 
     Properties:
         system_message (ChatModelResponse): The system message at the beginning of the sequence.
@@ -41,6 +48,9 @@ class ContextWindowManager(SequenceManager):
         _append_single_message(message): Append a single ChatModelResponse to the sequence.
         _append_multiple_messages(messages): Append multiple ChatModelResponse objects to the sequence.
         enqueue(message): Add a ChatModelResponse or a list of them to the sequence.
+        dequeue(): Dequeue the oldest message following the system message.
+        dequeue_many(count): Dequeue the given number of oldest messages following the system message.
+        evict(indices): Evict the messages at the given indices.
     """
 
     def __init__(
@@ -54,6 +64,32 @@ class ContextWindowManager(SequenceManager):
         super().__init__(file_path, provider, config, chat_model)
 
         self.vector_store = vector_store
+        self.eviction_policy: EvictionPolicy = create_eviction_policy(provider, config)
+
+    def _create_log(
+        self, file_path: str, config: ConfigurationManager
+    ) -> Optional[JSONListLog]:
+        """
+        Create the session log the context window is appended to on save.
+
+        Args:
+            file_path (str): The file path to the JSON file used to store chat completion data.
+            config (ConfigurationManager): The configuration manager for accessing settings and configurations.
+
+        Returns:
+            Optional[JSONListLog]: The session log if `app.session.storage` is "jsonl", otherwise None.
+        """
+        if self.storage != "jsonl":
+            return None
+
+        return JSONListLog(
+            file_path=str(Path(file_path).with_suffix(".jsonl")),
+            fsync=config.get_value("app.session.fsync", "always"),
+            fsync_interval=config.get_value("app.session.fsync_interval", 1.0),
+            compact_ratio=config.get_value("app.session.compact_ratio", 2.0),
+            compact_min_size=config.get_value("app.session.compact_min_size", 2**16),
+            logger=self.logger,
+        )
 
     @property
     def reserved_upper_bound(self) -> int:
@@ -77,23 +113,54 @@ class ContextWindowManager(SequenceManager):
         messages into vectors and storing them in the vector store if embedding is enabled.
 
         Returns:
-            None
+            ChatModelResponse: The dequeued message.
+        """
+        return self.dequeue_many(1)[0]
+
+    def dequeue_many(self, count: int) -> List[ChatModelResponse]:
+        """
+        Dequeues the given number of oldest messages from the context window.
+
+        The system message is always preserved. The messages are removed in a single pass
+        and, if embedding is enabled, added to the vector store as a single batch.
+
+        Args:
+            count (int): The number of messages to dequeue.
+
+        Returns:
+            List[ChatModelResponse]: The dequeued messages, oldest first.
+        """
+        return self.evict(list(range(1, min(1 + count, len(self)))))
+
+    def evict(self, indices: List[int]) -> List[ChatModelResponse]:
+        """
+        Evicts the messages at the given indices from the context window.
+
+        The messages are removed in a single pass and, if embedding is enabled,
+        added to the vector store as a single batch.
+
+        Args:
+            indices (List[int]): The indices of the messages to evict, in ascending order.
+
+        Returns:
+            List[ChatModelResponse]: The evicted messages, oldest first.
         """
-        dequeued_message = self.sequence.pop(1)
+        evicted_messages = self._pop_indices(indices)
 
         # Embedding messages is optional and is set by the user at runtime.
-        if self.vector_store is not None:
-            self.vector_store.add_message_to_collection(dequeued_message)
+        if self.vector_store is not None and evicted_messages:
+            self.vector_store.add_messages_to_collection(evicted_messages)
 
-        return dequeued_message
+        return evicted_messages
 
     def _append_single_message(self, message: ChatModelResponse) -> None:
         """
         Appends a single message to the context window.
 
         This method appends a single message to the context window. It checks the token size
-        to determine if the message causes a chat sequence overflow and dequeues the oldest
-        message if necessary.
+        to determine if the message causes a chat sequence overflow and evicts the messages
+        selected by the eviction policy. The message is tokenized once and the cached token
+        counts of the existing sequence are reused for the overflow check.
 
         Args:
             message (ChatModelResponse): The message to append to the context window.
@@ -101,6 +168,26 @@ class ContextWindowManager(SequenceManager):
         Returns:
             None
         """
-        if self.token_manager.causes_chat_sequence_overflow(message, self.sequence):
-            self.dequeue()
-        self.sequence.append(message)
+        token_count = self.token_manager.calculate_chat_message_length(message)
+
+        if self.token_manager.causes_token_count_overflow(
+            token_count, self.token_count
+        ):
+            self.evict(
+                self.eviction_policy.select(
+                    self.sequence,
+                    self.token_counts,
+                    token_count,
+                    self.token_manager.upper_bound - self.token_manager.offset,
+                )
+            )
+
+        if self.token_manager.causes_token_count_overflow(
+            token_count, self.token_count
+        ):
+            self.logger.warning(
+                f"Message with {token_count} tokens overflows the context window "
+                f"after evicting messages with the {self.eviction_policy.__class__.__name__}."
+            )
+
+        self._push_message(message, token_count)
@@ -0,0 +1,318 @@
+"""
+pygptprompt/model/sequence/eviction_policy.py
+"""
+from math import ceil
+from typing import Dict, List, Protocol
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelResponse
+
+
+class EvictionPolicy(Protocol):
+    """
+    Interface for selecting which messages are evicted from a context window.
+
+    A policy is consulted only when a new message would overflow the context window.
+    The first message is the system message and is never selected for eviction.
+
+    Ordered policies free tokens in multiples of `<provider>.context.eviction_chunk`,
+    when set. Evicting larger chunks less often keeps the history following the
+    system message unchanged for longer, maximizing reuse of the evaluated prompt
+    prefix by llama.cpp. Setting the chunk to `llama_cpp.model.n_batch` is a good start.
+
+    Args:
+        provider (str): The provider or source of chat completions.
+        config (ConfigurationManager): The configuration manager for accessing settings and configurations.
+
+    Methods:
+        select(sequence, token_counts, token_count, token_limit): Select the indices of the messages to evict.
+    """
+
+    def __init__(self, provider: str, config: ConfigurationManager):
+        self._provider = provider
+        self._config = config
+
+    @property
+    def eviction_chunk(self) -> int:
+        """
+        The number of tokens that evictions are rounded up to. Disabled when 0.
+
+        Returns:
+            int: The eviction chunk size in tokens.
+        """
+        return self._config.get_value(
+            f"{self._provider}.context.eviction_chunk", default=0
+        )
+
+    def select(
+        self,
+        sequence: List[ChatModelResponse],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        """
+        Select the messages to evict so that the new message fits within the token limit.
+
+        Args:
+            sequence (List[ChatModelResponse]): The messages within the context window.
+            token_counts (List[int]): The token count for each message, aligned by index with the sequence.
+            token_count (int): The number of tokens in the new message.
+            token_limit (int): The exclusive upper limit for the total number of tokens.
+
+        Returns:
+            List[int]: The indices of the messages to evict, in ascending order.
+        """
+        raise NotImplementedError
+
+    def _evict_in_order(
+        self,
+        candidates: List[int],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        """
+        Evict candidates in the given order until the new message fits.
+
+        Args:
+            candidates (List[int]): The indices of the messages that may be evicted, in order of eviction.
+            token_counts (List[int]): The token count for each message.
+            token_count (int): The number of tokens in the new message.
+            token_limit (int): The exclusive upper limit for the total number of tokens.
+
+        Returns:
+            List[int]: The indices of the messages to evict, in ascending order.
+        """
+        total_token_count = sum(token_counts) + token_count
+        # NOTE: The number of tokens to free to fall below the exclusive limit.
+        required = total_token_count - token_limit + 1
+        if required <= 0:
+            return []
+
+        if self.eviction_chunk > 0:
+            required = ceil(required / self.eviction_chunk) * self.eviction_chunk
+
+        freed = 0
+        evictions = []
+
+        for index in candidates:
+            if freed >= required:
+                break
+            freed += token_counts[index]
+            evictions.append(index)
+
+        return sorted(evictions)
+
+
+class FIFOEvictionPolicy(EvictionPolicy):
+    """
+    Evicts the oldest messages first.
+    """
+
+    def select(
+        self,
+        sequence: List[ChatModelResponse],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        candidates = list(range(1, len(sequence)))
+        return self._evict_in_order(candidates, token_counts, token_count, token_limit)
+
+
+class PinRecentEvictionPolicy(EvictionPolicy):
+    """
+    Evicts the oldest messages first while pinning the most recent turns.
+
+    A turn begins with a user message and includes every message that follows it.
+    The number of pinned turns is set by `<provider>.context.pinned_turns`.
+    """
+
+    @property
+    def pinned_turns(self) -> int:
+        """
+        The number of most recent turns that are never evicted.
+
+        Returns:
+            int: The number of pinned turns.
+        """
+        return self._config.get_value(
+            f"{self._provider}.context.pinned_turns", default=2
+        )
+
+    def select(
+        self,
+        sequence: List[ChatModelResponse],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        pinned_from = len(sequence)
+        turns = 0
+
+        for index in range(len(sequence) - 1, 0, -1):
+            if turns >= self.pinned_turns:
+                break
+            pinned_from = index
+            if sequence[index]["role"] == "user":
+                turns += 1
+
+        candidates = list(range(1, pinned_from))
+        return self._evict_in_order(candidates, token_counts, token_count, token_limit)
+
+
+class FunctionFirstEvictionPolicy(EvictionPolicy):
+    """
+    Evicts function results first, then the oldest remaining messages.
+
+    Function results are typically the largest messages within a context window
+    and are rarely referenced again once the assistant has responded to them.
+    """
+
+    def select(
+        self,
+        sequence: List[ChatModelResponse],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        functions = [
+            i for i in range(1, len(sequence)) if sequence[i]["role"] == "function"
+        ]
+        others = [
+            i for i in range(1, len(sequence)) if sequence[i]["role"] != "function"
+        ]
+        return self._evict_in_order(
+            functions + others, token_counts, token_count, token_limit
+        )
+
+
+class KnapsackEvictionPolicy(EvictionPolicy):
+    """
+    Keeps the most valuable messages that fit within the token budget.
+
+    Each message is valued by its role weight, decayed by its age in messages,
+    and a 0/1 knapsack selects the messages to keep. Token counts are quantized
+    to `<provider>.context.knapsack_resolution` units, rounding up, so the
+    selection always fits within the budget.
+    """
+
+    @property
+    def role_weights(self) -> Dict[str, float]:
+        """
+        The value of a message by role.
+
+        Returns:
+            Dict[str, float]: A mapping of roles to weights.
+        """
+        return self._config.get_value(
+            f"{self._provider}.context.role_weights",
+            default={"user": 1.0, "assistant": 1.0, "function": 0.5},
+        )
+
+    @property
+    def recency_decay(self) -> float:
+        """
+        The factor a message's value is multiplied by for each newer message.
+
+        Returns:
+            float: The recency decay between 0 and 1.
+        """
+        return self._config.get_value(
+            f"{self._provider}.context.recency_decay", default=0.9
+        )
+
+    @property
+    def resolution(self) -> int:
+        """
+        The number of units the token budget is quantized into.
+
+        Returns:
+            int: The knapsack resolution.
+        """
+        return self._config.get_value(
+            f"{self._provider}.context.knapsack_resolution", default=512
+        )
+
+    def select(
+        self,
+        sequence: List[ChatModelResponse],
+        token_counts: List[int],
+        token_count: int,
+        token_limit: int,
+    ) -> List[int]:
+        if len(sequence) < 2:
+            return []
+
+        candidates = list(range(1, len(sequence)))
+        # NOTE: The budget is exclusive of the token limit.
+        budget = token_limit - 1 - token_count - token_counts[0]
+
+        if sum(token_counts[i] for i in candidates) <= budget:
+            return []
+        if budget <= 0:
+            return candidates
+
+        role_weights = self.role_weights
+        values = [
+            role_weights.get(sequence[i]["role"], 1.0)
+            * self.recency_decay ** (len(sequence) - 1 - i)
+            for i in candidates
+        ]
+
+        scale = max(1, ceil(budget / self.resolution))
+        capacity = budget // scale
+        weights = [ceil(token_counts[i] / scale) for i in candidates]
+
+        # best[c] is the highest value achievable with a capacity of c units
+        best = [0.0] * (capacity + 1)
+        keep = [[False] * (capacity + 1) for _ in candidates]
+
+        for n, (weight, value) in enumerate(zip(weights, values)):
+            for c in range(capacity, weight - 1, -1):
+                if best[c - weight] + value > best[c]:
+                    best[c] = best[c - weight] + value
+                    keep[n][c] = True
+
+        evictions = []
+        c = capacity
+        for n in range(len(candidates) - 1, -1, -1):
+            if keep[n][c]:
+                c -= weights[n]
+            else:
+                evictions.append(candidates[n])
+
+        return sorted(evictions)
+
+
+eviction_policy_map = {
+    "fifo": FIFOEvictionPolicy,
+    "pin_recent": PinRecentEvictionPolicy,
+    "function_first": FunctionFirstEvictionPolicy,
+    "knapsack": KnapsackEvictionPolicy,
+}
+
+
+def create_eviction_policy(
+    provider: str, config: ConfigurationManager
+) -> EvictionPolicy:
+    """
+    Creates the eviction policy set by `<provider>.context.policy`.
+
+    Args:
+        provider (str): The provider or source of chat completions.
+        config (ConfigurationManager): The configuration manager for accessing settings and configurations.
+
+    Returns:
+        EvictionPolicy: The eviction policy instance. Defaults to FIFO.
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    policy = config.get_value(f"{provider}.context.policy", default="fifo")
+
+    if policy not in eviction_policy_map:
+        raise ValueError(f"Unknown eviction policy: {policy}")
+
+    return eviction_policy_map[policy](provider, config)
@@ -2,10 +2,13 @@
 pygptprompt/model/sequence/manager.py
 """
 
-from typing import Iterator, List, Protocol, Union
+from pathlib import Path
+from typing import Iterator, List, Optional, Protocol, Union
 
 from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.base import JSONMap
 from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.json.log import JSONListLog
 from pygptprompt.model.base import ChatModel, ChatModelResponse
 from pygptprompt.model.sequence.token_manager import TokenManager
 
@@ -29,6 +32,7 @@ class SequenceManager(Protocol):
         list_template (JSONListTemplate): The template for working with JSON lists.
         token_manager (ContextWindowTokenManager): The token manager for handling chat tokens.
         sequence (List[ChatModelResponse]): The list of ChatModelResponse objects.
+        token_counts (List[int]): The token count for each message in the sequence.
 
     Properties:
         system_message (ChatModelResponse): The system message at the beginning of the sequence.
@@ -42,8 +46,8 @@ class SequenceManager(Protocol):
         __delitem__(index): Delete a ChatModelResponse at the specified index.
         __iter__(): Get an iterator for the sequence.
         __contains__(item): Check if a ChatModelResponse is in the sequence.
-        load_to_chat_completions(): Load data from JSON into the sequence.
-        save_from_chat_completions(): Save the sequence to JSON.
+        load_to_chat_completions(): Load the saved sequence.
+        save_from_chat_completions(): Save the sequence to the session log or JSON.
         _append_single_message(message): Append a single ChatModelResponse to the sequence.
         _append_multiple_messages(messages): Append multiple ChatModelResponse objects to the sequence.
         enqueue(message): Add a ChatModelResponse or a list of them to the sequence.
@@ -62,12 +66,46 @@ class SequenceManager(Protocol):
 
         self._sequence = []
 
+        # NOTE: Token counts are tracked in parallel with the sequence
+        # so that messages are only ever tokenized once.
+        self._token_counts: List[int] = []
+        self._token_total: int = 0
+
         self._token_manager = TokenManager(
             provider=provider, config=config, chat_model=chat_model
         )
 
         self._list_template = JSONListTemplate(file_path=file_path, logger=self.logger)
 
+        # NOTE: The operations since the last save are appended to the session log,
+        # or None if the whole sequence must be written on the next save.
+        self._journal: Optional[List[JSONMap]] = None
+
+        self.storage = config.get_value("app.session.storage", "json")
+        if self.storage not in ("json", "jsonl", "sqlite"):
+            raise ValueError(f"Unknown session storage: {self.storage}")
+
+        self._log: Optional[JSONListLog] = self._create_log(file_path, config)
+
+    def _create_log(
+        self, file_path: str, config: ConfigurationManager
+    ) -> Optional[JSONListLog]:
+        """
+        Create the session log the sequence is appended to on save.
+
+        Args:
+            file_path (str): The file path to the JSON file used to store chat completion data.
+            config (ConfigurationManager): The configuration manager for accessing settings and configurations.
+
+        Returns:
+            Optional[JSONListLog]: The session log, or None if the sequence is saved as JSON.
+
+        NOTE:
+            Subclasses which append to a session log override this method. SQLite
+            sessions are saved by the session manager and never use a session log.
+        """
+        return None
+
     def __len__(self) -> int:
         """Get the length of the sequence."""
         return len(self._sequence)
@@ -78,11 +116,16 @@ class SequenceManager(Protocol):
 
     def __setitem__(self, index: int, value: ChatModelResponse):
         """Set a ChatModelResponse at the specified index."""
+        index = range(len(self._sequence))[index]
+        token_count = self._token_manager.calculate_chat_message_length(value)
         self._sequence[index] = value
+        self._record({"op": "set", "index": index, "message": value})
+        self._token_total += token_count - self._token_counts[index]
+        self._token_counts[index] = token_count
 
     def __delitem__(self, index: int):
         """Delete a ChatModelResponse at the specified index."""
-        del self._sequence[index]
+        self._pop_message(index)
 
     def __iter__(self) -> Iterator[ChatModelResponse]:
         """Get an iterator for the sequence."""
@@ -92,6 +135,49 @@ class SequenceManager(Protocol):
         """Check if a ChatModelResponse is in the sequence."""
         return item in self._sequence
 
+    @property
+    def file_path(self) -> Path:
+        """
+        Get the path to the file used to store the sequence.
+
+        Returns:
+            Path: The path to the session log, or the JSON file if the sequence has no session log.
+        """
+        if self._log is not None:
+            return self._log.file_path
+        return self._list_template.file_path
+
+    @property
+    def journal(self) -> Optional[List[JSONMap]]:
+        """
+        Get the operations on the sequence since the last save.
+
+        Returns:
+            Optional[List[JSONMap]]: The operations as session log records, or None if
+                the whole sequence must be written on the next save.
+        """
+        return self._journal
+
+    def reset_journal(self, saved: bool) -> None:
+        """
+        Start recording operations after a save.
+
+        Args:
+            saved (bool): Whether the save succeeded. Otherwise, the whole sequence is written on the next save.
+        """
+        self._journal = [] if saved and self.storage != "json" else None
+
+    def set_sequence(self, messages: List[ChatModelResponse]) -> None:
+        """
+        Replace the sequence with saved messages.
+
+        Args:
+            messages (List[ChatModelResponse]): The messages, as they are saved.
+        """
+        self._sequence = messages
+        self._recount_tokens()
+        self.reset_journal(saved=True)
+
     @property
     def sequence(self) -> List[ChatModelResponse]:
         """
@@ -105,6 +191,16 @@ class SequenceManager(Protocol):
         """
         return self._sequence
 
+    @property
+    def token_counts(self) -> List[int]:
+        """
+        Get the token count for each message in the sequence.
+
+        Returns:
+            List[int]: The token counts, aligned by index with the sequence.
+        """
+        return self._token_counts
+
     @property
     def token_manager(self) -> TokenManager:
         """
@@ -122,8 +218,11 @@ class SequenceManager(Protocol):
 
         Returns:
             int: The total number of tokens.
+
+        NOTE:
+            The total is maintained incrementally and never re-tokenizes the sequence.
         """
-        return self._token_manager.calculate_chat_sequence_length(self._sequence)
+        return self._token_total
 
     @property
     def system_message(self) -> ChatModelResponse:
@@ -151,41 +250,177 @@ class SequenceManager(Protocol):
             # Check the role of the first message
             if self._sequence[0]["role"] == "system":
                 # Replace the existing system message
-                self._sequence[0] = value
+                self[0] = value
             else:
                 # Insert a new system message at the beginning
+                token_count = self._token_manager.calculate_chat_message_length(value)
                 self._sequence.insert(0, value)
+                self._token_counts.insert(0, token_count)
+                self._token_total += token_count
+                self._record({"op": "insert", "index": 0, "message": value})
         else:
             # If the sequence is empty, add the system message
-            self._sequence.append(value)
+            self._append_single_message(value)
+
+    def _recount_tokens(self) -> None:
+        """
+        Recalculate the token count for every message in the sequence.
+
+        NOTE:
+            This is only required when the sequence is replaced as a whole, e.g. when loading from JSON.
+        """
+        self._token_counts = self._token_manager.calculate_chat_message_lengths(
+            self._sequence
+        )
+        self._token_total = sum(self._token_counts)
+
+    def _record(self, record: JSONMap) -> None:
+        """
+        Record an operation on the sequence to append to the session log on the next save.
+
+        Args:
+            record (JSONMap): The operation, as a session log record.
+        """
+        if self._journal is not None:
+            self._journal.append(record)
+
+    def _push_message(self, message: ChatModelResponse, token_count: int) -> None:
+        """
+        Append a ChatModelResponse with a precomputed token count to the sequence.
+
+        Args:
+            message (ChatModelResponse): The ChatModelResponse to append.
+            token_count (int): The number of tokens in the message.
+        """
+        self._sequence.append(message)
+        self._token_counts.append(token_count)
+        self._token_total += token_count
+        self._record({"op": "append", "message": message})
+
+    def _pop_message(self, index: int) -> ChatModelResponse:
+        """
+        Remove and return the ChatModelResponse at the specified index.
+
+        Args:
+            index (int): The index of the ChatModelResponse to remove.
+
+        Returns:
+            ChatModelResponse: The removed ChatModelResponse.
+        """
+        index = range(len(self._sequence))[index]
+        message = self._sequence.pop(index)
+        self._token_total -= self._token_counts.pop(index)
+        self._record({"op": "delete", "indices": [index]})
+        return message
+
+    def _pop_messages(self, start: int, stop: int) -> List[ChatModelResponse]:
+        """
+        Remove and return the ChatModelResponse objects within the given range.
+
+        Args:
+            start (int): The index of the first ChatModelResponse to remove.
+            stop (int): The index after the last ChatModelResponse to remove.
+
+        Returns:
+            List[ChatModelResponse]: The removed ChatModelResponse objects.
+
+        NOTE:
+            The messages are removed as a single slice, shifting the remaining sequence only once.
+        """
+        indices = range(len(self._sequence))[start:stop]
+        messages = self._sequence[start:stop]
+        self._token_total -= sum(self._token_counts[start:stop])
+        del self._sequence[start:stop]
+        del self._token_counts[start:stop]
+        if indices:
+            self._record({"op": "delete", "indices": list(indices)})
+        return messages
+
+    def _pop_indices(self, indices: List[int]) -> List[ChatModelResponse]:
+        """
+        Remove and return the ChatModelResponse objects at the given indices.
+
+        Args:
+            indices (List[int]): The indices of the ChatModelResponse objects to remove, in ascending order.
+
+        Returns:
+            List[ChatModelResponse]: The removed ChatModelResponse objects.
+
+        NOTE:
+            Contiguous indices are removed as a single slice; otherwise the sequence is rebuilt in a single pass.
+        """
+        if not indices:
+            return []
+
+        if indices[-1] - indices[0] + 1 == len(indices):
+            return self._pop_messages(indices[0], indices[-1] + 1)
+
+        removed = set(indices)
+        messages = [self._sequence[index] for index in indices]
+        self._token_total -= sum(self._token_counts[index] for index in indices)
+        self._sequence = [
+            message for i, message in enumerate(self._sequence) if i not in removed
+        ]
+        self._token_counts = [
+            count for i, count in enumerate(self._token_counts) if i not in removed
+        ]
+        self._record({"op": "delete", "indices": indices})
+        return messages
 
     def load_to_chat_completions(self) -> bool:
         """
-        Load data from JSON into the sequence.
+        Load the saved sequence.
 
         Returns:
             bool: True if loading was successful, False on error.
+
+        NOTE:
+            If no session log exists, a sequence saved as JSON is loaded instead
+            and migrated to the session log on the next save.
         """
+        if self._log is not None:
+            data = self._log.load()
+            if data:
+                self.set_sequence(data)
+                return True
+            if not self._list_template.file_path.exists():
+                return False
+
         if self._list_template.load_json():
-            self._sequence = [
-                ChatModelResponse(**message) for message in self._list_template.data
-            ]
+            # NOTE: The decoded messages are used as is rather than copied.
+            self._sequence = self._list_template.mutable()
+            self._recount_tokens()
             return True
         return False
 
     def save_from_chat_completions(self) -> bool:
         """
-        Save the sequence to JSON.
+        Save the sequence.
 
         Returns:
             bool: True if saving was successful, False on error.
+
+        NOTE:
+            With the session log, only the operations since the last save are
+            appended, so saving a turn does not rewrite the whole sequence.
         """
-        if self._sequence:
+        if not self._sequence:
+            return False
+
+        if self._log is None:
             data: List[ChatModelResponse] = [
                 dict(message) for message in self._sequence
             ]
             return self._list_template.save_json(data)
-        return False
+
+        if self._journal is None:
+            saved = self._log.write(self._sequence)
+        else:
+            saved = self._log.append(self._journal, self._sequence)
+
+        # NOTE: A failed append may leave partial records, so the next save rewrites the log.
+        self.reset_journal(saved)
+        return saved
 
     def _append_single_message(self, message: ChatModelResponse) -> None:
         """
@@ -194,7 +429,8 @@ class SequenceManager(Protocol):
         Args:
             message (ChatModelResponse): The ChatModelResponse to append.
         """
-        self._sequence.append(message)
+        token_count = self._token_manager.calculate_chat_message_length(message)
+        self._push_message(message, token_count)
 
     def _append_multiple_messages(self, messages: List[ChatModelResponse]) -> None:
         """
@@ -204,7 +440,7 @@ class SequenceManager(Protocol):
             messages (List[ChatModelResponse]): The list of ChatModelResponse objects to append.
         """
         for message in messages:
-            self.append_single_message(message)
+            self._append_single_message(message)
 
     def enqueue(
         self, message: Union[ChatModelResponse, List[ChatModelResponse]]
@@ -1,6 +1,8 @@
 """
 pygptprompt/model/sequence/session_manager.py
 """
+import hashlib
+import json
 from typing import List, Optional, Tuple
 
 from pygptprompt.config.manager import ConfigurationManager
@@ -8,6 +10,7 @@ from pygptprompt.model.base import ChatModel, ChatModelResponse
 from pygptprompt.model.sequence.context_manager import ContextWindowManager
 from pygptprompt.model.sequence.transcript_manager import TranscriptManager
 from pygptprompt.storage.chroma import ChromaVectorStore
+from pygptprompt.storage.session import SQLiteSessionStore
 
 
 class SessionManager:
@@ -18,15 +21,20 @@ class SessionManager:
         config: ConfigurationManager,
         chat_model: ChatModel,
         vector_store: Optional[ChromaVectorStore] = None,
+        persist_state: Optional[bool] = None,
     ):
         self.session_name = session_name
         self.provider = provider
         self.config = config
         self.chat_model = chat_model
         self.vector_store = vector_store
+        self._persist_state = persist_state
         self.logger = self.config.get_logger("general", self.__class__.__name__)
         self.context_window = None
         self.transcript = None
+        self.store: Optional[SQLiteSessionStore] = None
+        if config.get_value("app.session.storage", "json") == "sqlite":
+            self.store = SQLiteSessionStore(config, session_name)
 
     def _create_managers(
         self,
@@ -65,16 +73,106 @@ class SessionManager:
         )
 
         # Load or Start new session
-        if (
-            self.context_window.load_to_chat_completions()
-            and self.transcript.load_to_chat_completions()
-        ):
+        if self._load_sequences():
             self.logger.debug(f"Continuing previous session {self.session_name}")
+            if self.persist_state:
+                self.chat_model.load_context_state(
+                    self.state_path, self._context_fingerprint()
+                )
         else:
             self.logger.debug(f"Starting new session {self.session_name}")
             self.context_window.enqueue(system_prompt)
             self.transcript.enqueue(system_prompt)
 
+    def _load_sequences(self) -> bool:
+        """
+        Load the context window and transcript.
+
+        Returns:
+            bool: True if the session was loaded, False if it is new.
+
+        NOTE:
+            A session saved as JSON is migrated to the SQLite store on its next save.
+        """
+        if self.store is not None:
+            sequences = self.store.load()
+            if sequences is not None:
+                self.context_window.set_sequence(sequences[0])
+                self.transcript.set_sequence(sequences[1])
+                return True
+
+        if not (
+            self.context_window.load_to_chat_completions()
+            and self.transcript.load_to_chat_completions()
+        ):
+            return False
+
+        if self.store is not None:
+            self.logger.info(f"Migrating session {self.session_name} to SQLite")
+            self.context_window.reset_journal(saved=False)
+            self.transcript.reset_journal(saved=False)
+        return True
+
+    def _save_sequences(self) -> bool:
+        """
+        Save the context window and transcript.
+
+        Returns:
+            bool: True if saving was successful, False on error.
+        """
+        if self.store is None:
+            return (
+                self.context_window.save_from_chat_completions()
+                and self.transcript.save_from_chat_completions()
+            )
+
+        saved = self.store.save(
+            self.transcript.sequence,
+            self.transcript.journal,
+            self.context_window.sequence,
+            self.context_window.journal,
+        )
+        self.transcript.reset_journal(saved)
+        self.context_window.reset_journal(saved)
+        return saved
+
+    @property
+    def persist_state(self) -> bool:
+        """
+        Whether the model's evaluated context state is saved and restored with the session.
+
+        Returns:
+            bool: The `persist_state` argument if given, otherwise the value of
+                `<provider>.session.persist_state`. Defaults to False.
+        """
+        if self._persist_state is not None:
+            return self._persist_state
+        return self.config.get_value(f"{self.provider}.session.persist_state", False)
+
+    @property
+    def state_path(self) -> str:
+        """
+        Get the path to the model's context state file for this session.
+
+        Returns:
+            str: The path to `{session}_kv.bin` within `app.sessions`.
+        """
+        return f"{self.config.evaluate_path('app.sessions')}/{self.session_name}_kv.bin"
+
+    def _context_fingerprint(self) -> str:
+        """
+        Get a digest of the messages in the context window.
+
+        Returns:
+            str: The digest, which matches the saved state if the context window is unchanged since.
+
+        NOTE:
+            The digest is computed from the messages rather than the saved file,
+            which is rewritten when the session log is compacted.
+        """
+        serialized = json.dumps(list(self.context_window), sort_keys=True)
+        return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
     @property
     def system_message(self) -> ChatModelResponse:
         return self.context_window.system_message
@@ -93,10 +191,15 @@ class SessionManager:
         self._initialize_managers(system_prompt=system_prompt)
 
     def save(self) -> bool:
-        return (
-            self.context_window.save_from_chat_completions()
-            and self.transcript.save_from_chat_completions()
-        )
+        saved = self._save_sequences()
+
+        # NOTE: The state is tied to the saved context window by its digest.
+        if saved and self.persist_state:
+            self.chat_model.save_context_state(
+                self.state_path, self._context_fingerprint()
+            )
+
+        return saved
 
     def enqueue(self, message: ChatModelResponse) -> None:
         self.context_window.enqueue(message=message)
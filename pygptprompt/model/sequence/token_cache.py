@@ -0,0 +1,144 @@
+"""
+pygptprompt/model/sequence/token_cache.py
+"""
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from pygptprompt.pattern.singleton import Singleton
+
+# NOTE: A key is composed of (provider, model id, digest of the serialized text).
+TokenCacheKey = Tuple[str, str, str]
+
+
+class TokenCountCache(Singleton):
+    """
+    A process-wide, size-bounded LRU cache of token counts.
+
+    The context window and transcript each own a TokenManager, and both are
+    handed the same messages. Sharing a single cache between them ensures a
+    message is only tokenized once per model, no matter how many sequences
+    it is appended to.
+
+    Args:
+        max_size (int): The maximum number of token counts to retain. Defaults to 8192.
+
+    Attributes:
+        hits (int): The number of lookups that were served from the cache.
+        misses (int): The number of lookups that were not found in the cache.
+        evictions (int): The number of entries evicted to respect max_size.
+    """
+
+    def __init__(self, max_size: int = 8192):
+        super(TokenCountCache, self).__init__()
+        self._max_size = max(0, max_size)
+        self._cache: OrderedDict[TokenCacheKey, int] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Get the number of cached token counts."""
+        return len(self._cache)
+
+    @property
+    def max_size(self) -> int:
+        """
+        Get the maximum number of token counts retained by the cache.
+
+        Returns:
+            int: The maximum cache size.
+        """
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value: int) -> None:
+        """
+        Set the maximum cache size, evicting the least recently used entries if necessary.
+
+        Args:
+            value (int): The new maximum cache size.
+        """
+        with self._lock:
+            self._max_size = max(0, value)
+            self._evict()
+
+    @staticmethod
+    def make_key(provider: str, model_id: str, text: str) -> TokenCacheKey:
+        """
+        Create a cache key for the given text.
+
+        Args:
+            provider (str): The provider of the chat model.
+            model_id (str): The identifier of the model the text is tokenized with.
+            text (str): The serialized text.
+
+        Returns:
+            TokenCacheKey (Tuple[str, str, str]): The cache key.
+        """
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return provider, model_id, digest
+
+    def get(self, key: TokenCacheKey) -> Optional[int]:
+        """
+        Get the cached token count for the given key.
+
+        Args:
+            key (TokenCacheKey): The cache key.
+
+        Returns:
+            Optional[int]: The token count, or None if the key is not cached.
+        """
+        with self._lock:
+            token_count = self._cache.get(key)
+            if token_count is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return token_count
+
+    def set(self, key: TokenCacheKey, token_count: int) -> None:
+        """
+        Cache the token count for the given key.
+
+        Args:
+            key (TokenCacheKey): The cache key.
+            token_count (int): The number of tokens.
+        """
+        with self._lock:
+            self._cache[key] = token_count
+            self._cache.move_to_end(key)
+            self._evict()
+
+    def clear(self) -> None:
+        """Clear all cached token counts and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters for monitoring.
+
+        Returns:
+            Dict[str, int]: The hits, misses, evictions, current size, and maximum size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "max_size": self._max_size,
+            }
+
+    def _evict(self) -> None:
+        """Evict the least recently used entries until the cache fits max_size."""
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
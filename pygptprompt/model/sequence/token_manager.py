@@ -6,6 +6,7 @@ from typing import List
 
 from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.model.sequence.token_cache import TokenCountCache
 
 
 class TokenManager:
@@ -16,6 +17,7 @@ class TokenManager:
         _provider (str): The provider or source of the chat session.
         _config (ConfigurationManager): The configuration manager for chat settings.
         _model (ChatModel): The chat model used for processing messages.
+        _cache (TokenCountCache): The process-wide cache of token counts.
     """
 
     def __init__(
@@ -35,6 +37,19 @@ class TokenManager:
         self._provider = provider
         self._config = config
         self._model = chat_model
+        self._cache = TokenCountCache(
+            max_size=config.get_value("app.token_cache.max_size", 8192)
+        )
+
+    @property
+    def cache(self) -> TokenCountCache:
+        """
+        Get the process-wide cache of token counts.
+
+        Returns:
+            TokenCountCache: The token count cache.
+        """
+        return self._cache
 
     @property
     def reserve(self) -> float:
@@ -133,18 +148,56 @@ class TokenManager:
 
         Returns:
             int: The number of tokens in the input text sequence after tokenization.
+
+        NOTE:
+            Token counts are cached by provider, model, and text digest.
         """
-        return len(self._model.get_encoding(text=text))
+        key = self._cache.make_key(self._provider, self._model.model_id, text)
+        token_count = self._cache.get(key)
 
-    def calculate_chat_message_length(self, message: ChatModelResponse) -> int:
+        if token_count is None:
+            token_count = len(self._model.get_encoding(text=text))
+            self._cache.set(key, token_count)
+
+        return token_count
+
+    def calculate_text_sequence_lengths(self, texts: List[str]) -> List[int]:
         """
-        Returns the number of tokens in a given message.
+        Count the number of tokens within each of the given text sequences.
 
         Args:
-            message (ChatModelResponse): The message to process.
+            texts (List[str]): The input text sequences.
 
         Returns:
-            int: The number of tokens in the message.
+            List[int]: The number of tokens in each text sequence, in the same order as the texts.
+
+        NOTE:
+            Cached counts are reused and the remaining texts are counted in a single batch.
+        """
+        model_id = self._model.model_id
+        keys = [self._cache.make_key(self._provider, model_id, text) for text in texts]
+        token_counts = [self._cache.get(key) for key in keys]
+        missing = [
+            i for i, token_count in enumerate(token_counts) if token_count is None
+        ]
+
+        if missing:
+            counted = self._model.count_tokens([texts[i] for i in missing])
+            for i, token_count in zip(missing, counted):
+                token_counts[i] = token_count
+                self._cache.set(keys[i], token_count)
+
+        return token_counts
+
+    def serialize_chat_message(self, message: ChatModelResponse) -> str:
+        """
+        Serialize a message into the text sequence used to count its tokens.
+
+        Args:
+            message (ChatModelResponse): The message to serialize.
+
+        Returns:
+            str: The serialized message.
         """
         sequence: str = ""
 
@@ -156,7 +209,42 @@ class TokenManager:
                     value_str = str(value)
                 sequence += " " + key + " " + value_str
 
-        return self.calculate_text_sequence_length(sequence.strip())
+        return sequence.strip()
+
+    def calculate_chat_message_length(self, message: ChatModelResponse) -> int:
+        """
+        Returns the number of tokens in a given message.
+
+        Args:
+            message (ChatModelResponse): The message to process.
+
+        Returns:
+            int: The number of tokens in the message.
+
+        NOTE:
+            The message is serialized before being counted, so identical messages share a cached count.
+        """
+        return self.calculate_text_sequence_length(self.serialize_chat_message(message))
+
+    def calculate_chat_message_lengths(
+        self,
+        messages: List[ChatModelResponse],
+    ) -> List[int]:
+        """
+        Returns the number of tokens in each of the given messages.
+
+        Args:
+            messages (List[ChatModelResponse]): The list of messages.
+
+        Returns:
+            List[int]: The number of tokens in each message, in the same order as the messages.
+        """
+        if not messages:
+            return []
+
+        return self.calculate_text_sequence_lengths(
+            [self.serialize_chat_message(message) for message in messages]
+        )
 
     def calculate_chat_sequence_length(
         self,
@@ -171,12 +259,7 @@ class TokenManager:
         Returns:
             int: The total number of tokens in the list of messages.
         """
-        total_tokens: int = 0
-
-        for message in messages:
-            total_tokens += self.calculate_chat_message_length(message)
-
-        return total_tokens
+        return sum(self.calculate_chat_message_lengths(messages))
 
     def causes_chat_sequence_overflow(
         self,
@@ -195,6 +278,28 @@ class TokenManager:
         """
         new_message_token_count = self.calculate_chat_message_length(new_message)
         messages_total_token_count = self.calculate_chat_sequence_length(messages)
-        token_count = new_message_token_count + messages_total_token_count
+        return self.causes_token_count_overflow(
+            new_message_token_count, messages_total_token_count
+        )
+
+    def causes_token_count_overflow(
+        self,
+        new_message_token_count: int,
+        sequence_token_count: int,
+    ) -> bool:
+        """
+        Check if adding a new message will cause the sequence to overflow using precomputed token counts.
+
+        Args:
+            new_message_token_count (int): The number of tokens in the new message.
+            sequence_token_count (int): The total number of tokens in the existing sequence.
+
+        Returns:
+            bool: True if the sequence will overflow, False otherwise.
+
+        NOTE:
+            This avoids re-tokenizing messages that have already been counted.
+        """
+        token_count = new_message_token_count + sequence_token_count
         total_token_count = self.offset + token_count
         return total_token_count >= self.upper_bound
@@ -1,7 +1,11 @@
 """
 pygptprompt/model/sequence/transcript.py
 """
+from pathlib import Path
+from typing import Optional
+
 from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.segments import JSONSegmentedList
 from pygptprompt.model.base import ChatModel
 from pygptprompt.model.sequence.sequence_manager import SequenceManager
 
@@ -11,6 +15,9 @@ class TranscriptManager(SequenceManager):
     A class for managing transcripts of chat completions.
 
     This class provides methods for loading and saving chat completion data to/from JSON files.
+    With the "jsonl" session storage, the transcript is saved in fixed-size segments, so
+    continuing a session reads only the transcript's index and token counts. Older messages
+    are paged in when they are accessed, e.g. when iterating over the transcript.
 
     Args:
         file_path (str): The file path to the JSON file used to store chat completion data.
@@ -29,8 +36,8 @@ class TranscriptManager(SequenceManager):
         token_count (int): The total count of tokens in the sequence.
 
     Methods:
-        load_to_chat_completions(): Load data from JSON into the sequence.
-        save_from_chat_completions(): Save the sequence to JSON.
+        load_to_chat_completions(): Load the saved sequence.
+        save_from_chat_completions(): Save the sequence to segments or JSON.
         _append_single_message(message): Append a single ChatModelResponse to the sequence.
         _append_multiple_messages(messages): Append multiple ChatModelResponse objects to the sequence.
         enqueue(message): Add a ChatModelResponse or a list of them to the sequence.
@@ -53,3 +60,91 @@ class TranscriptManager(SequenceManager):
             chat_model (ChatModel): The chat model used for managing chat completions.
         """
         super().__init__(file_path, provider, config, chat_model)
+
+        # NOTE: Saved token counts are only valid for the model which counted them.
+        self._tokenizer = f"{provider}:{chat_model.model_id}"
+        self._segments: Optional[JSONSegmentedList] = None
+
+        if self.storage == "jsonl":
+            self._segments = JSONSegmentedList(
+                directory=str(Path(file_path).with_suffix("")),
+                segment_size=config.get_value("app.session.segment_size", 256),
+                cache_size=config.get_value("app.session.cache_segments", 8),
+                fsync=config.get_value("app.session.fsync", "always") != "never",
+                logger=self.logger,
+                # NOTE: Stands in for messages of a damaged segment. Its role is not
+                # a chat role, so it is never taken for a system prompt or sent to a model.
+                placeholder={
+                    "role": "unavailable",
+                    "content": "[Message lost: unreadable transcript]",
+                },
+            )
+            self._sequence = self._segments
+
+    @property
+    def file_path(self) -> Path:
+        """
+        Get the path used to store the sequence.
+
+        Returns:
+            Path: The directory of the segments, or the file used by the other session storages.
+        """
+        if self._segments is not None:
+            return self._segments.directory
+        return super().file_path
+
+    def load_to_chat_completions(self) -> bool:
+        """
+        Load the saved sequence.
+
+        Returns:
+            bool: True if loading was successful, False on error.
+
+        NOTE:
+            Only the index and token counts of the segments are read. A transcript
+            saved as a session log or JSON is loaded in full and migrated to
+            segments on the next save.
+        """
+        if self._segments is None:
+            return super().load_to_chat_completions()
+
+        if self._segments.directory.exists():
+            token_counts = self._segments.load()
+            if token_counts:
+                self._sequence = self._segments
+                if self._segments.metadata.get("tokenizer") == self._tokenizer:
+                    self._token_counts = token_counts
+                    self._token_total = sum(token_counts)
+                else:
+                    self._recount_tokens()
+                    self._segments.replace(list(self._segments))
+                return True
+
+        if not super().load_to_chat_completions():
+            return False
+        self._segments.replace(list(self._sequence))
+        self._sequence = self._segments
+        return True
+
+    def save_from_chat_completions(self) -> bool:
+        """
+        Save the sequence.
+
+        Returns:
+            bool: True if saving was successful, False on error.
+
+        NOTE:
+            With segments, new messages are appended to the last segment and
+            only the segments holding modified messages are rewritten.
+        """
+        if self._segments is None:
+            return super().save_from_chat_completions()
+
+        if not self._sequence:
+            return False
+
+        if self._sequence is not self._segments:
+            self._segments.replace(list(self._sequence))
+            self._sequence = self._segments
+
+        return self._segments.save(self._token_counts, {"tokenizer": self._tokenizer})
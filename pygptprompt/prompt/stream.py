@@ -0,0 +1,34 @@
+"""
+pygptprompt/prompt/stream.py
+"""
+import sys
+from typing import Iterator, Optional, TextIO
+
+from pygptprompt.model.base import ChatModelDelta, ChatModelResponse
+
+
+def print_chat_completion(
+    deltas: Iterator[ChatModelDelta], file: Optional[TextIO] = None
+) -> Optional[ChatModelResponse]:
+    """
+    Print the content of a streamed chat completion as it is generated.
+
+    Args:
+        deltas (Iterator[ChatModelDelta]): The events from `ChatModel.stream_chat_completion`.
+        file (Optional[TextIO]): The stream to print to. Defaults to stdout.
+
+    Returns:
+        Optional[ChatModelResponse]: The complete message from the 'finish' event.
+    """
+    file = file or sys.stdout
+    message = None
+
+    for delta in deltas:
+        if delta["type"] == "content":
+            print(delta["content"], end="", file=file, flush=True)
+        elif delta["type"] == "finish":
+            message = delta["message"]
+            if message.get("content"):
+                print(file=file, flush=True)  # Add newline to model output
+
+    return message
@@ -0,0 +1,543 @@
+"""
+pygptprompt/server/app.py
+"""
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from aiohttp import web
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import AsyncChatModel, ChatModelDelta, ChatModelResponse
+from pygptprompt.model.sequence.session_manager import SessionManager
+from pygptprompt.server.queue import QueueFullError, RequestQueue
+
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def error_body(message: str, error_type: str) -> Dict[str, Any]:
+    """
+    Create an OpenAI style error object.
+
+    Args:
+        message (str): The error message.
+        error_type (str): The error type, e.g. 'invalid_request_error'.
+
+    Returns:
+        Dict[str, Any]: The error object.
+    """
+    return {"error": {"message": message, "type": error_type}}
+
+
+def error_response(status: int, message: str, error_type: str) -> web.Response:
+    """
+    Create an OpenAI style error response.
+
+    Args:
+        status (int): The HTTP status code.
+        message (str): The error message.
+        error_type (str): The error type, e.g. 'invalid_request_error'.
+
+    Returns:
+        web.Response: The JSON error response.
+    """
+    return web.json_response(error_body(message, error_type), status=status)
+
+
+def is_number(value: Any) -> bool:
+    """Check whether a JSON value is a number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def read_completion_options(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the sampling parameters of a chat completion request.
+
+    Args:
+        body (Dict[str, Any]): The request body.
+
+    Returns:
+        Dict[str, Any]: The 'temperature', 'top_p', 'max_tokens', and 'stop'
+            parameters the request sets, which override the configured ones.
+
+    Raises:
+        ValueError: If a parameter is invalid.
+    """
+    options: Dict[str, Any] = {}
+
+    temperature = body.get("temperature")
+    if temperature is not None:
+        if not is_number(temperature) or not 0 <= temperature <= 2:
+            raise ValueError("'temperature' must be a number between 0 and 2")
+        options["temperature"] = temperature
+
+    top_p = body.get("top_p")
+    if top_p is not None:
+        if not is_number(top_p) or not 0 <= top_p <= 1:
+            raise ValueError("'top_p' must be a number between 0 and 1")
+        options["top_p"] = top_p
+
+    max_tokens = body.get("max_tokens")
+    if max_tokens is not None:
+        if not isinstance(max_tokens, int) or isinstance(max_tokens, bool):
+            raise ValueError("'max_tokens' must be a positive integer")
+        if max_tokens < 1:
+            raise ValueError("'max_tokens' must be a positive integer")
+        options["max_tokens"] = max_tokens
+
+    stop = body.get("stop")
+    if stop is not None:
+        stop = [stop] if isinstance(stop, str) else stop
+        if not isinstance(stop, list) or not all(isinstance(s, str) for s in stop):
+            raise ValueError("'stop' must be a string or a list of strings")
+        options["stop"] = stop
+
+    return options
+
+
+async def read_json_object(request: web.Request) -> Optional[Dict[str, Any]]:
+    """
+    Read the JSON object in a request's body.
+
+    Args:
+        request (web.Request): The request.
+
+    Returns:
+        Optional[Dict[str, Any]]: The object, or None if the body is not a JSON object.
+    """
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def message_key(message: ChatModelResponse) -> Tuple[Hashable, ...]:
+    """
+    Get what identifies a message when comparing conversations.
+
+    Args:
+        message (ChatModelResponse): The message.
+
+    Returns:
+        Tuple[Hashable, ...]: The role, content, and function call of the message.
+    """
+    function_call = message.get("function_call")
+    if isinstance(function_call, dict):
+        function_call = (function_call.get("name"), function_call.get("arguments"))
+    return (message.get("role"), message.get("content") or "", function_call)
+
+
+class ChatServer:
+    """
+    Serves OpenAI compatible chat completions and embeddings from loaded models.
+
+    Models are loaded once and shared by every request. Each model has its own
+    bounded request queue, and requests naming a session are appended to the
+    session's context window and transcript. At most `server.max_sessions`
+    sessions are kept in memory; the least recently used idle sessions are
+    evicted, and loaded again from storage when they are next requested.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        models (Dict[str, AsyncChatModel]): The loaded models by provider.
+
+    Attributes:
+        default_provider (str): The provider used when a request does not name a loaded model.
+        queues (Dict[str, RequestQueue]): The request queue for each provider.
+        max_sessions (int): The number of sessions kept in memory.
+        sessions (OrderedDict[Tuple[str, str], SessionManager]): The loaded sessions by provider
+            and session id, least recently used first.
+    """
+
+    def __init__(self, config: ConfigurationManager, models: Dict[str, AsyncChatModel]):
+        self.config = config
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.models = models
+        default_provider = config.get_value("server.provider", None)
+        self.default_provider = (
+            default_provider if default_provider in models else next(iter(models))
+        )
+        self.queues = {
+            provider: RequestQueue(
+                max_size=config.get_value("server.queue_size", 64),
+                concurrency=config.get_value(f"{provider}.server.concurrency", 1),
+            )
+            for provider in models
+        }
+        self.max_sessions = max(1, config.get_value("server.max_sessions", 64))
+        self.sessions: "OrderedDict[Tuple[str, str], SessionManager]" = OrderedDict()
+        self._session_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # NOTE: The number of requests using or waiting for each session.
+        self._session_requests: Dict[Tuple[str, str], int] = {}
+
+    def create_app(self) -> web.Application:
+        """
+        Create the web application.
+
+        Returns:
+            web.Application: The application serving the OpenAI compatible routes.
+        """
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/v1/chat/completions", self.chat_completions),
+                web.post("/v1/embeddings", self.embeddings),
+                web.get("/v1/models", self.list_models),
+                web.get("/metrics", self.metrics),
+            ]
+        )
+        app.on_cleanup.append(self._close_models)
+        return app
+
+    async def _close_models(self, app: web.Application) -> None:
+        for model in self.models.values():
+            await model.close()
+
+    def _provider(self, body: Dict[str, Any]) -> str:
+        """Get the provider named by the request's model, or the default provider."""
+        model = body.get("model")
+        return model if model in self.models else self.default_provider
+
+    def _load_session(self, provider: str, session_id: str) -> SessionManager:
+        """
+        Load the session for a provider and id from storage.
+
+        NOTE:
+            The model's context state is not persisted, since the model is
+            shared by every session and generates on its own threads.
+        """
+        session = SessionManager(
+            session_name=session_id,
+            provider=provider,
+            config=self.config,
+            chat_model=self.models[provider].model,
+            persist_state=False,
+        )
+        session.load(
+            system_prompt=ChatModelResponse(
+                role=self.config.get_value(f"{provider}.system_prompt.role"),
+                content=self.config.get_value(f"{provider}.system_prompt.content"),
+            )
+        )
+        return session
+
+    async def _session(self, provider: str, session_id: str) -> SessionManager:
+        """
+        Get the session for a provider and id, loading it on first use.
+
+        NOTE:
+            The caller must hold the session's lock. Loading reads and tokenizes
+            the session, so it runs in the default executor.
+        """
+        key = (provider, session_id)
+        if key not in self.sessions:
+            self.sessions[key] = await asyncio.get_running_loop().run_in_executor(
+                None, self._load_session, provider, session_id
+            )
+        self.sessions.move_to_end(key)
+        return self.sessions[key]
+
+    def _evict_sessions(self) -> None:
+        """Evict the least recently used sessions beyond `max_sessions` which no request uses."""
+        for key in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if key not in self._session_requests:
+                del self.sessions[key]
+        for key in list(self._session_locks):
+            if key not in self.sessions and key not in self._session_requests:
+                del self._session_locks[key]
+
+    def _chunk(
+        self, completion_id: str, provider: str, delta: ChatModelDelta
+    ) -> Dict[str, Any]:
+        """Convert a delta event into an OpenAI chat completion chunk."""
+        choice: Dict[str, Any] = {"index": 0, "delta": {}, "finish_reason": None}
+        if delta["type"] == "content":
+            choice["delta"] = {"content": delta["content"]}
+        elif delta["type"] == "function_call":
+            function_call = {"arguments": delta["function_args"]}
+            if delta["function_name"]:
+                function_call["name"] = delta["function_name"]
+            choice["delta"] = {"function_call": function_call}
+        else:
+            choice["finish_reason"] = delta["finish_reason"] or "stop"
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": provider,
+            "choices": [choice],
+        }
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        """
+        Handle `POST /v1/chat/completions`.
+
+        The optional `session` field (or `X-Session-Id` header) appends the
+        request's messages to a persistent session and completes its context window.
+        """
+        body = await read_json_object(request)
+        if body is None:
+            return error_response(
+                400, "The body must be a JSON object", "invalid_request_error"
+            )
+
+        messages: List[ChatModelResponse] = body.get("messages") or []
+        if not isinstance(messages, list) or not all(
+            isinstance(message, dict) for message in messages
+        ):
+            messages = []
+        if not messages:
+            return error_response(
+                400, "'messages' must be a non-empty list", "invalid_request_error"
+            )
+
+        try:
+            options = read_completion_options(body)
+        except ValueError as e:
+            return error_response(400, str(e), "invalid_request_error")
+
+        provider = self._provider(body)
+        session_id = body.get("session") or request.headers.get("X-Session-Id")
+        # NOTE: Session ids name files within `app.sessions`.
+        if session_id and not SESSION_ID_PATTERN.fullmatch(str(session_id)):
+            return error_response(
+                400,
+                "Session ids may only contain [A-Za-z0-9_-]",
+                "invalid_request_error",
+            )
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        try:
+            async with self.queues[provider].slot():
+                if session_id:
+                    return await self._complete_session(
+                        request,
+                        body,
+                        options,
+                        provider,
+                        completion_id,
+                        session_id,
+                        messages,
+                    )
+                return await self._complete(
+                    request, body, options, provider, completion_id, messages=messages
+                )
+        except QueueFullError as e:
+            return error_response(503, str(e), "server_overloaded")
+
+    async def _complete_session(
+        self,
+        request: web.Request,
+        body: Dict[str, Any],
+        options: Dict[str, Any],
+        provider: str,
+        completion_id: str,
+        session_id: str,
+        messages: List[ChatModelResponse],
+    ) -> web.StreamResponse:
+        """Append the request's new messages to a session and complete its context window."""
+        key = (provider, session_id)
+        self._session_requests[key] = self._session_requests.get(key, 0) + 1
+        try:
+            async with self._session_locks.setdefault(key, asyncio.Lock()):
+                session = await self._session(provider, session_id)
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._enqueue_messages, session, messages
+                )
+                return await self._complete(
+                    request, body, options, provider, completion_id, session
+                )
+        finally:
+            self._session_requests[key] -= 1
+            if not self._session_requests[key]:
+                del self._session_requests[key]
+            self._evict_sessions()
+
+    def _enqueue_messages(
+        self, session: SessionManager, messages: List[ChatModelResponse]
+    ) -> None:
+        """
+        Append the request's messages which the session does not hold yet.
+
+        A system message in the request replaces the session's system message.
+
+        NOTE:
+            OpenAI clients send the whole conversation with every request. The
+            longest run of the session's latest messages which the request
+            begins with is skipped, so a conversation is stored once, while a
+            request holding only new messages appends all of them.
+        """
+        system = [m for m in messages if m.get("role") == "system"]
+        if system and message_key(system[-1]) != message_key(session.system_message):
+            session.system_message = ChatModelResponse(**system[-1])
+
+        messages = [m for m in messages if m.get("role") != "system"]
+        keys = [message_key(message) for message in messages]
+        transcript = session.transcript
+        start = max(0, len(transcript) - len(messages))
+        stored = [message_key(transcript[i]) for i in range(start, len(transcript))]
+
+        overlap = next(
+            (
+                n
+                for n in range(min(len(stored), len(keys)), 0, -1)
+                if stored[len(stored) - n :] == keys[:n]
+            ),
+            0,
+        )
+        for message in messages[overlap:]:
+            session.enqueue(ChatModelResponse(**message))
+
+    async def _complete(
+        self,
+        request: web.Request,
+        body: Dict[str, Any],
+        options: Dict[str, Any],
+        provider: str,
+        completion_id: str,
+        session: Optional[SessionManager] = None,
+        messages: Optional[List[ChatModelResponse]] = None,
+    ) -> web.StreamResponse:
+        """
+        Generate a completion, streaming it as server-sent events if requested.
+
+        NOTE:
+            A streamed completion which fails after the response has started
+            ends with an error event followed by `[DONE]`.
+        """
+        model = self.models[provider]
+        deltas = model.stream_chat_completion(
+            session.output() if session else messages,
+            session.session_name if session else None,
+            options,
+        )
+        finish: Optional[ChatModelDelta] = None
+
+        if body.get("stream"):
+            response = web.StreamResponse(
+                headers={
+                    "Content-Type": "text/event-stream",
+                    "Cache-Control": "no-cache",
+                }
+            )
+            await response.prepare(request)
+            async for delta in deltas:
+                if delta["type"] == "finish":
+                    finish = delta
+                if delta["type"] == "finish" and delta["finish_reason"] == "error":
+                    event = error_body(
+                        delta["message"].get("content") or "The completion failed",
+                        "server_error",
+                    )
+                else:
+                    event = self._chunk(completion_id, provider, delta)
+                await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+            await self._save_session(session, finish)
+            await response.write_eof()
+            return response
+
+        async for delta in deltas:
+            if delta["type"] == "finish":
+                finish = delta
+        if finish is None or finish["finish_reason"] == "error":
+            message = finish["message"].get("content") if finish else None
+            return error_response(
+                500, message or "The completion failed", "server_error"
+            )
+        await self._save_session(session, finish)
+        return web.json_response(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": provider,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": finish["message"],
+                        "finish_reason": finish["finish_reason"] or "stop",
+                    }
+                ],
+            }
+        )
+
+    def _append_completion(
+        self, session: SessionManager, message: ChatModelResponse
+    ) -> None:
+        """Append a completion to a session and save it."""
+        session.enqueue(message)
+        session.save()
+
+    async def _save_session(
+        self, session: Optional[SessionManager], finish: Optional[ChatModelDelta]
+    ) -> None:
+        """
+        Append a successful completion to its session and save it.
+
+        NOTE:
+            Called while holding the session's lock. Tokenizing and saving
+            block, so they run in the default executor.
+        """
+        if session and finish and finish["finish_reason"] != "error":
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._append_completion, session, finish["message"]
+            )
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        """Handle `POST /v1/embeddings`."""
+        body = await read_json_object(request)
+        if body is None:
+            return error_response(
+                400, "The body must be a JSON object", "invalid_request_error"
+            )
+
+        if not body.get("input"):
+            return error_response(
+                400,
+                "'input' must be a non-empty string or list",
+                "invalid_request_error",
+            )
+
+        provider = self._provider(body)
+        try:
+            async with self.queues[provider].slot():
+                embeddings = await self.models[provider].get_embedding(body["input"])
+        except QueueFullError as e:
+            return error_response(503, str(e), "server_overloaded")
+
+        return web.json_response(
+            {
+                "object": "list",
+                "model": provider,
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": list(embedding)}
+                    for i, embedding in enumerate(embeddings)
+                ],
+            }
+        )
+
+    async def list_models(self, request: web.Request) -> web.Response:
+        """Handle `GET /v1/models`."""
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {"id": provider, "object": "model", "owned_by": "pygptprompt"}
+                    for provider in self.models
+                ],
+            }
+        )
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Handle `GET /metrics` with the queue metrics of each model."""
+        return web.json_response(
+            {provider: queue.metrics() for provider, queue in self.queues.items()}
+        )
@@ -0,0 +1,95 @@
+"""
+pygptprompt/server/queue.py
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator, Dict, Union
+
+
+class QueueFullError(Exception):
+    """Raised when a request is rejected because the queue is at capacity."""
+
+
+class RequestQueue:
+    """
+    A bounded queue that admits requests to a model with limited concurrency.
+
+    Requests beyond the concurrency limit wait in the queue. Requests beyond the
+    queue size are rejected immediately so the server sheds load instead of
+    accumulating unbounded latency.
+
+    Args:
+        max_size (int): The maximum number of waiting requests.
+        concurrency (int): The maximum number of requests served at once.
+
+    Attributes:
+        waiting (int): The number of requests waiting for a slot.
+        active (int): The number of requests being served.
+        completed (int): The number of requests served.
+        rejected (int): The number of requests rejected because the queue was full.
+    """
+
+    def __init__(self, max_size: int, concurrency: int):
+        self.max_size = max(0, max_size)
+        self.concurrency = max(1, concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Wait for a slot to serve a request.
+
+        Raises:
+            QueueFullError: If the queue is at capacity.
+        """
+        if self.waiting >= self.max_size and self._semaphore.locked():
+            self.rejected += 1
+            raise QueueFullError(f"Request queue is full ({self.max_size} waiting)")
+
+        enqueued = perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = perf_counter()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            finished = perf_counter()
+            self.completed += 1
+            self._total_wait += started - enqueued
+            self._total_latency += finished - enqueued
+            self._max_latency = max(self._max_latency, finished - enqueued)
+
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """
+        Get the queue depth and latency metrics for monitoring.
+
+        Returns:
+            Dict[str, Union[int, float]]: The queue depth, request counters, and latencies in seconds.
+        """
+        completed = max(1, self.completed)
+        return {
+            "waiting": self.waiting,
+            "active": self.active,
+            "max_size": self.max_size,
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "mean_wait": self._total_wait / completed,
+            "mean_latency": self._total_latency / completed,
+            "max_latency": self._max_latency,
+        }
@@ -5,10 +5,18 @@ from datetime import datetime
 from typing import Dict, List, Optional, Union
 
 from chromadb import PersistentClient, Settings
-from chromadb.api.types import Include, OneOrMany, QueryResult, Where, WhereDocument
+from chromadb.api.types import (
+    Embeddings,
+    Include,
+    OneOrMany,
+    QueryResult,
+    Where,
+    WhereDocument,
+)
 
 from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.model.base import ChatModel, ChatModelDocument, ChatModelDocuments
+from pygptprompt.model.factory import ChatModelFactory
 from pygptprompt.storage.function import VectorStoreEmbeddingFunction
 
 
@@ -35,14 +43,18 @@ class ChromaVectorStore:
         collection_name (str): The name of the collection in the Chroma vector store.
         database_path (str): The path to the Chroma database.
         config (ConfigurationManager): The configuration manager for accessing settings and configurations.
-        chat_model (ChatModel): The chat model used for embedding messages.
+        chat_model (ChatModel): The chat model used for embedding messages if no `embedding` provider is configured.
         anonymized_telemetry (bool, optional): Whether anonymized telemetry should be enabled. Default is False.
+        metadata (Optional[Dict[str, str]], optional): The metadata of a new collection, e.g.
+            `{"hnsw:space": "cosine"}` to rank by cosine distance. Default is None.
 
     Attributes:
         collection_name (str): The name of the collection in the Chroma vector store.
         database_path (str): The path to the Chroma database.
         config (ConfigurationManager): The configuration manager for accessing settings and configurations.
-        chat_model (ChatModel): The chat model used for embedding messages.
+        chat_model (ChatModel): The chat model.
+        embedding_model (ChatModel): The model used for embedding messages, e.g. a small model from the
+            `embedding` section, or the chat model.
         anonymized_telemetry (bool): Whether anonymized telemetry is enabled.
         embedding_function (VectorStoreEmbeddingFunction): The function for embedding messages.
         chroma_client (PersistentClient): The Chroma database client.
@@ -52,8 +64,10 @@ class ChromaVectorStore:
         get_chroma_heartbeat(): Get the Chroma service timestamp.
         get_collection_count(): Get the total number of embeddings in the collection.
         add_message_to_collection(message: dict): Add a message to the collection.
+        add_messages_to_collection(messages: List[dict]): Add a batch of messages to the collection.
         upsert_to_collection(ids, metadatas, documents): Upsert documents to the collection.
         query_from_collection(query_texts, n_results, where, where_document, include): Query the collection for documents.
+        close(): Release the embedding model.
     """
 
     def __init__(
@@ -62,13 +76,18 @@ class ChromaVectorStore:
         config: ConfigurationManager,
         chat_model: ChatModel,
         anonymized_telemetry: bool = False,
+        metadata: Optional[Dict[str, str]] = None,
     ):
         # Initialize attributes
         self.collection_name = collection_name
+        self.metadata = metadata
         self.config = config
         self.chat_model = chat_model
         self.anonymized_telemetry = anonymized_telemetry
         self.database_path = config.evaluate_path("app.database.chroma")
+        self.embedding_model = None
+        self._model_factory = None
+        self._acquired_model = None
         self.embedding_function = None
         self.chroma_client = None
         self.collection = None
@@ -82,8 +101,13 @@ class ChromaVectorStore:
 
     def _initialize_components(self):
         # Initialize embedding function
+        # NOTE: A dedicated embedding model keeps vector store writes from
+        # competing with generation for the chat model's context.
+        self._model_factory = ChatModelFactory(self.config)
+        self._acquired_model = self._model_factory.create_embedding_model()
+        self.embedding_model = self._acquired_model or self.chat_model
         self.embedding_function = VectorStoreEmbeddingFunction(
-            chat_model=self.chat_model, logger=self.logger
+            chat_model=self.embedding_model, logger=self.logger
         )
 
         # Initialize Chroma client
@@ -98,6 +122,7 @@ class ChromaVectorStore:
         try:
             self.collection = self.chroma_client.create_collection(
                 name=self.collection_name,
+                metadata=self.metadata,
                 embedding_function=self.embedding_function,
             )
             self.logger.debug(f"Created collection {self.collection_name}")
@@ -108,6 +133,19 @@ class ChromaVectorStore:
             )
             self.logger.debug(f"Loaded collection {self.collection_name}")
 
+    def close(self) -> None:
+        """
+        Release the embedding model, so the registry may evict it once idle.
+
+        NOTE:
+            The embedding model holds a registry reference even when it shares
+            the chat model's instance. Falling back to the chat model takes no
+            reference, so the chat model is left to its owner.
+        """
+        if self._acquired_model is not None:
+            self._model_factory.release_model(self._acquired_model)
+            self._acquired_model = None
+
     def get_chroma_heartbeat(self) -> int:
         """
         Get the Chroma service timestamp.
@@ -146,11 +184,42 @@ class ChromaVectorStore:
             f"Added message to collection {self.collection_name} with ID {unique_id}"
         )
 
+    def add_messages_to_collection(self, messages: List[dict]):
+        """
+        Add a batch of messages to the collection.
+
+        Messages without content, such as function calls, are skipped.
+
+        Args:
+            messages (List[dict]): The messages to be added to the collection.
+        """
+        messages = [message for message in messages if message.get("content")]
+
+        if not messages:
+            return
+
+        timestamp = datetime.utcnow().isoformat()
+        unique_ids = [
+            f"{self.collection_name}_{timestamp}_{index}"
+            for index in range(len(messages))
+        ]
+
+        self.collection.add(
+            ids=unique_ids,
+            documents=[message["content"] for message in messages],
+            metadatas=[{"role": message["role"]} for message in messages],
+        )
+
+        self.logger.debug(
+            f"Added {len(messages)} messages to collection {self.collection_name}"
+        )
+
     def upsert_to_collection(
         self,
         ids: Union[str, List[str]],
         metadatas: Union[Dict[str, str], List[Dict[str, str]]],
         documents: Union[ChatModelDocument, ChatModelDocuments],
+        embeddings: Optional[Embeddings] = None,
     ):
         """
         Upsert documents to the collection.
@@ -161,11 +230,14 @@ class ChromaVectorStore:
             ids (Union[str, List[str]]): The IDs of the documents to upsert.
             metadatas (Union[Dict[str, str], List[Dict[str, str]]]): The metadata of the documents.
             documents (Union[ChatModelDocument, ChatModelDocuments]): The documents to upsert.
+            embeddings (Optional[Embeddings]): The embeddings of the documents, if already computed.
+                Default is None, embedding the documents.
         """
         self.collection.upsert(
             ids=ids,
             metadatas=metadatas,
             documents=documents,
+            embeddings=embeddings,
         )
 
         self.logger.debug(
@@ -175,6 +247,7 @@ class ChromaVectorStore:
     def query_from_collection(
         self,
         query_texts: Optional[OneOrMany[ChatModelDocument]] = None,
+        query_embeddings: Optional[Embeddings] = None,
         n_results: int = 10,
         where: Optional[Where] = None,
         where_document: Optional[WhereDocument] = None,
@@ -185,6 +258,7 @@ class ChromaVectorStore:
 
         Args:
             query_texts (Optional[OneOrMany[ChatModelDocument]]): The query texts.
+            query_embeddings (Optional[Embeddings]): The query embeddings, instead of query texts.
             n_results (int): The number of results to retrieve. Default is 10.
             where (Optional[Where]): The where condition for the query. Default is None.
             where_document (Optional[WhereDocument]): The where document for the query. Default is None.
@@ -195,6 +269,7 @@ class ChromaVectorStore:
         """
         return self.collection.query(
             query_texts=query_texts,
+            query_embeddings=query_embeddings,
             n_results=n_results,
             where=where,
             where_document=where_document,
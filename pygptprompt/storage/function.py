@@ -37,21 +37,21 @@ class VectorStoreEmbeddingFunction(EmbeddingFunction):
 
     def __call__(
         self,
-        texts: ChatModelDocuments,
+        input: ChatModelDocuments,
     ) -> ChatModelEmbedding:
         """
         Generate embeddings using the chat model.
 
         Args:
-            texts (List[str]): The input texts for which embeddings need to be generated.
+            input (List[str]): The input texts for which embeddings need to be generated.
 
         Returns:
             ChatModelEmbedding (List[List[float]]): The list of embeddings generated by the chat model.
         """
         self._logger.debug("Generating embeddings")
 
-        for text in texts:
+        for text in input:
             self._logger.debug(f"{text}")
 
         # Get embeddings from the chat model API
-        return self._model.get_embedding(input=texts)
+        return self._model.get_embedding(input=input)
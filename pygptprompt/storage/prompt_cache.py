@@ -0,0 +1,138 @@
+"""
+pygptprompt/storage/prompt_cache.py
+"""
+import hashlib
+import json
+import os
+from logging import Logger
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Optional, Tuple
+
+from pygptprompt.pattern.logger import get_default_logger
+
+
+class PromptStateCache:
+    """
+    A size-bounded, on-disk LRU cache of evaluated prompt prefix states.
+
+    Every session starts with the same system prompt and function schema, so the
+    evaluated state of that prefix can be shared across sessions and processes.
+    Each entry is a state file (`<key>.bin`) with a metadata file (`<key>.json`)
+    next to it. The state files are written and read by the chat model; the cache
+    only names, tracks, and evicts them.
+
+    Args:
+        directory (str): The directory the states are stored in.
+        max_size (int): The maximum total size of the state files in bytes.
+        logger (Optional[Logger]): The logger instance. Defaults to a default logger.
+
+    NOTE:
+        Recency is tracked with the modification time of the state files, so the
+        LRU order survives process restarts without a separate index.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int,
+        logger: Optional[Logger] = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max(0, max_size)
+        self._lock = Lock()
+
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = get_default_logger(self.__class__.__name__)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Create a cache key from the parts identifying an evaluated prefix.
+
+        Args:
+            *parts (Any): JSON serializable parts, e.g. the model identity, context
+                size, rendered system prompt, and function schema.
+
+        Returns:
+            str: The hex digest of the serialized parts.
+        """
+        serialized = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def path(self, key: str) -> str:
+        """
+        Get the path to the state file for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The path to `<key>.bin` within the cache directory.
+        """
+        return str(self.directory / f"{key}.bin")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get the path to a cached state and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[str]: The path to the state file, or None if the key is not cached.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def add(self, key: str) -> None:
+        """
+        Record a state written to the path of a key, evicting the least recently used states.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self._lock:
+            self._evict(keep=self.path(key))
+
+    def remove(self, key: str) -> None:
+        """
+        Remove a cached state and its metadata.
+
+        Args:
+            key (str): The cache key.
+        """
+        state_path = Path(self.path(key))
+        for path in (state_path, state_path.with_suffix(".json")):
+            path.unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        """Get the state files with their stats, least recently used first."""
+        entries = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return sorted(entries, key=lambda entry: entry[1].st_mtime)
+
+    def _evict(self, keep: str) -> None:
+        """Evict the least recently used states until the cache fits max_size."""
+        entries = self._entries()
+        total_size = sum(stat.st_size for _, stat in entries)
+
+        for path, stat in entries:
+            if total_size <= self.max_size:
+                break
+            if str(path) == keep:
+                continue
+            self.remove(path.stem)
+            total_size -= stat.st_size
+            self._logger.debug(f"Evicted prompt state {path}")
@@ -0,0 +1,214 @@
+"""
+pygptprompt/storage/semantic_cache.py
+"""
+import hashlib
+import json
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Union
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import (
+    ChatModel,
+    ChatModelDelta,
+    ChatModelResponse,
+    ChatModelVector,
+    replay_chat_completion,
+)
+from pygptprompt.storage.chroma import ChromaVectorStore
+
+
+class SemanticResponseCache:
+    """
+    A cache of assistant responses looked up by the meaning of the user's question.
+
+    The last user message is embedded and looked up in a dedicated vector
+    store collection ranked by cosine distance. If the nearest question asked
+    under the same scope (provider, model, and system prompt) is within
+    `app.semantic_cache.max_distance`, its stored answer is replayed instead of
+    generating a new one.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        chat_model (ChatModel): The chat model whose answers are cached, and which embeds
+            questions if no `embedding` provider is configured.
+        vector_store (Optional[ChromaVectorStore]): The collection holding the questions.
+            Defaults to the `app.semantic_cache.collection` collection.
+
+    Attributes:
+        max_distance (float): The maximum cosine distance between questions considered duplicates.
+        hits (int): The number of questions answered from the cache.
+        misses (int): The number of questions answered by the chat model.
+
+    NOTE:
+        Only the last user message is compared, so follow-up questions that
+        depend on earlier turns may match unrelated conversations. Keep the
+        threshold tight, or opt sessions out where answers depend on history.
+    """
+
+    def __init__(
+        self,
+        config: ConfigurationManager,
+        chat_model: ChatModel,
+        vector_store: Optional[ChromaVectorStore] = None,
+    ):
+        self.config = config
+        self.chat_model = chat_model
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        # NOTE: A collection passed in is closed by its owner.
+        self._owns_vector_store = vector_store is None
+        self.vector_store = vector_store or ChromaVectorStore(
+            collection_name=config.get_value(
+                "app.semantic_cache.collection", "semantic_cache"
+            ),
+            config=config,
+            chat_model=chat_model,
+            metadata={"hnsw:space": "cosine"},
+        )
+        self.max_distance = config.get_value("app.semantic_cache.max_distance", 0.05)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """Close the vector store if the cache created it."""
+        if self._owns_vector_store:
+            self.vector_store.close()
+
+    def scope(self, messages: List[ChatModelResponse]) -> str:
+        """
+        Get the scope of a conversation, the hash of what its answers depend on besides the question.
+
+        Args:
+            messages (List[ChatModelResponse]): The conversation.
+
+        Returns:
+            str: The hex digest of the model and system prompt.
+        """
+        system_prompt = next(
+            (m.get("content", "") for m in messages if m["role"] == "system"), ""
+        )
+        serialized = json.dumps(
+            [
+                self.chat_model.__class__.__name__,
+                self.chat_model.model_id,
+                system_prompt,
+            ]
+        )
+        return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Get the lookup counters for monitoring.
+
+        Returns:
+            Dict[str, Union[int, float]]: The hits, misses, hit rate, and number of stored answers.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.vector_store.get_collection_count(),
+        }
+
+    def lookup(
+        self, scope: str, embedding: ChatModelVector
+    ) -> Optional[ChatModelResponse]:
+        """
+        Get the stored answer to the nearest question within the scope.
+
+        Args:
+            scope (str): The scope of the conversation.
+            embedding (ChatModelVector): The embedding of the question.
+
+        Returns:
+            Optional[ChatModelResponse]: The stored answer, or None if no question is close enough.
+        """
+        result = self.vector_store.query_from_collection(
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"scope": scope},
+            include=["metadatas", "distances"],
+        )
+        if not result["ids"] or not result["ids"][0]:
+            return None
+
+        distance = result["distances"][0][0]
+        self.logger.debug(f"Nearest cached question at distance {distance:.4f}")
+        if distance > self.max_distance:
+            return None
+        return json.loads(result["metadatas"][0][0]["response"])
+
+    def store(
+        self,
+        question: str,
+        scope: str,
+        embedding: ChatModelVector,
+        response: ChatModelResponse,
+    ) -> None:
+        """
+        Store the answer to a question.
+
+        Args:
+            question (str): The user's question.
+            scope (str): The scope of the conversation.
+            embedding (ChatModelVector): The embedding of the question.
+            response (ChatModelResponse): The assistant's answer.
+        """
+        key = hashlib.blake2b(
+            f"{scope}:{question}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        self.vector_store.upsert_to_collection(
+            ids=[key],
+            metadatas=[{"scope": scope, "response": json.dumps(response)}],
+            documents=[question],
+            embeddings=[embedding],
+        )
+
+    def stream_chat_completion(
+        self, messages: List[ChatModelResponse]
+    ) -> Iterator[ChatModelDelta]:
+        """
+        Stream the cached answer to the last user message, or the chat model's answer.
+
+        Args:
+            messages (List[ChatModelResponse]): The conversation, ending with a user message.
+
+        Returns:
+            Iterator[ChatModelDelta]: The content and function call events, followed by
+                a single 'finish' event holding the complete message.
+
+        NOTE:
+            Only plain answers that finished normally are stored; function
+            calls depend on state outside the conversation.
+        """
+        if (
+            not messages
+            or messages[-1]["role"] != "user"
+            or not messages[-1].get("content")
+        ):
+            yield from self.chat_model.stream_chat_completion(messages)
+            return
+
+        start = perf_counter()
+        question = messages[-1]["content"]
+        scope = self.scope(messages)
+        embeddings = self.vector_store.embedding_function([question])
+        if not embeddings:
+            yield from self.chat_model.stream_chat_completion(messages)
+            return
+
+        response = self.lookup(scope, embeddings[0])
+        if response is not None:
+            self.hits += 1
+            yield from replay_chat_completion(response, "stop", start)
+            return
+
+        self.misses += 1
+        for delta in self.chat_model.stream_chat_completion(messages):
+            if (
+                delta["type"] == "finish"
+                and delta["finish_reason"] == "stop"
+                and "function_call" not in delta["message"]
+            ):
+                self.store(question, scope, embeddings[0], delta["message"])
+            yield delta
@@ -0,0 +1,281 @@
+"""
+pygptprompt/storage/session.py
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from peewee import PeeweeException, chunked
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.base import JSONMap
+from pygptprompt.model.base import ChatModelResponse, FunctionCall
+from pygptprompt.storage.sqlite import SQLiteMemoryStore
+
+# NOTE: A row binds 9 parameters, which keeps a chunk within SQLite's default limit of 999.
+INSERT_CHUNK_SIZE = 100
+
+
+class SQLiteSessionStore:
+    """
+    Stores a session in the `sequence_{table}` table of the SQLite memory store.
+
+    Every message of the transcript is stored once, in order of its row id.
+    The context window is a view over the transcript: the messages which have
+    not been marked as evicted. A save applies the operations recorded by the
+    transcript and context window since the previous save in one transaction,
+    inserting new messages in bulk.
+
+    Args:
+        config (ConfigurationManager): The configuration manager instance.
+        session_name (str): The name of the session.
+
+    NOTE:
+        Operations which cannot be expressed against the stored transcript,
+        e.g. deleting transcript messages or inserting a system message before
+        existing messages, rewrite the session's rows within the same transaction.
+    """
+
+    def __init__(self, config: ConfigurationManager, session_name: str):
+        self.session_name = session_name
+        self.logger = config.get_logger("general", self.__class__.__name__)
+        self.store = SQLiteMemoryStore(config)
+        self.db = self.store.db
+        self.Sequence = self.store.get_model(
+            "sequence", config.get_value("app.session.table", "sessions")
+        )
+
+        # NOTE: The row ids of the saved messages, aligned by index with each sequence.
+        self._transcript_ids: List[int] = []
+        self._context_ids: List[int] = []
+
+    def _to_row(self, message: ChatModelResponse, evicted: bool) -> Dict[str, Any]:
+        """Convert a message into the fields of a row."""
+        function_call = message.get("function_call") or {}
+        return dict(
+            session=self.session_name,
+            role=message["role"],
+            content=message.get("content"),
+            function_call=function_call.get("name"),
+            function_args=function_call.get("arguments"),
+            name=message.get("name"),
+            user=message.get("user"),
+            evicted=evicted,
+            timestamp=datetime.now(),
+        )
+
+    @staticmethod
+    def _to_message(row: Any) -> ChatModelResponse:
+        """Convert a row into a message."""
+        message = ChatModelResponse(role=row.role, content=row.content)
+        if row.function_call is not None:
+            message["function_call"] = FunctionCall(
+                name=row.function_call, arguments=row.function_args or ""
+            )
+        if row.name is not None:
+            message["name"] = row.name
+        if row.user is not None:
+            message["user"] = row.user
+        return message
+
+    def load(
+        self,
+    ) -> Optional[Tuple[List[ChatModelResponse], List[ChatModelResponse]]]:
+        """
+        Load the session.
+
+        Returns:
+            Optional[Tuple[List[ChatModelResponse], List[ChatModelResponse]]]: The context window
+                and transcript, or None if the session is not stored.
+        """
+        rows = list(
+            self.Sequence.select()
+            .where(self.Sequence.session == self.session_name)
+            .order_by(self.Sequence.id)
+        )
+        if not rows:
+            return None
+
+        transcript = [self._to_message(row) for row in rows]
+        context_window = [
+            message for message, row in zip(transcript, rows) if not row.evicted
+        ]
+        self._transcript_ids = [row.id for row in rows]
+        self._context_ids = [row.id for row in rows if not row.evicted]
+        self.logger.debug(f"Loaded {len(rows)} messages of session {self.session_name}")
+        return context_window, transcript
+
+    def _insert(
+        self, messages: List[ChatModelResponse], evicted: List[bool]
+    ) -> List[int]:
+        """
+        Insert messages in bulk.
+
+        Args:
+            messages (List[ChatModelResponse]): The messages.
+            evicted (List[bool]): Whether each message is outside of the context window.
+
+        Returns:
+            List[int]: The row ids of the messages.
+        """
+        rows = [
+            self._to_row(message, is_evicted)
+            for message, is_evicted in zip(messages, evicted)
+        ]
+        ids = []
+        for chunk in chunked(rows, INSERT_CHUNK_SIZE):
+            query = self.Sequence.insert_many(chunk).returning(self.Sequence.id)
+            ids.extend(row.id for row in query.execute())
+        return ids
+
+    def _update(self, row_id: int, message: ChatModelResponse) -> None:
+        """Replace the message stored in a row."""
+        fields = self._to_row(message, evicted=False)
+        del fields["evicted"], fields["session"]
+        self.Sequence.update(**fields).where(self.Sequence.id == row_id).execute()
+
+    def _rewrite(
+        self,
+        transcript: List[ChatModelResponse],
+        context_window: List[ChatModelResponse],
+    ) -> None:
+        """
+        Replace the session's rows with the given sequences.
+
+        Args:
+            transcript (List[ChatModelResponse]): The transcript.
+            context_window (List[ChatModelResponse]): The context window, expected
+                to be a subsequence of the transcript.
+        """
+        in_context = [False] * len(transcript)
+        context_indices: List[int] = []
+        missing: List[ChatModelResponse] = []
+        index = 0
+        for message in context_window:
+            while index < len(transcript) and not (
+                transcript[index] is message or transcript[index] == message
+            ):
+                index += 1
+            if index < len(transcript):
+                in_context[index] = True
+                context_indices.append(index)
+                index += 1
+            else:
+                missing.append(message)
+
+        if missing:
+            self.logger.warning(
+                f"Appending {len(missing)} context window messages "
+                f"missing from the transcript of session {self.session_name}"
+            )
+
+        self.Sequence.delete().where(
+            self.Sequence.session == self.session_name
+        ).execute()
+        ids = self._insert(
+            transcript + missing,
+            [not flag for flag in in_context] + [False] * len(missing),
+        )
+        self._transcript_ids = ids[: len(transcript)]
+        self._context_ids = [ids[i] for i in context_indices] + ids[len(transcript) :]
+
+    def _apply(
+        self,
+        transcript_journal: List[JSONMap],
+        context_journal: List[JSONMap],
+    ) -> bool:
+        """
+        Apply the operations recorded since the last save.
+
+        Args:
+            transcript_journal (List[JSONMap]): The operations on the transcript.
+            context_journal (List[JSONMap]): The operations on the context window.
+
+        Returns:
+            bool: True if the operations were applied, False if the session must be rewritten.
+        """
+        appended = {
+            id(record["message"])
+            for record in transcript_journal
+            if record["op"] == "append"
+        }
+        in_context = {
+            id(record["message"])
+            for record in context_journal
+            if record["op"] == "append"
+        }
+        if (
+            any(r["op"] not in ("append", "set") for r in transcript_journal)
+            or any(r["op"] not in ("append", "set", "delete") for r in context_journal)
+            or not in_context <= appended
+        ):
+            return False
+
+        rows: Dict[int, int] = {}
+        pending: List[ChatModelResponse] = []
+
+        def flush() -> None:
+            ids = self._insert(pending, [id(m) not in in_context for m in pending])
+            rows.update((id(m), row_id) for m, row_id in zip(pending, ids))
+            self._transcript_ids.extend(ids)
+            pending.clear()
+
+        for record in transcript_journal:
+            if record["op"] == "append":
+                pending.append(record["message"])
+            else:
+                flush()
+                self._update(self._transcript_ids[record["index"]], record["message"])
+        flush()
+
+        for record in context_journal:
+            if record["op"] == "append":
+                self._context_ids.append(rows[id(record["message"])])
+            elif record["op"] == "set":
+                self._update(self._context_ids[record["index"]], record["message"])
+            else:
+                evicted = [self._context_ids[index] for index in record["indices"]]
+                for index in sorted(record["indices"], reverse=True):
+                    del self._context_ids[index]
+                self.Sequence.update(evicted=True).where(
+                    self.Sequence.id.in_(evicted)
+                ).execute()
+        return True
+
+    def save(
+        self,
+        transcript: List[ChatModelResponse],
+        transcript_journal: Optional[List[JSONMap]],
+        context_window: List[ChatModelResponse],
+        context_journal: Optional[List[JSONMap]],
+    ) -> bool:
+        """
+        Save the session in a single transaction.
+
+        Args:
+            transcript (List[ChatModelResponse]): The transcript.
+            transcript_journal (Optional[List[JSONMap]]): The operations on the transcript
+                since the last save, or None to rewrite the session.
+            context_window (List[ChatModelResponse]): The context window.
+            context_journal (Optional[List[JSONMap]]): The operations on the context window
+                since the last save, or None to rewrite the session.
+
+        Returns:
+            bool: True if saving was successful, False on error.
+        """
+        if not transcript:
+            return False
+
+        try:
+            with self.db.atomic():
+                if (
+                    transcript_journal is None
+                    or context_journal is None
+                    or not self._apply(transcript_journal, context_journal)
+                ):
+                    self._rewrite(transcript, context_window)
+        except (PeeweeException, IndexError, KeyError) as e:
+            self.logger.error(f"Error saving session {self.session_name}: {e}")
+            return False
+
+        self.logger.debug(f"Saved session {self.session_name}")
+        return True
@@ -6,6 +6,7 @@ from functools import wraps
 from typing import List
 
 from peewee import (
+    BooleanField,
     CharField,
     DateTimeField,
     Model,
@@ -71,7 +72,7 @@ class SQLiteMemoryStore:
 
         """
         self.db_name = config.evaluate_path("app.database.sqlite")
-        self.db = SqliteDatabase(self.db_name)
+        self.db = SqliteDatabase(self.db_name, pragmas={"journal_mode": "wal"})
         self._logger = config.get_logger("general", self.__class__.__name__)
 
     def connect(self) -> bool:
@@ -107,20 +108,30 @@ class SQLiteMemoryStore:
         Returns:
             Model: The Peewee Model for chat model sequences.
         """
-        # NOTE: A sequence can be the Context Window or Transcript
+        # NOTE: A sequence can be the Context Window or Transcript.
+        # Sessions store their transcript, and the context window is the
+        # messages which have not been evicted.
         db = self.db
 
         class ChatModelSequence(Model):
+            session = CharField(index=True)
             role = CharField(index=True)
             content = TextField(null=True)
             function_call = TextField(null=True)
             function_args = TextField(null=True)
+            name = CharField(null=True)
             user = CharField(null=True)
+            evicted = BooleanField(default=False)
             timestamp = DateTimeField(index=True)
 
             class Meta:
                 database = db
                 db_table = f"sequence_{table_name}"
+                indexes = (
+                    (("session", "evicted"), False),
+                    (("session", "role"), False),
+                    (("session", "timestamp"), False),
+                )
 
         return ChatModelSequence
 
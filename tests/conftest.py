@@ -3,15 +3,16 @@ tests/conftest.py
 """
 import json
 import os
-from typing import List, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import pytest
+from huggingface_hub import try_to_load_from_cache
 
 from pygptprompt.config.manager import ConfigurationManager
 from pygptprompt.json.base import JSONBaseTemplate
 from pygptprompt.json.list import JSONListTemplate
 from pygptprompt.json.mapping import JSONMappingTemplate
-from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.model.base import ChatModel, ChatModelDelta, ChatModelResponse
 from pygptprompt.model.factory import ChatModelFactory
 from pygptprompt.model.llama_cpp import LlamaCppModel
 from pygptprompt.model.openai import OpenAIModel
@@ -122,6 +123,55 @@ def mock_weather_callback() -> object:
     return get_current_weather
 
 
+class MockChatModel(ChatModel):
+    """
+    A minimal ChatModel that encodes text by splitting on whitespace.
+
+    NOTE: Used to exercise token accounting without loading a model.
+    """
+
+    def __init__(self, config: object = None):
+        self.config = config
+        self.encoding_calls = 0
+
+    def get_completion(self, prompt: str) -> str:
+        return prompt
+
+    def stream_chat_completion(
+        self,
+        messages: List[ChatModelResponse],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[ChatModelDelta]:
+        # NOTE: Echo the last message back one word per chunk.
+        words = messages[-1]["content"].split(" ")
+        tokens = words[:1] + [f" {word}" for word in words[1:]]
+        chunks = [
+            {"choices": [{"delta": {"content": token}, "finish_reason": None}]}
+            for token in tokens
+        ]
+        chunks.append({"choices": [{"delta": {}, "finish_reason": "stop"}]})
+        return self._stream_chat_completion(iter(chunks))
+
+    def get_embedding(self, input: Union[str, List[str]]) -> List[List[float]]:
+        texts = [input] if isinstance(input, str) else input
+        return [[float(len(text))] for text in texts]
+
+    def get_encoding(self, text: str) -> List[int]:
+        self.encoding_calls += 1
+        return [len(word) for word in text.split()]
+
+    def get_encodings(self, texts: List[str]) -> List[List[int]]:
+        return [self.get_encoding(text) for text in texts]
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        return [len(encoding) for encoding in self.get_encodings(texts)]
+
+
+@pytest.fixture
+def mock_chat_model() -> MockChatModel:
+    return MockChatModel()
+
+
 @pytest.fixture(scope="module")
 def temp_json_path() -> str:
     return "tests/test.temp.json"
@@ -240,6 +290,24 @@ def openai_model(config: ConfigurationManager) -> OpenAIModel:
     return OpenAIModel(config=config)
 
 
+@pytest.fixture(scope="module")
+def llama_cpp_model_path(config: ConfigurationManager) -> str:
+    local_model_path = config.get_value("llama_cpp.model.local")
+    if local_model_path and os.path.exists(local_model_path):
+        return local_model_path
+    model_path = try_to_load_from_cache(
+        repo_id=config.get_value(
+            "llama_cpp.model.repo_id", "TheBloke/Llama-2-7B-Chat-GGML"
+        ),
+        filename=config.get_value(
+            "llama_cpp.model.filename", "llama-2-7b-chat.ggmlv3.q5_1.bin"
+        ),
+    )
+    if not isinstance(model_path, str):
+        pytest.skip("The llama.cpp model is not available")
+    return model_path
+
+
 @pytest.fixture(scope="module")
 def llama_cpp_model(config: ConfigurationManager) -> LlamaCppModel:
     return LlamaCppModel(config=config)
@@ -32,11 +32,25 @@ class TestConfigurationManager:
         assert os.path.exists(config._map_template.file_path)
         assert isinstance(config._map_template.data, dict)
 
+    def test_get_data(self, config: ConfigurationManager):
+        data = config.get_data()
+        assert data == config._map_template.data
+
+        data["app"]["test_copy"] = True
+        assert config.get_value("app.test_copy") is None
+        assert config.file_path == str(config._map_template.file_path)
+
     def test_get_value(self, config: ConfigurationManager):
         assert bool(config.get_value("openai.chat_completions.model")) is True
         assert config.get_value("non_existent_key", "default") == "default"
         assert isinstance(config.get_value("app.access.shell.allowed_commands"), list)
 
+    def test_get_value_keeps_falsy_values(self, config: ConfigurationManager):
+        config._map_template.data["app"]["test_falsy"] = {"flag": False, "count": 0}
+        assert config.get_value("app.test_falsy.flag", True) is False
+        assert config.get_value("app.test_falsy.count", 1) == 0
+        del config._map_template.data["app"]["test_falsy"]
+
     def test_evaluate_path_app_path_test(self, config: ConfigurationManager):
         path = config.evaluate_path("app.test", "tests/tmp")
         assert path == "tests/tmp"
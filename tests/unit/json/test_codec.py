@@ -0,0 +1,60 @@
+"""
+tests/unit/json/test_codec.py
+"""
+import io
+import json
+
+import pytest
+
+from pygptprompt.json.codec import CODECS, JSONCodec, get_codec
+from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.json.view import view
+
+DATA = [
+    {"role": "user", "content": "Grüße, 世界!", "count": 12345},
+    {"role": "assistant", "content": None, "nested": {"list": [1.5, True, None]}},
+]
+
+
+@pytest.fixture(params=sorted(CODECS))
+def codec(request) -> JSONCodec:
+    return get_codec(request.param)
+
+
+class TestJSONCodec:
+    def test_round_trip(self, codec: JSONCodec):
+        encoded = codec.dumps(DATA)
+        assert b"\n" not in encoded
+        assert codec.loads(encoded) == DATA
+        assert json.loads(codec.dumps(DATA, indent=2)) == DATA
+
+    def test_encodes_views(self, codec: JSONCodec):
+        assert codec.loads(codec.dumps(view(DATA))) == DATA
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_iter_list(self, codec: JSONCodec, chunk_size: int):
+        encoded = codec.dumps(DATA + [1, 23, "x"], indent=2)
+        items = codec.iter_list(io.BytesIO(encoded), chunk_size)
+        assert list(items) == DATA + [1, 23, "x"]
+        assert list(codec.iter_list(io.BytesIO(b" [ ] "), chunk_size)) == []
+
+    @pytest.mark.parametrize("encoded", [b"{}", b"[1, 2", b"[1 2]", b'[{"a": }]'])
+    def test_iter_invalid_list(self, codec: JSONCodec, encoded: bytes):
+        with pytest.raises(json.JSONDecodeError):
+            list(codec.iter_list(io.BytesIO(encoded), 2))
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+
+class TestJSONTemplateCodec:
+    def test_compact_save_and_backup(self, tmp_path, codec: JSONCodec):
+        template = JSONListTemplate(str(tmp_path / "list.json"), codec=codec)
+        assert template.save_json(DATA) is True
+        assert template.file_path.read_bytes() == codec.dumps(DATA)
+        assert list(template.iter_json()) == DATA
+
+        assert template.backup_json() is True
+        backup_path = template.file_path.with_suffix(".backup.json")
+        assert backup_path.read_bytes() == template.file_path.read_bytes()
@@ -0,0 +1,83 @@
+"""
+tests/unit/json/test_log.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.json.log import JSONListLog
+from pygptprompt.model.base import ChatModelResponse
+
+
+@pytest.fixture
+def log_path(tmp_path) -> str:
+    return str(tmp_path / "session.jsonl")
+
+
+class TestJSONListLog:
+    def test_replay(self, log_path: str, messages: List[ChatModelResponse]):
+        log = JSONListLog(log_path)
+        data = list(messages)
+        assert log.write(data) is True
+
+        records = [
+            {"op": "delete", "indices": [1, 2]},
+            {"op": "append", "message": messages[1]},
+            {"op": "set", "index": 0, "message": messages[2]},
+        ]
+        data = [messages[2]] + data[3:] + [messages[1]]
+        assert log.append(records, data) is True
+
+        assert JSONListLog(log_path).load() == data
+
+    def test_append_does_not_rewrite(
+        self, log_path: str, messages: List[ChatModelResponse]
+    ):
+        log = JSONListLog(log_path, compact_ratio=0)
+        log.write(messages)
+        with open(log_path, "rb") as file:
+            saved = file.read()
+
+        log.append([{"op": "append", "message": messages[1]}], messages)
+
+        with open(log_path, "rb") as file:
+            assert file.read(len(saved)) == saved
+        assert len(saved) < log.size < 2 * len(saved)
+
+    def test_discards_incomplete_record(
+        self, log_path: str, messages: List[ChatModelResponse]
+    ):
+        log = JSONListLog(log_path)
+        log.write(messages)
+        size = log.size
+        with open(log_path, "ab") as file:
+            file.write(b'{"op": "append", "message": {"role": "us')
+
+        log = JSONListLog(log_path)
+        assert log.load() == messages
+        assert log.size == size
+
+        log.append([{"op": "append", "message": messages[1]}], [])
+        assert JSONListLog(log_path).load() == messages + [messages[1]]
+
+    def test_compaction(self, log_path: str, message: ChatModelResponse):
+        log = JSONListLog(log_path, compact_ratio=2.0, compact_min_size=0)
+        data = [message]
+        log.write(data)
+
+        for _ in range(3):
+            data = data + [message]
+            log.append([{"op": "append", "message": message}], data)
+            data = data[:1]
+            log.append([{"op": "delete", "indices": [1]}], data)
+            log.wait()
+
+        with open(log_path, "rb") as file:
+            lines = file.read().splitlines(keepends=True)
+        assert len(lines) == 1
+        assert log.size == len(lines[0])
+        assert JSONListLog(log_path).load() == data
+
+    def test_unknown_fsync_policy(self, log_path: str):
+        with pytest.raises(ValueError):
+            JSONListLog(log_path, fsync="sometimes")
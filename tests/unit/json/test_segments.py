@@ -0,0 +1,172 @@
+"""
+tests/unit/json/test_segments.py
+"""
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pygptprompt.json.segments import JSONSegmentedList
+from pygptprompt.model.base import ChatModelResponse
+
+
+@pytest.fixture
+def items() -> List[ChatModelResponse]:
+    return [ChatModelResponse(role="user", content=f"Message {i}") for i in range(10)]
+
+
+@pytest.fixture
+def directory(tmp_path) -> str:
+    return str(tmp_path / "transcript")
+
+
+def create(directory: str) -> JSONSegmentedList:
+    return JSONSegmentedList(directory, segment_size=3, cache_size=2)
+
+
+def create_loaded(directory: str) -> JSONSegmentedList:
+    segments = create(directory)
+    segments.load()
+    return segments
+
+
+def saved(directory: str, items: List[ChatModelResponse]) -> JSONSegmentedList:
+    segments = create(directory)
+    segments.extend(items)
+    assert segments.save(list(range(len(items))), {"tokenizer": "test"}) is True
+    return segments
+
+
+class TestJSONSegmentedList:
+    def test_load_reads_index_only(self, directory: str, items):
+        saved(directory, items)
+
+        segments = create(directory)
+        assert segments.load() == list(range(len(items)))
+        assert segments.metadata == {"tokenizer": "test"}
+        assert len(segments) == len(items)
+        assert segments.loaded_segments == 0
+
+        assert segments[-1] == items[-1]
+        assert segments.loaded_segments == 1
+        assert list(segments) == items
+        assert segments.loaded_segments == 2
+
+    def test_append_keeps_saved_segments(self, directory: str, items):
+        saved(directory, items[:4])
+        first = Path(directory) / "1-000000.jsonl"
+        mtime = first.stat().st_mtime_ns
+
+        segments = create(directory)
+        segments.load()
+        segments.extend(items[4:])
+        assert segments.save(list(range(len(items)))) is True
+        assert first.stat().st_mtime_ns == mtime
+
+        restored = create(directory)
+        assert restored.load() == list(range(len(items)))
+        assert list(restored) == items
+
+    def test_set_rewrites_segment(self, directory: str, items):
+        saved(directory, items)
+
+        segments = create(directory)
+        segments.load()
+        system = ChatModelResponse(role="system", content="Be brief.")
+        segments[0] = system
+        counts = [42] + list(range(1, len(items)))
+        assert segments.save(counts) is True
+
+        restored = create(directory)
+        assert restored.load() == counts
+        assert list(restored) == [system] + items[1:]
+
+    def test_delete_writes_new_generation(self, directory: str, items):
+        saved(directory, items)
+
+        segments = create(directory)
+        segments.load()
+        del segments[1:3]
+        segments.insert(0, items[-1])
+        assert segments.save(list(range(len(segments)))) is True
+
+        assert not list(Path(directory).glob("1-*"))
+        restored = create(directory)
+        assert restored.load() == list(range(len(segments)))
+        assert list(restored) == [items[-1], items[0]] + items[3:]
+
+    def test_discards_uncommitted_tail(self, directory: str, items):
+        saved(directory, items[:5])
+        index = (Path(directory) / "index.json").read_bytes()
+
+        segments = create(directory)
+        segments.load()
+        segments.extend(items[5:])
+        assert segments.save(list(range(len(items)))) is True
+        # NOTE: Simulate a crash before the index of the second save was committed.
+        (Path(directory) / "index.json").write_bytes(index)
+
+        restored = create(directory)
+        assert restored.load() == list(range(5))
+        restored.append(items[-1])
+        assert restored.save(list(range(6))) is True
+        assert list(create_loaded(directory)) == items[:5] + [items[-1]]
+
+    def test_failed_rewrite_keeps_segment(self, directory: str, items, monkeypatch):
+        saved(directory, items)
+        first = Path(directory) / "1-000000.jsonl"
+        data = first.read_bytes()
+
+        segments = create(directory)
+        segments.load()
+        segments[0] = ChatModelResponse(role="system", content="Be brief.")
+
+        def crash(source, destination):
+            raise OSError("Simulated crash")
+
+        monkeypatch.setattr(os, "replace", crash)
+        assert segments.save(list(range(len(items)))) is False
+        monkeypatch.undo()
+
+        assert first.read_bytes() == data
+        assert list(create_loaded(directory)) == items
+
+    def test_damaged_segments_read_as_placeholders(self, directory: str, items):
+        saved(directory, items)
+        (Path(directory) / "1-000001.jsonl").unlink()
+        last = Path(directory) / "1-000003.jsonl"
+        last.write_bytes(b"")
+
+        placeholder = {"role": "unavailable", "content": "lost"}
+        segments = JSONSegmentedList(
+            directory, segment_size=3, cache_size=2, placeholder=placeholder
+        )
+        assert segments.load() == list(range(len(items)))
+        expected = items[:3] + [placeholder] * 3 + items[6:9] + [placeholder]
+        assert list(segments) == expected
+
+        # NOTE: Damaged segments are rewritten, so new items are not misplaced.
+        segments.append(items[0])
+        assert segments.save(list(range(len(items) + 1))) is True
+        assert list(create_loaded(directory)) == expected + [items[0]]
+
+    def test_read_errors_are_raised(self, directory: str, items):
+        saved(directory, items)
+        second = Path(directory) / "1-000001.jsonl"
+        second.rename(second.with_suffix(".bak"))
+        # NOTE: Reading a directory fails with an I/O error other than a missing file.
+        second.mkdir()
+
+        segments = create_loaded(directory)
+        with pytest.raises(IsADirectoryError):
+            segments[3]
+
+        second.rmdir()
+        second.with_suffix(".bak").rename(second)
+        assert segments[3] == items[3]
+        assert segments.save(list(range(len(items)))) is True
+        assert list(create_loaded(directory)) == items
+
+    def test_missing_directory(self, directory: str):
+        assert create(directory).load() is None
@@ -0,0 +1,39 @@
+"""
+tests/unit/json/test_view.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.json.view import JSONListView, JSONMapView
+from pygptprompt.model.base import ChatModelResponse
+
+
+class TestJSONView:
+    def test_view_shares_data(
+        self, json_list_template: JSONListTemplate, messages: List[ChatModelResponse]
+    ):
+        data = json_list_template.data
+        assert isinstance(data, JSONListView)
+        assert isinstance(data[0], JSONMapView)
+        assert data == messages
+        assert data[1:] == messages[1:]
+
+        json_list_template.append(messages[1])
+        assert len(data) == len(messages) + 1
+
+    def test_view_is_read_only(self, json_list_template: JSONListTemplate):
+        data = json_list_template.data
+        with pytest.raises(TypeError):
+            data[0] = {"role": "user", "content": "Hello"}
+        with pytest.raises(TypeError):
+            data[0]["content"] = "Hello"
+
+    def test_snapshot_and_mutable(self, json_list_template: JSONListTemplate):
+        snapshot = json_list_template.snapshot()
+        snapshot[0]["content"] = "Changed"
+        assert json_list_template.get(0)["content"] != "Changed"
+
+        json_list_template.mutable().pop()
+        assert json_list_template.length == len(snapshot) - 1
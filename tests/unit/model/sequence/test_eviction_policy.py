@@ -0,0 +1,78 @@
+"""
+tests/unit/model/sequence/test_eviction_policy.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.sequence.eviction_policy import (
+    FIFOEvictionPolicy,
+    FunctionFirstEvictionPolicy,
+    KnapsackEvictionPolicy,
+    PinRecentEvictionPolicy,
+    create_eviction_policy,
+)
+
+
+@pytest.fixture
+def sequence() -> List[ChatModelResponse]:
+    return [
+        ChatModelResponse(role="system", content="system"),
+        ChatModelResponse(role="user", content="first question"),
+        ChatModelResponse(role="function", content="large function result"),
+        ChatModelResponse(role="assistant", content="first answer"),
+        ChatModelResponse(role="user", content="second question"),
+        ChatModelResponse(role="assistant", content="second answer"),
+        ChatModelResponse(role="user", content="third question"),
+        ChatModelResponse(role="assistant", content="third answer"),
+    ]
+
+
+@pytest.fixture
+def token_counts() -> List[int]:
+    return [10, 20, 100, 20, 20, 20, 20, 20]
+
+
+class TestEvictionPolicy:
+    def test_create_eviction_policy(self, config: ConfigurationManager):
+        policy = create_eviction_policy("llama_cpp", config)
+        assert isinstance(policy, FIFOEvictionPolicy)
+
+    def test_fifo(self, config, sequence, token_counts):
+        policy = FIFOEvictionPolicy("llama_cpp", config)
+        assert policy.select(sequence, token_counts, 20, 200) == [1, 2]
+
+    def test_fifo_eviction_chunk(self, config, sequence, token_counts, monkeypatch):
+        monkeypatch.setattr(FIFOEvictionPolicy, "eviction_chunk", 64)
+        policy = FIFOEvictionPolicy("llama_cpp", config)
+        # 31 tokens must be freed, which is rounded up to 64 tokens
+        assert policy.select(sequence, token_counts, 20, 240) == [1, 2]
+        assert policy.select(sequence, token_counts, 1, 240) == []
+
+    def test_pin_recent(self, config, sequence, token_counts):
+        policy = PinRecentEvictionPolicy("llama_cpp", config)
+        # The last two turns begin at index 4 and are pinned
+        evictions = policy.select(sequence, token_counts, 100, 200)
+        assert evictions == [1, 2, 3]
+        assert policy.select(sequence, token_counts, 200, 200) == [1, 2, 3]
+
+    def test_function_first(self, config, sequence, token_counts):
+        policy = FunctionFirstEvictionPolicy("llama_cpp", config)
+        assert policy.select(sequence, token_counts, 20, 200) == [2]
+
+    def test_knapsack(self, config, sequence, token_counts):
+        policy = KnapsackEvictionPolicy("llama_cpp", config)
+        token_limit = 200
+        evictions = policy.select(sequence, token_counts, 20, token_limit)
+        kept = sum(c for i, c in enumerate(token_counts) if i not in evictions)
+        assert 0 not in evictions
+        assert 2 in evictions  # low value per token
+        assert kept + 20 < token_limit
+        assert 7 not in evictions  # most recent
+
+    def test_no_eviction_required(self, config, sequence, token_counts):
+        for policy_class in [FIFOEvictionPolicy, KnapsackEvictionPolicy]:
+            policy = policy_class("llama_cpp", config)
+            assert policy.select(sequence, token_counts, 1, 1000) == []
@@ -0,0 +1,249 @@
+"""
+tests/unit/model/sequence/test_sequence_manager.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.json.log import JSONListLog
+from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.model.sequence.context_manager import ContextWindowManager
+from pygptprompt.model.sequence.transcript_manager import TranscriptManager
+
+
+@pytest.fixture
+def transcript(
+    tmp_path, config: ConfigurationManager, mock_chat_model: ChatModel
+) -> TranscriptManager:
+    return TranscriptManager(
+        file_path=str(tmp_path / "test_transcript.json"),
+        provider="llama_cpp",
+        config=config,
+        chat_model=mock_chat_model,
+    )
+
+
+@pytest.fixture
+def context_window(
+    tmp_path, config: ConfigurationManager, mock_chat_model: ChatModel
+) -> ContextWindowManager:
+    return ContextWindowManager(
+        file_path=str(tmp_path / "test_context.json"),
+        provider="llama_cpp",
+        config=config,
+        chat_model=mock_chat_model,
+    )
+
+
+@pytest.fixture
+def jsonl_storage(monkeypatch, config: ConfigurationManager):
+    monkeypatch.setitem(config._map_template.data["app"], "session", {})
+    config._map_template.data["app"]["session"]["storage"] = "jsonl"
+
+
+class TestSequenceManagerTokenCount:
+    def test_enqueue(
+        self, transcript: TranscriptManager, messages: List[ChatModelResponse]
+    ):
+        transcript.enqueue(messages)
+        expected = transcript.token_manager.calculate_chat_sequence_length(messages)
+        assert transcript.token_count == expected
+        assert len(transcript.token_counts) == len(messages)
+
+    def test_token_count_does_not_tokenize(
+        self,
+        transcript: TranscriptManager,
+        mock_chat_model: ChatModel,
+        messages: List[ChatModelResponse],
+    ):
+        transcript.enqueue(messages)
+        calls = mock_chat_model.encoding_calls
+        assert transcript.token_count > 0
+        assert mock_chat_model.encoding_calls == calls
+
+    def test_setitem_and_delitem(
+        self,
+        transcript: TranscriptManager,
+        message: ChatModelResponse,
+        messages: List[ChatModelResponse],
+    ):
+        transcript.enqueue(messages)
+        token_manager = transcript.token_manager
+
+        transcript[1] = message
+        assert transcript.token_count == token_manager.calculate_chat_sequence_length(
+            transcript.sequence
+        )
+
+        del transcript[1]
+        assert transcript.token_count == token_manager.calculate_chat_sequence_length(
+            transcript.sequence
+        )
+
+    def test_load(
+        self,
+        transcript: TranscriptManager,
+        messages: List[ChatModelResponse],
+    ):
+        transcript.enqueue(messages)
+        assert transcript.save_from_chat_completions() is True
+        token_counts = list(transcript.token_counts)
+
+        transcript.token_manager.cache.clear()
+        assert transcript.load_to_chat_completions() is True
+        assert transcript.token_counts == token_counts
+        assert transcript.token_count == sum(token_counts)
+
+    def test_system_message(
+        self, transcript: TranscriptManager, messages: List[ChatModelResponse]
+    ):
+        transcript.enqueue(messages)
+        transcript.system_message = ChatModelResponse(
+            role="system", content="You are a very, very helpful assistant."
+        )
+        assert transcript.token_count == sum(
+            transcript.token_manager.calculate_chat_message_length(message)
+            for message in transcript
+        )
+
+
+class TestContextWindowManagerTokenCount:
+    def test_dequeue(
+        self,
+        context_window: ContextWindowManager,
+        messages: List[ChatModelResponse],
+    ):
+        context_window.enqueue(messages)
+        dequeued = context_window.dequeue()
+        assert dequeued == messages[1]
+        assert context_window.token_count == sum(context_window.token_counts)
+        assert len(context_window.token_counts) == len(context_window)
+
+    def test_enqueue_evicts_multiple_messages(
+        self,
+        context_window: ContextWindowManager,
+        messages: List[ChatModelResponse],
+    ):
+        token_manager = context_window.token_manager
+        context_window.enqueue(messages[0])
+        for _ in range(3):
+            context_window.enqueue(
+                ChatModelResponse(role="user", content="word " * 500)
+            )
+        assert len(context_window) == 4
+
+        large_message = ChatModelResponse(role="function", content="word " * 1500)
+        context_window.enqueue(large_message)
+
+        assert context_window[0] == messages[0]
+        assert context_window[-1] == large_message
+        assert len(context_window) < 4
+        assert token_manager.offset + context_window.token_count < (
+            token_manager.upper_bound
+        )
+
+
+class TestSequenceManagerStorage:
+    def test_defaults_to_json(
+        self, context_window: ContextWindowManager, transcript: TranscriptManager
+    ):
+        assert context_window.storage == "json"
+        assert context_window.file_path.suffix == ".json"
+        assert transcript.file_path.suffix == ".json"
+
+    @pytest.mark.usefixtures("jsonl_storage")
+    def test_only_context_window_uses_session_log(
+        self, context_window: ContextWindowManager, transcript: TranscriptManager
+    ):
+        assert context_window.file_path.suffix == ".jsonl"
+        assert transcript._log is None
+        assert transcript.file_path.suffix == ""
+
+
+@pytest.mark.usefixtures("jsonl_storage")
+class TestSequenceManagerSessionLog:
+    def test_save_appends_evictions(
+        self,
+        tmp_path,
+        config: ConfigurationManager,
+        mock_chat_model: ChatModel,
+        messages: List[ChatModelResponse],
+    ):
+        def create() -> ContextWindowManager:
+            return ContextWindowManager(
+                file_path=str(tmp_path / "context.json"),
+                provider="llama_cpp",
+                config=config,
+                chat_model=mock_chat_model,
+            )
+
+        context_window = create()
+        context_window.enqueue(messages)
+        assert context_window.save_from_chat_completions() is True
+        saved = context_window.file_path.read_bytes()
+
+        context_window.dequeue_many(2)
+        context_window.enqueue(messages[1])
+        assert context_window.save_from_chat_completions() is True
+
+        assert context_window.file_path.suffix == ".jsonl"
+        assert context_window.file_path.read_bytes().startswith(saved)
+
+        restored = create()
+        assert restored.load_to_chat_completions() is True
+        assert restored.sequence == context_window.sequence
+        assert restored.token_counts == context_window.token_counts
+
+    def test_migrates_json(
+        self,
+        tmp_path,
+        config: ConfigurationManager,
+        mock_chat_model: ChatModel,
+        messages: List[ChatModelResponse],
+    ):
+        file_path = str(tmp_path / "context.json")
+        JSONListTemplate(file_path).save_json(messages)
+
+        context_window = ContextWindowManager(
+            file_path=file_path,
+            provider="llama_cpp",
+            config=config,
+            chat_model=mock_chat_model,
+        )
+        assert context_window.load_to_chat_completions() is True
+        assert context_window.save_from_chat_completions() is True
+        assert JSONListLog(str(context_window.file_path)).load() == messages
+
+
+@pytest.mark.usefixtures("jsonl_storage")
+class TestTranscriptManagerSegments:
+    def test_round_trip(
+        self,
+        tmp_path,
+        config: ConfigurationManager,
+        mock_chat_model: ChatModel,
+        messages: List[ChatModelResponse],
+    ):
+        file_path = str(tmp_path / "transcript.json")
+        JSONListTemplate(file_path).save_json(messages)
+
+        def create() -> TranscriptManager:
+            return TranscriptManager(
+                file_path=file_path,
+                provider="llama_cpp",
+                config=config,
+                chat_model=mock_chat_model,
+            )
+
+        transcript = create()
+        assert transcript.load_to_chat_completions() is True
+        transcript.enqueue(messages[1])
+        assert transcript.save_from_chat_completions() is True
+        assert transcript.file_path.is_dir()
+
+        restored = create()
+        assert restored.load_to_chat_completions() is True
+        assert restored.token_counts == transcript.token_counts
+        assert restored.sequence == messages + [messages[1]]
@@ -0,0 +1,77 @@
+"""
+tests/unit/model/sequence/test_session_manager.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.sequence.session_manager import SessionManager
+
+
+class StatefulMockChatModel:
+    """Records the context states saved and restored by a session."""
+
+    def __init__(self, mock_chat_model):
+        self._model = mock_chat_model
+        self.saved = []
+        self.loaded = []
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def save_context_state(self, file_path: str, fingerprint: str) -> bool:
+        self.saved.append((file_path, fingerprint))
+        return True
+
+    def load_context_state(self, file_path: str, fingerprint: str) -> bool:
+        self.loaded.append((file_path, fingerprint))
+        return True
+
+
+@pytest.fixture
+def session_factory(
+    tmp_path, monkeypatch, config: ConfigurationManager, mock_chat_model
+):
+    evaluate_path = config.evaluate_path
+    monkeypatch.setattr(
+        config,
+        "evaluate_path",
+        lambda key, default=None: str(tmp_path)
+        if key == "app.sessions"
+        else evaluate_path(key, default),
+    )
+    monkeypatch.setattr(SessionManager, "persist_state", True)
+    chat_model = StatefulMockChatModel(mock_chat_model)
+
+    def create() -> SessionManager:
+        return SessionManager("test", "llama_cpp", config, chat_model)
+
+    return create
+
+
+class TestSessionManagerContextState:
+    def test_save_and_restore_state(
+        self, session_factory, messages: List[ChatModelResponse]
+    ):
+        session = session_factory()
+        session.load(messages[0])
+        session.enqueue(messages[1:])
+        assert session.save()
+
+        chat_model = session.chat_model
+        assert len(chat_model.saved) == 1
+        state_path, fingerprint = chat_model.saved[0]
+        assert state_path.endswith("test_kv.bin")
+        assert fingerprint
+
+        session_factory().load(messages[0])
+        assert chat_model.loaded == [(state_path, fingerprint)]
+
+    def test_new_session_does_not_restore(
+        self, session_factory, messages: List[ChatModelResponse]
+    ):
+        session = session_factory()
+        session.load(messages[0])
+        assert session.chat_model.loaded == []
@@ -0,0 +1,64 @@
+"""
+tests/unit/model/sequence/test_token_cache.py
+"""
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.model.sequence.token_cache import TokenCountCache
+from pygptprompt.model.sequence.token_manager import TokenManager
+
+
+@pytest.fixture
+def token_cache() -> TokenCountCache:
+    cache = TokenCountCache()
+    cache.clear()
+    yield cache
+    cache.max_size = 8192
+    cache.clear()
+
+
+class TestTokenCountCache:
+    def test_singleton(self, token_cache: TokenCountCache):
+        assert TokenCountCache() is token_cache
+
+    def test_make_key(self):
+        key = TokenCountCache.make_key("llama_cpp", "model", "text")
+        assert key[:2] == ("llama_cpp", "model")
+        assert key == TokenCountCache.make_key("llama_cpp", "model", "text")
+        assert key != TokenCountCache.make_key("openai", "model", "text")
+
+    def test_hit_and_miss(self, token_cache: TokenCountCache):
+        key = token_cache.make_key("llama_cpp", "model", "text")
+        assert token_cache.get(key) is None
+        token_cache.set(key, 3)
+        assert token_cache.get(key) == 3
+        assert token_cache.stats()["hits"] == 1
+        assert token_cache.stats()["misses"] == 1
+
+    def test_eviction(self, token_cache: TokenCountCache):
+        token_cache.max_size = 2
+        keys = [token_cache.make_key("llama_cpp", "model", str(i)) for i in range(3)]
+        token_cache.set(keys[0], 0)
+        token_cache.set(keys[1], 1)
+        token_cache.get(keys[0])  # keys[1] is now the least recently used
+        token_cache.set(keys[2], 2)
+        assert len(token_cache) == 2
+        assert token_cache.evictions == 1
+        assert token_cache.get(keys[1]) is None
+        assert token_cache.get(keys[0]) == 0
+
+    def test_shared_between_token_managers(
+        self,
+        token_cache: TokenCountCache,
+        config: ConfigurationManager,
+        mock_chat_model: ChatModel,
+        message: ChatModelResponse,
+    ):
+        context = TokenManager("llama_cpp", config, mock_chat_model)
+        transcript = TokenManager("llama_cpp", config, mock_chat_model)
+        assert context.calculate_chat_message_length(
+            message
+        ) == transcript.calculate_chat_message_length(message)
+        assert mock_chat_model.encoding_calls == 1
+        assert token_cache.hits == 1
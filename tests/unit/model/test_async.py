@@ -0,0 +1,60 @@
+"""
+tests/unit/model/test_async.py
+"""
+import asyncio
+from typing import List
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import AsyncChatModel, ChatModel, ChatModelResponse
+from pygptprompt.model.llama_cpp import AsyncLlamaCppModel
+
+
+@pytest.fixture
+def async_model(
+    config: ConfigurationManager, mock_chat_model: ChatModel
+) -> AsyncLlamaCppModel:
+    return AsyncLlamaCppModel(config, model=mock_chat_model)
+
+
+class TestAsyncLlamaCppModel:
+    def test_api_type(self, async_model: AsyncLlamaCppModel):
+        assert isinstance(async_model, AsyncChatModel)
+
+    def test_stream_chat_completion(
+        self, async_model: AsyncLlamaCppModel, messages: List[ChatModelResponse]
+    ):
+        async def stream():
+            return [
+                delta async for delta in async_model.stream_chat_completion(messages)
+            ]
+
+        deltas = asyncio.run(stream())
+        expected = list(async_model.model.stream_chat_completion(messages))
+
+        assert [delta["type"] for delta in deltas] == [
+            delta["type"] for delta in expected
+        ]
+        assert deltas[-1]["message"] == expected[-1]["message"]
+
+    def test_concurrent_chat_completions(
+        self, async_model: AsyncLlamaCppModel, messages: List[ChatModelResponse]
+    ):
+        async def complete():
+            return await asyncio.gather(
+                *[async_model.get_chat_completion(messages[: i + 1]) for i in range(3)]
+            )
+
+        results = asyncio.run(complete())
+        assert [result["content"] for result in results] == [
+            message["content"] for message in messages[:3]
+        ]
+
+    def test_get_embedding(self, async_model: AsyncLlamaCppModel):
+        embedding = asyncio.run(async_model.get_embedding(["a", "bc"]))
+        assert embedding == [[1.0], [2.0]]
+
+    def test_empty_messages(self, async_model: AsyncLlamaCppModel):
+        with pytest.raises(ValueError):
+            asyncio.run(async_model.get_chat_completion([]))
@@ -0,0 +1,106 @@
+"""
+tests/unit/model/test_base.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.model.base import ChatModel, ChatModelResponse
+from pygptprompt.storage.completion_cache import CompletionCache
+
+
+def chunk(delta: dict, finish_reason: str = None) -> dict:
+    return {"choices": [{"delta": delta, "finish_reason": finish_reason}]}
+
+
+class TestStreamChatCompletion:
+    def test_content_events(
+        self, mock_chat_model: ChatModel, messages: List[ChatModelResponse]
+    ):
+        deltas = list(mock_chat_model.stream_chat_completion(messages))
+        content = [delta["content"] for delta in deltas if delta["type"] == "content"]
+
+        assert len(content) > 1
+        assert [delta["type"] for delta in deltas[:-1]] == ["content"] * len(content)
+        assert deltas[-1]["type"] == "finish"
+        assert deltas[-1]["finish_reason"] == "stop"
+        assert deltas[-1]["message"] == ChatModelResponse(
+            role="assistant", content=messages[-1]["content"]
+        )
+        assert deltas[-1]["timing"]["chunks"] == len(content) + 1
+        assert deltas[-1]["timing"]["first_token"] is not None
+
+    def test_function_call_events(self, mock_chat_model: ChatModel):
+        chunks = [
+            chunk({"function_call": {"name": "get_weather", "arguments": ""}}),
+            chunk({"function_call": {"arguments": '{"location": '}}),
+            chunk({"function_call": {"arguments": '"Paris"}'}}),
+            chunk({}, "function_call"),
+        ]
+        deltas = list(mock_chat_model._stream_chat_completion(iter(chunks)))
+
+        assert [delta["type"] for delta in deltas] == ["function_call"] * 3 + ["finish"]
+        assert deltas[0]["function_name"] == "get_weather"
+        assert deltas[-1]["message"]["function_call"] == {
+            "name": "get_weather",
+            "arguments": '{"location": "Paris"}',
+        }
+        assert deltas[-1]["timing"]["first_token"] is None
+
+    def test_length_finish_reason(self, mock_chat_model: ChatModel):
+        chunks = [chunk({"content": "truncated"}), chunk({}, "length")]
+        message = list(mock_chat_model._stream_chat_completion(iter(chunks)))[-1]
+        assert message["finish_reason"] == "length"
+        assert message["message"] == ChatModelResponse(
+            role="assistant", content="truncated"
+        )
+
+    def test_get_chat_completion(
+        self, mock_chat_model: ChatModel, messages: List[ChatModelResponse]
+    ):
+        message = mock_chat_model.get_chat_completion(messages)
+        assert message == ChatModelResponse(
+            role="assistant", content=messages[-1]["content"]
+        )
+
+
+class TestCachedChatCompletion:
+    @pytest.fixture
+    def cached_model(self, tmp_path, mock_chat_model: ChatModel) -> ChatModel:
+        mock_chat_model.completion_cache = CompletionCache(
+            str(tmp_path / "completions.sqlite3"), max_size=2**20
+        )
+        return mock_chat_model
+
+    def test_replays_deterministic_completions(
+        self, cached_model: ChatModel, messages: List[ChatModelResponse]
+    ):
+        params = {"messages": messages, "temperature": 0}
+
+        generated = list(
+            cached_model._cached_chat_completion(
+                params, lambda: cached_model.stream_chat_completion(messages)
+            )
+        )
+        replayed = list(
+            cached_model._cached_chat_completion(params, lambda: pytest.fail())
+        )
+
+        assert [delta["type"] for delta in replayed] == ["content", "finish"]
+        assert replayed[0]["content"] == messages[-1]["content"]
+        assert replayed[-1]["message"] == generated[-1]["message"]
+        assert replayed[-1]["finish_reason"] == "stop"
+        assert cached_model.completion_cache.hits == 1
+
+    def test_skips_sampled_completions(
+        self, cached_model: ChatModel, messages: List[ChatModelResponse]
+    ):
+        params = {"messages": messages, "temperature": 0.8}
+        for _ in range(2):
+            list(
+                cached_model._cached_chat_completion(
+                    params, lambda: cached_model.stream_chat_completion(messages)
+                )
+            )
+
+        assert len(cached_model.completion_cache) == 0
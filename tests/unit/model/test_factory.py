@@ -28,3 +28,8 @@ class TestChatModelFactory:
     def test_missing_provider_key(self, chat_model_factory: ChatModelFactory):
         with pytest.raises(ValueError):
             model = chat_model_factory.create_model("")
+
+    def test_embedding_model_defaults_to_none(
+        self, chat_model_factory: ChatModelFactory
+    ):
+        assert chat_model_factory.create_embedding_model() is None
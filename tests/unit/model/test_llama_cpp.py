@@ -1,6 +1,7 @@
 """
 tests/unit/model/test_llama_cpp.py
 """
+import numpy as np
 import pytest
 
 from pygptprompt.model.base import (
@@ -51,6 +52,51 @@ class TestLlamaCppAPI:
             for value in sub_embedding:
                 assert isinstance(value, float)
 
+    @pytest.mark.slow
+    def test_get_embedding_array(
+        self,
+        llama_cpp_model: LlamaCppModel,
+        embedding_input: str,
+    ):
+        texts = [embedding_input, "Hello, world!", embedding_input + " Goodbye."]
+        expected = llama_cpp_model.model.create_embedding(texts)["data"]
+
+        embeddings = llama_cpp_model.get_embedding_array(texts)
+
+        assert embeddings.dtype == np.float32
+        assert embeddings.flags["C_CONTIGUOUS"]
+        assert embeddings.shape == (3, llama_cpp_model.model.n_embd())
+        for row, result in zip(embeddings, expected):
+            assert np.allclose(row, result["embedding"], atol=1e-4)
+
+    @pytest.mark.slow
+    def test_get_embedding_array_pools_long_input(
+        self,
+        llama_cpp_model: LlamaCppModel,
+    ):
+        n_ctx = llama_cpp_model.model.n_ctx()
+        text = "word " * (2 * n_ctx)
+        tokens = llama_cpp_model.get_encoding(text)
+        assert len(tokens) > n_ctx
+
+        # NOTE: Pool the chunks by hand, each beginning with BOS.
+        expected = np.zeros(llama_cpp_model.model.n_embd(), dtype=np.float32)
+        chunk = np.empty_like(expected)
+        n_pooled = 0
+        for start in range(1, len(tokens), n_ctx - 1):
+            chunk_tokens = tokens[:1] + tokens[start : start + n_ctx - 1]
+            llama_cpp_model._embed_tokens(chunk_tokens, chunk)
+            expected += chunk * len(chunk_tokens)
+            n_pooled += len(chunk_tokens)
+        expected /= n_pooled
+        expected /= np.linalg.norm(expected)
+
+        embeddings = llama_cpp_model.get_embedding_array(text, normalize=True)
+
+        assert embeddings.shape == (1, llama_cpp_model.model.n_embd())
+        assert np.isclose(np.linalg.norm(embeddings[0]), 1.0)
+        assert np.allclose(embeddings[0], expected, atol=1e-4)
+
     @pytest.mark.slow
     def test_get_encoding(
         self,
@@ -65,6 +111,21 @@ class TestLlamaCppAPI:
         for value in encoding:
             assert isinstance(value, int)
 
+    @pytest.mark.slow
+    def test_get_encodings(
+        self,
+        llama_cpp_model: LlamaCppModel,
+        encoding_input: str,
+    ):
+        texts = [encoding_input, encoding_input * 64]
+        encodings = llama_cpp_model.get_encodings(texts=texts)
+
+        assert len(encodings) == len(texts)
+        assert encodings[0] == llama_cpp_model.get_encoding(text=encoding_input)
+        assert llama_cpp_model.count_tokens(texts=texts) == [
+            len(encoding) for encoding in encodings
+        ]
+
     @pytest.mark.slow
     def test_get_chat_completion_with_empty_messages(
         self,
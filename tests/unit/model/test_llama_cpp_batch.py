@@ -0,0 +1,93 @@
+"""
+tests/unit/model/test_llama_cpp_batch.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.llama_cpp import LlamaCppModel
+from pygptprompt.model.llama_cpp_batch import LlamaCppBatchScheduler, _BatchedLlama
+from pygptprompt.storage.completion_cache import CompletionCache
+
+
+class TestLlamaCppBatchScheduler:
+    @pytest.fixture
+    def scheduler(self, llama_cpp_model: LlamaCppModel):
+        scheduler = LlamaCppBatchScheduler(llama_cpp_model, n_parallel=2)
+        yield scheduler
+        scheduler.close()
+
+    @pytest.mark.slow
+    def test_concurrent_completions(
+        self,
+        scheduler: LlamaCppBatchScheduler,
+        messages: list[ChatModelResponse],
+    ):
+        # NOTE: More requests than slots, so some are admitted between steps.
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            deltas = list(
+                executor.map(
+                    lambda _: list(scheduler.stream_chat_completion(messages)),
+                    range(4),
+                )
+            )
+
+        for request_deltas in deltas:
+            finish = request_deltas[-1]
+            assert finish["type"] == "finish"
+            assert finish["finish_reason"] in ("stop", "length")
+            assert finish["message"]["role"] == "assistant"
+            assert finish["message"]["content"] == "".join(
+                delta["content"]
+                for delta in request_deltas
+                if delta["type"] == "content"
+            )
+
+    @pytest.mark.slow
+    def test_cancelled_request_frees_slot(
+        self,
+        scheduler: LlamaCppBatchScheduler,
+        messages: list[ChatModelResponse],
+    ):
+        deltas = scheduler.stream_chat_completion(messages)
+        next(deltas)
+        deltas.close()
+
+        message = scheduler.get_chat_completion(messages)
+        assert message["role"] == "assistant"
+
+    def test_grammar_is_not_batched(self, scheduler: LlamaCppBatchScheduler):
+        with pytest.raises(ValueError):
+            _BatchedLlama(scheduler).create_completion("Hello", grammar=object())
+
+    @pytest.mark.slow
+    def test_replays_cached_completion(
+        self,
+        scheduler: LlamaCppBatchScheduler,
+        messages: list[ChatModelResponse],
+        tmp_path,
+        monkeypatch,
+    ):
+        chat_model = scheduler.chat_model
+        params = chat_model._chat_completion_params
+        monkeypatch.setattr(
+            chat_model,
+            "_chat_completion_params",
+            lambda messages, options=None: {
+                **params(messages, options),
+                "temperature": 0,
+            },
+        )
+        monkeypatch.setattr(
+            chat_model,
+            "completion_cache",
+            CompletionCache(str(tmp_path / "completions.sqlite"), 2**20),
+        )
+
+        generated = list(scheduler.stream_chat_completion(messages))[-1]
+        replayed = list(scheduler.stream_chat_completion(messages))[-1]
+
+        assert generated["timing"]["chunks"] > 0
+        assert replayed["timing"]["chunks"] == 0
+        assert replayed["message"] == generated["message"]
@@ -0,0 +1,132 @@
+"""
+tests/unit/model/test_llama_cpp_pool.py
+"""
+import multiprocessing
+import os
+import signal
+import time
+from queue import Queue
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.llama_cpp_pool import LlamaCppWorkerPool, _worker_config
+
+
+@pytest.fixture
+def worker_pool(config: ConfigurationManager):
+    pool = LlamaCppWorkerPool(config, n_workers=2)
+    yield pool
+    pool.close()
+
+
+def read_worker_config(file_path: str, data: dict, results) -> None:
+    """Report the model path a worker process would load."""
+    config = _worker_config(file_path, data, n_threads=1)
+    results.put(config.get_value("llama_cpp.model.local"))
+
+
+def wait_until_ready(pool: LlamaCppWorkerPool, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not all(worker.ready.is_set() for worker in pool.workers):
+        assert time.monotonic() < deadline, "Workers did not load the model"
+        time.sleep(0.1)
+
+
+class TestLlamaCppWorkerPool:
+    def test_worker_uses_parent_config(self, monkeypatch, config: ConfigurationManager):
+        monkeypatch.setitem(
+            config._map_template.data["llama_cpp"]["model"], "local", "parent.gguf"
+        )
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(
+            target=read_worker_config,
+            args=(config.file_path, config.get_data(), results),
+        )
+        process.start()
+        try:
+            assert results.get(timeout=60) == "parent.gguf"
+        finally:
+            process.join()
+
+    @pytest.mark.slow
+    def test_session_affinity(self, worker_pool: LlamaCppWorkerPool):
+        for session_name in ("alpha", "beta", "gamma"):
+            worker = worker_pool.route(session_name)
+            assert worker_pool.route(session_name) is worker
+
+    @pytest.mark.slow
+    def test_threads_are_split_between_workers(self, worker_pool: LlamaCppWorkerPool):
+        assert worker_pool.n_threads * worker_pool.n_workers <= max(
+            os.cpu_count(), worker_pool.n_workers
+        )
+
+    @pytest.mark.slow
+    def test_chat_completion(
+        self,
+        llama_cpp_model_path: str,
+        worker_pool: LlamaCppWorkerPool,
+        messages: list[ChatModelResponse],
+    ):
+        responses: Queue = Queue()
+        worker_pool.submit(
+            "chat",
+            (messages, None),
+            lambda *response: responses.put(response),
+            "alpha",
+        )
+
+        kinds = []
+        while not kinds or kinds[-1] not in ("end", "error"):
+            kind, payload = responses.get(timeout=120)
+            kinds.append(kind)
+            if kind == "delta" and payload["type"] == "finish":
+                assert payload["message"]["role"] == "assistant"
+
+        assert kinds[-1] == "end"
+        assert "delta" in kinds
+
+    @pytest.mark.slow
+    def test_respawn(self, llama_cpp_model_path: str, worker_pool: LlamaCppWorkerPool):
+        worker_pool.health_interval = 0.1
+        wait_until_ready(worker_pool)
+        pid = worker_pool.workers[0].process.pid
+
+        os.kill(pid, signal.SIGKILL)
+
+        deadline = time.monotonic() + 30
+        while worker_pool.respawns == 0:
+            assert time.monotonic() < deadline, "Worker was not respawned"
+            time.sleep(0.1)
+        assert worker_pool.workers[0].process.pid != pid
+
+    @pytest.mark.slow
+    def test_gives_up_on_workers_that_cannot_load(
+        self, monkeypatch, config: ConfigurationManager
+    ):
+        monkeypatch.setitem(
+            config._map_template.data["llama_cpp"],
+            "workers",
+            {"health_interval": 0.1, "respawn_backoff": 0.1, "max_respawns": 1},
+        )
+        monkeypatch.setitem(
+            config._map_template.data["llama_cpp"],
+            "model",
+            {"local": "", "repo_id": "missing/model", "filename": "missing.gguf"},
+        )
+        pool = LlamaCppWorkerPool(config, n_workers=1)
+        try:
+            deadline = time.monotonic() + 120
+            while "could not load" not in (pool.workers[0].error or ""):
+                assert time.monotonic() < deadline, "Worker was respawned forever"
+                time.sleep(0.1)
+            assert pool.respawns == 1
+
+            responses: Queue = Queue()
+            pool.submit("embed", "text", lambda *response: responses.put(response))
+            kind, error = responses.get(timeout=1)
+            assert kind == "error" and "could not load" in error
+        finally:
+            pool.close()
@@ -103,6 +103,19 @@ class TestOpenAI:
         for value in encoding:
             assert isinstance(value, int)
 
+    @pytest.mark.private
+    def test_get_encodings(
+        self,
+        openai_model: OpenAIModel,
+        encoding_input: str,
+    ):
+        texts = [encoding_input, "Another test sentence."]
+        encodings = openai_model.get_encodings(texts=texts)
+
+        assert len(encodings) == len(texts)
+        assert encodings[0] == openai_model.get_encoding(text=encoding_input)
+        assert openai_model.encoding is openai_model.encoding  # cached
+
     @pytest.mark.private
     def test_get_chat_completion_with_empty_messages(
         self,
@@ -0,0 +1,197 @@
+"""
+tests/unit/model/test_openai_client.py
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import openai
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.openai_client import OpenAIClient, TokenBucket
+
+
+class StubOpenAIServer:
+    """A stub of the OpenAI API that fails the first requests to each route."""
+
+    def __init__(self, failures: int = 0, status: int = 429):
+        self.failures = failures
+        self.status = status
+        self.batches: List[List[str]] = []
+        self.attempts: Dict[str, int] = {}
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+    def _fail(self, route: str) -> bool:
+        self.attempts[route] = self.attempts.get(route, 0) + 1
+        return self.attempts[route] <= self.failures
+
+    def _error(self) -> web.Response:
+        return web.json_response(
+            {"error": {"message": "Stub error", "type": "stub"}},
+            status=self.status,
+            headers={"Retry-After": "0"},
+        )
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        if self._fail("embeddings"):
+            return self._error()
+        texts = (await request.json())["input"]
+        self.batches.append(texts)
+        # NOTE: The data is reversed to check the client restores the input order.
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(len(text))]}
+            for i, text in enumerate(texts)
+        ]
+        return web.json_response(
+            {
+                "object": "list",
+                "data": data[::-1],
+                "model": "stub",
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        if self._fail("chat_completions"):
+            return self._error()
+        return web.json_response(
+            {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "stub",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "hello"},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+        )
+
+
+def count_words(texts: List[str]) -> List[int]:
+    return [len(text.split()) for text in texts]
+
+
+def with_stub(stub: StubOpenAIServer, config: ConfigurationManager, test) -> Any:
+    async def run():
+        async with TestServer(stub.create_app()) as server:
+            config._map_template.data["openai"]["client"]["base_url"] = str(
+                server.make_url("/v1")
+            )
+            client = OpenAIClient(config, "sk-stub", count_words)
+            try:
+                return await test(client)
+            finally:
+                await client.aclose()
+                client.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def client_config(monkeypatch, config: ConfigurationManager) -> ConfigurationManager:
+    monkeypatch.setitem(
+        config._map_template.data["openai"],
+        "client",
+        {"max_concurrency": 2, "max_retries": 3, "backoff_base": 0.01},
+    )
+    monkeypatch.setitem(
+        config._map_template.data["openai"],
+        "embedding",
+        {"model": "stub", "batch_size": 2, "batch_tokens": 5},
+    )
+    return config
+
+
+class TestTokenBucket:
+    def test_reserve_within_capacity(self):
+        bucket = TokenBucket(60)
+        assert bucket.reserve(60) == 0.0
+
+    def test_reserve_waits_for_deficit(self):
+        bucket = TokenBucket(60)
+        bucket.reserve(60)
+        assert bucket.reserve(2) == pytest.approx(2.0, abs=0.1)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(0)
+        assert bucket.reserve(10**9) == 0.0
+
+
+class TestOpenAIClient:
+    def test_batch_inputs(self, client_config: ConfigurationManager):
+        client = OpenAIClient(client_config, "sk-stub", count_words)
+        texts = ["a b c", "d", "e", "f g h i j k", "l"]
+
+        batches = client.batch_inputs(texts)
+
+        assert [batch for batch, _ in batches] == [
+            ["a b c", "d"],
+            ["e"],
+            ["f g h i j k"],
+            ["l"],
+        ]
+        assert [n_tokens for _, n_tokens in batches] == [4, 1, 6, 1]
+
+    def test_embeddings_retry_rate_limits(self, client_config: ConfigurationManager):
+        stub = StubOpenAIServer(failures=2)
+        texts = ["one", "two words", "three", "four five six"]
+
+        async def test(client: OpenAIClient):
+            return await client.acreate_embedding(texts), client.retries
+
+        embeddings, retries = with_stub(stub, client_config, test)
+
+        assert embeddings == [[float(len(text))] for text in texts]
+        assert retries == 2
+        assert sorted(map(len, stub.batches)) == [2, 2]
+
+    def test_sync_embeddings(self, client_config: ConfigurationManager):
+        stub = StubOpenAIServer(failures=1, status=503)
+        texts = ["one", "two", "three"]
+
+        async def test(client: OpenAIClient):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, client.create_embedding, texts)
+
+        embeddings = with_stub(stub, client_config, test)
+
+        assert embeddings == [[float(len(text))] for text in texts]
+
+    def test_client_errors_are_not_retried(self, client_config: ConfigurationManager):
+        stub = StubOpenAIServer(failures=1, status=400)
+
+        async def test(client: OpenAIClient):
+            with pytest.raises(openai.BadRequestError):
+                await client.acreate_embedding(["one"])
+            return client.retries
+
+        assert with_stub(stub, client_config, test) == 0
+
+    def test_chat_completion_retries_server_errors(
+        self, client_config: ConfigurationManager
+    ):
+        stub = StubOpenAIServer(failures=2, status=500)
+        params = {
+            "model": "stub",
+            "messages": [{"role": "user", "content": "hello there"}],
+            "max_tokens": 8,
+        }
+
+        async def test(client: OpenAIClient):
+            return await client.acreate_chat_completion(params)
+
+        completion = with_stub(stub, client_config, test)
+
+        assert completion.choices[0].message.content == "hello"
+        assert stub.attempts["chat_completions"] == 3
@@ -0,0 +1,117 @@
+"""
+tests/unit/model/test_registry.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pygptprompt.model.registry import ModelRegistry
+from tests.conftest import MockChatModel
+
+
+class SizedMockChatModel(MockChatModel):
+    """A MockChatModel reporting a fixed resident size."""
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+        self.closed = False
+
+    @property
+    def resident_size(self) -> int:
+        return self.size
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def registry() -> ModelRegistry:
+    registry = ModelRegistry()
+    registry.clear()
+    yield registry
+    registry.max_memory = 0
+    registry.clear()
+
+
+class TestModelRegistry:
+    def test_singleton(self, registry: ModelRegistry):
+        assert ModelRegistry() is registry
+
+    def test_make_key(self):
+        key = ModelRegistry.make_key("llama_cpp", {"local": "model.gguf", "n_ctx": 512})
+        assert key[0] == "llama_cpp"
+        assert key == ModelRegistry.make_key(
+            "llama_cpp", {"n_ctx": 512, "local": "model.gguf"}
+        )
+        assert key != ModelRegistry.make_key(
+            "llama_cpp", {"local": "model.gguf", "n_ctx": 1024}
+        )
+
+    def test_acquire_shares_model(self, registry: ModelRegistry):
+        key = registry.make_key("llama_cpp", {"local": "model.gguf"})
+        first = registry.acquire(key, lambda: SizedMockChatModel(1))
+        second = registry.acquire(key, lambda: SizedMockChatModel(1))
+
+        assert first is second
+        assert registry.stats()["loads"] == 1
+        assert registry.stats()["hits"] == 1
+        assert registry.stats()["models"][0]["references"] == 2
+
+    def test_concurrent_acquire_loads_once(self, registry: ModelRegistry):
+        key = registry.make_key("llama_cpp", {"local": "model.gguf"})
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            models = list(
+                executor.map(
+                    lambda _: registry.acquire(key, lambda: SizedMockChatModel(1)),
+                    range(8),
+                )
+            )
+
+        assert all(model is models[0] for model in models)
+        assert registry.stats()["loads"] == 1
+
+    def test_evicts_idle_models_first(self, registry: ModelRegistry):
+        registry.max_memory = 25
+        keys = [
+            registry.make_key("llama_cpp", {"local": f"{i}.gguf"}) for i in range(3)
+        ]
+
+        first = registry.acquire(keys[0], lambda: SizedMockChatModel(10))
+        second = registry.acquire(keys[1], lambda: SizedMockChatModel(10))
+        registry.release(second)
+        registry.release(first)
+        # NOTE: The second model was released first, so it is least recently used.
+        registry.acquire(keys[2], lambda: SizedMockChatModel(10))
+
+        assert len(registry) == 2
+        assert registry.resident_size == 20
+        assert registry.stats()["evictions"] == 1
+        assert registry.acquire(keys[0], lambda: SizedMockChatModel(10)) is first
+
+    def test_models_in_use_are_not_evicted(self, registry: ModelRegistry):
+        registry.max_memory = 15
+        keys = [
+            registry.make_key("llama_cpp", {"local": f"{i}.gguf"}) for i in range(2)
+        ]
+
+        first = registry.acquire(keys[0], lambda: SizedMockChatModel(10))
+        registry.acquire(keys[1], lambda: SizedMockChatModel(10))
+
+        assert len(registry) == 2
+        registry.release(first)
+        assert len(registry) == 1
+        assert registry.stats()["evictions"] == 1
+
+    def test_eviction_closes_model(self, registry: ModelRegistry):
+        registry.max_memory = 15
+        keys = [
+            registry.make_key("llama_cpp", {"local": f"{i}.gguf"}) for i in range(2)
+        ]
+
+        first = registry.acquire(keys[0], lambda: SizedMockChatModel(10))
+        registry.release(first)
+        second = registry.acquire(keys[1], lambda: SizedMockChatModel(10))
+
+        assert first.closed
+        assert not second.closed
@@ -0,0 +1,339 @@
+"""
+tests/unit/server/test_app.py
+"""
+import asyncio
+import json
+import logging
+import threading
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModel
+from pygptprompt.model.llama_cpp import AsyncLlamaCppModel
+from pygptprompt.server.app import ChatServer
+from pygptprompt.server.queue import QueueFullError, RequestQueue
+
+
+@pytest.fixture
+def server(
+    tmp_path, monkeypatch, config: ConfigurationManager, mock_chat_model: ChatModel
+) -> ChatServer:
+    evaluate_path = config.evaluate_path
+    monkeypatch.setattr(
+        config,
+        "evaluate_path",
+        lambda key, default=None: str(tmp_path)
+        if key == "app.sessions"
+        else evaluate_path(key, default),
+    )
+    return ChatServer(
+        config, {"llama_cpp": AsyncLlamaCppModel(config, model=mock_chat_model)}
+    )
+
+
+def request(server: ChatServer, method: str, path: str, **kwargs):
+    async def send():
+        async with TestClient(TestServer(server.create_app())) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, await response.text()
+
+    return asyncio.run(send())
+
+
+def chat(server: ChatServer, *bodies):
+    """Send chat completions in order to a single app, since closing it closes the models."""
+
+    async def send():
+        async with TestClient(TestServer(server.create_app())) as client:
+            for body in bodies:
+                response = await client.post("/v1/chat/completions", json=body)
+                assert response.status == 200, await response.text()
+
+    asyncio.run(send())
+
+
+class TestChatServer:
+    def test_chat_completion(self, server: ChatServer):
+        status, text = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hello there"}]},
+        )
+        body = json.loads(text)
+
+        assert status == 200
+        assert body["choices"][0]["message"] == {
+            "role": "assistant",
+            "content": "hello there",
+        }
+        assert body["choices"][0]["finish_reason"] == "stop"
+        assert server.queues["llama_cpp"].metrics()["completed"] == 1
+
+    def test_function_call_completion(self, server: ChatServer, monkeypatch):
+        model = server.models["llama_cpp"].model
+        chunks = [
+            {
+                "choices": [
+                    {
+                        "delta": {
+                            "function_call": {
+                                "name": "get_weather",
+                                "arguments": '{"location": "Paris"}',
+                            }
+                        },
+                        "finish_reason": None,
+                    }
+                ]
+            },
+            {"choices": [{"delta": {}, "finish_reason": "function_call"}]},
+        ]
+        monkeypatch.setattr(
+            model,
+            "stream_chat_completion",
+            lambda messages, options=None: model._stream_chat_completion(iter(chunks)),
+        )
+        status, text = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "weather?"}]},
+        )
+        choice = json.loads(text)["choices"][0]
+
+        assert status == 200
+        assert choice["finish_reason"] == "function_call"
+        assert choice["message"] == {
+            "role": "assistant",
+            "content": None,
+            "function_call": {
+                "name": "get_weather",
+                "arguments": '{"location": "Paris"}',
+            },
+        }
+
+    def test_streaming_chat_completion(self, server: ChatServer):
+        status, text = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={
+                "messages": [{"role": "user", "content": "hello there"}],
+                "stream": True,
+            },
+        )
+        events = [line[6:] for line in text.split("\n\n") if line]
+
+        assert status == 200
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        content = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+        assert content == "hello there"
+        assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+    def test_streaming_failure_sends_error_event(self, server: ChatServer, monkeypatch):
+        def fail(messages, options=None):
+            raise RuntimeError("out of memory")
+
+        model = server.models["llama_cpp"].model
+        monkeypatch.setattr(model, "stream_chat_completion", fail)
+        monkeypatch.setattr(model, "logger", logging.getLogger(__name__), raising=False)
+        status, text = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hi"}], "stream": True},
+        )
+        events = [line[6:] for line in text.split("\n\n") if line]
+
+        assert status == 200
+        assert events[-1] == "[DONE]"
+        assert json.loads(events[-2]) == {
+            "error": {"message": "out of memory", "type": "server_error"}
+        }
+
+    def test_maps_sampling_options(self, server: ChatServer, monkeypatch):
+        model = server.models["llama_cpp"].model
+        stream_chat_completion = model.stream_chat_completion
+        received = []
+
+        def record(messages, options=None):
+            received.append(options)
+            return stream_chat_completion(messages, options)
+
+        monkeypatch.setattr(model, "stream_chat_completion", record)
+        status, _ = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={
+                "messages": [{"role": "user", "content": "hi"}],
+                "temperature": 0,
+                "max_tokens": 16,
+                "stop": "\n",
+            },
+        )
+
+        assert status == 200
+        assert received == [{"temperature": 0, "max_tokens": 16, "stop": ["\n"]}]
+
+    def test_rejects_invalid_sampling_options(self, server: ChatServer):
+        for options in ({"temperature": "hot"}, {"max_tokens": 0}, {"stop": [1]}):
+            status, text = request(
+                server,
+                "POST",
+                "/v1/chat/completions",
+                json={"messages": [{"role": "user", "content": "hi"}], **options},
+            )
+            assert status == 400
+            assert json.loads(text)["error"]["type"] == "invalid_request_error"
+
+    def test_session_uses_request_system_message(self, server: ChatServer):
+        system = {"role": "system", "content": "You are terse."}
+        chat(
+            server,
+            {
+                "messages": [system, {"role": "user", "content": "hi"}],
+                "session": "test",
+            },
+        )
+        session = server.sessions[("llama_cpp", "test")]
+        assert session.output()[0] == system
+        assert session.transcript[0] == system
+
+    def test_session_chat_completion(self, server: ChatServer):
+        request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hi"}], "session": "test"},
+        )
+        session = server.sessions[("llama_cpp", "test")]
+        assert [message["role"] for message in session.output()] == [
+            "system",
+            "user",
+            "assistant",
+        ]
+
+    def test_session_work_runs_off_event_loop(self, server: ChatServer, monkeypatch):
+        threads = []
+        for name in ("_load_session", "_enqueue_messages", "_append_completion"):
+            method = getattr(server, name)
+
+            def record(*args, method=method):
+                threads.append(threading.get_ident())
+                return method(*args)
+
+            monkeypatch.setattr(server, name, record)
+
+        loop_thread = threading.get_ident()
+        request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hi"}], "session": "test"},
+        )
+        assert len(threads) == 3
+        assert loop_thread not in threads
+
+    def test_session_skips_repeated_conversation(self, server: ChatServer):
+        first = [{"role": "user", "content": "hi"}]
+        second = first + [
+            {"role": "assistant", "content": "hi"},
+            {"role": "user", "content": "bye"},
+        ]
+        chat(
+            server,
+            {"messages": first, "session": "test"},
+            {"messages": second, "session": "test"},
+        )
+        session = server.sessions[("llama_cpp", "test")]
+        assert [message["content"] for message in session.output()[1:]] == [
+            "hi",
+            "hi",
+            "bye",
+            "bye",
+        ]
+
+    def test_evicts_least_recently_used_sessions(self, server: ChatServer):
+        server.max_sessions = 1
+        chat(
+            server,
+            *(
+                {"messages": [{"role": "user", "content": "hi"}], "session": name}
+                for name in ("first", "second")
+            ),
+        )
+        assert list(server.sessions) == [("llama_cpp", "second")]
+        assert list(server._session_locks) == [("llama_cpp", "second")]
+
+    def test_failed_completion_is_server_error(self, server: ChatServer, monkeypatch):
+        def fail(messages, options=None):
+            raise RuntimeError("out of memory")
+
+        model = server.models["llama_cpp"].model
+        monkeypatch.setattr(model, "stream_chat_completion", fail)
+        monkeypatch.setattr(model, "logger", logging.getLogger(__name__), raising=False)
+        status, text = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hi"}]},
+        )
+        assert status == 500
+        assert json.loads(text)["error"] == {
+            "message": "out of memory",
+            "type": "server_error",
+        }
+
+    def test_rejects_body_which_is_not_an_object(self, server: ChatServer):
+        for path in ("/v1/chat/completions", "/v1/embeddings"):
+            status, _ = request(server, "POST", path, json=["hi"])
+            assert status == 400
+
+    def test_invalid_session_id(self, server: ChatServer):
+        status, _ = request(
+            server,
+            "POST",
+            "/v1/chat/completions",
+            json={"messages": [{"role": "user", "content": "hi"}], "session": "../x"},
+        )
+        assert status == 400
+
+    def test_embeddings(self, server: ChatServer):
+        status, text = request(
+            server, "POST", "/v1/embeddings", json={"input": ["a", "bc"]}
+        )
+        data = json.loads(text)["data"]
+        assert status == 200
+        assert [item["embedding"] for item in data] == [[1.0], [2.0]]
+
+
+class TestRequestQueue:
+    def test_rejects_when_full(self):
+        async def run():
+            queue = RequestQueue(max_size=1, concurrency=1)
+            release = asyncio.Event()
+
+            async def hold():
+                async with queue.slot():
+                    await release.wait()
+
+            tasks = [asyncio.create_task(hold()) for _ in range(2)]
+            await asyncio.sleep(0)
+            assert queue.metrics()["active"] == 1
+            assert queue.metrics()["waiting"] == 1
+
+            with pytest.raises(QueueFullError):
+                async with queue.slot():
+                    pass
+
+            release.set()
+            await asyncio.gather(*tasks)
+            return queue.metrics()
+
+        metrics = asyncio.run(run())
+        assert metrics["completed"] == 2
+        assert metrics["rejected"] == 1
@@ -0,0 +1,68 @@
+"""
+tests/unit/storage/test_completion_cache.py
+"""
+import time
+
+import pytest
+
+from pygptprompt.storage.completion_cache import CompletionCache
+
+
+def completion(content: str) -> dict:
+    return {
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": content},
+    }
+
+
+@pytest.fixture
+def completion_cache(tmp_path) -> CompletionCache:
+    return CompletionCache(str(tmp_path / "completions.sqlite3"), max_size=250)
+
+
+class TestCompletionCache:
+    def test_make_key(self):
+        key = CompletionCache.make_key("llama_cpp", {"temperature": 0, "top_k": 40})
+        assert key == CompletionCache.make_key(
+            "llama_cpp", {"top_k": 40, "temperature": 0}
+        )
+        assert key != CompletionCache.make_key(
+            "llama_cpp", {"temperature": 0, "top_k": 1}
+        )
+
+    def test_get(self, completion_cache: CompletionCache):
+        assert completion_cache.get("missing") is None
+        completion_cache.put("hello", completion("Hello!"))
+
+        assert completion_cache.get("hello") == completion("Hello!")
+        assert completion_cache.hits == 1
+        assert completion_cache.misses == 1
+
+    def test_ttl(self, tmp_path, monkeypatch):
+        completion_cache = CompletionCache(
+            str(tmp_path / "completions.sqlite3"), max_size=250, ttl=60
+        )
+        completion_cache.put("hello", completion("Hello!"))
+
+        now = time.time()
+        monkeypatch.setattr(
+            "pygptprompt.storage.completion_cache.time", lambda: now + 61
+        )
+
+        assert completion_cache.get("hello") is None
+        assert len(completion_cache) == 0
+
+    def test_put_evicts_least_recently_used(self, completion_cache: CompletionCache):
+        completion_cache.put("old", completion("a" * 30))
+        completion_cache.put("used", completion("b" * 30))
+        completion_cache.get("used")
+        completion_cache.put("new", completion("c" * 30))
+
+        assert completion_cache.get("old") is None
+        assert completion_cache.get("used") is not None
+        assert completion_cache.get("new") is not None
+        assert completion_cache.size <= completion_cache.max_size
+
+    def test_put_skips_oversized_completions(self, completion_cache: CompletionCache):
+        completion_cache.put("large", completion("a" * 500))
+        assert len(completion_cache) == 0
@@ -0,0 +1,51 @@
+"""
+tests/unit/storage/test_prompt_cache.py
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from pygptprompt.storage.prompt_cache import PromptStateCache
+
+
+def write_state(cache: PromptStateCache, key: str, size: int, mtime: int) -> None:
+    state_path = Path(cache.path(key))
+    state_path.write_bytes(b"\0" * size)
+    state_path.with_suffix(".json").write_text("{}")
+    os.utime(state_path, (mtime, mtime))
+
+
+@pytest.fixture
+def prompt_cache(tmp_path) -> PromptStateCache:
+    return PromptStateCache(directory=str(tmp_path), max_size=100)
+
+
+class TestPromptStateCache:
+    def test_make_key(self):
+        key = PromptStateCache.make_key("model", 4096, "system", [])
+        assert key == PromptStateCache.make_key("model", 4096, "system", [])
+        assert key != PromptStateCache.make_key("model", 2048, "system", [])
+
+    def test_get(self, prompt_cache: PromptStateCache):
+        assert prompt_cache.get("missing") is None
+        write_state(prompt_cache, "state", 10, mtime=1)
+        assert prompt_cache.get("state") == prompt_cache.path("state")
+        assert os.stat(prompt_cache.path("state")).st_mtime > 1
+
+    def test_add_evicts_least_recently_used(self, prompt_cache: PromptStateCache):
+        write_state(prompt_cache, "old", 60, mtime=1)
+        write_state(prompt_cache, "used", 60, mtime=2)
+        prompt_cache.get("used")
+        write_state(prompt_cache, "new", 30, mtime=3)
+        prompt_cache.add("new")
+
+        assert prompt_cache.get("old") is None
+        assert not Path(prompt_cache.path("old")).with_suffix(".json").exists()
+        assert prompt_cache.get("used") is not None
+        assert prompt_cache.get("new") is not None
+
+    def test_add_keeps_new_state(self, prompt_cache: PromptStateCache):
+        write_state(prompt_cache, "large", 200, mtime=1)
+        prompt_cache.add("large")
+        assert prompt_cache.get("large") is not None
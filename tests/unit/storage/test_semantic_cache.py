@@ -0,0 +1,106 @@
+"""
+tests/unit/storage/test_semantic_cache.py
+"""
+from typing import List, Union
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.factory import ChatModelFactory
+from pygptprompt.storage.semantic_cache import SemanticResponseCache
+from tests.conftest import MockChatModel
+
+
+class LetterChatModel(MockChatModel):
+    """A MockChatModel embedding texts by their letter counts."""
+
+    def get_embedding(self, input: Union[str, List[str]]) -> List[List[float]]:
+        texts = [input] if isinstance(input, str) else input
+        return [
+            [
+                float(text.lower().count(letter))
+                for letter in "abcdefghijklmnopqrstuvwxyz"
+            ]
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def semantic_cache(
+    tmp_path, monkeypatch, config: ConfigurationManager
+) -> SemanticResponseCache:
+    evaluate_path = config.evaluate_path
+    monkeypatch.setattr(
+        config,
+        "evaluate_path",
+        lambda key, default=None: str(tmp_path)
+        if key == "app.database.chroma"
+        else evaluate_path(key, default),
+    )
+    return SemanticResponseCache(config, LetterChatModel())
+
+
+def conversation(question: str, system: str = "You are helpful.") -> list:
+    return [
+        ChatModelResponse(role="system", content=system),
+        ChatModelResponse(role="user", content=question),
+    ]
+
+
+def complete(cache: SemanticResponseCache, messages: list) -> list:
+    return list(cache.stream_chat_completion(messages))
+
+
+class TestSemanticResponseCache:
+    def test_near_duplicate_is_answered_from_cache(
+        self, semantic_cache: SemanticResponseCache
+    ):
+        generated = complete(semantic_cache, conversation("What is the capital city?"))
+        replayed = complete(semantic_cache, conversation("what is the capital city"))
+
+        assert replayed[-1]["message"] == generated[-1]["message"]
+        assert [delta["type"] for delta in replayed] == ["content", "finish"]
+        assert semantic_cache.stats()["hits"] == 1
+        assert semantic_cache.stats()["hit_rate"] == 0.5
+
+    def test_distant_question_is_generated(self, semantic_cache: SemanticResponseCache):
+        complete(semantic_cache, conversation("What is the capital city?"))
+        replayed = complete(semantic_cache, conversation("Zebras jump quickly"))
+
+        assert replayed[-1]["message"]["content"] == "Zebras jump quickly"
+        assert semantic_cache.stats()["misses"] == 2
+        assert semantic_cache.stats()["entries"] == 2
+
+    def test_scope_includes_system_prompt(self, semantic_cache: SemanticResponseCache):
+        complete(semantic_cache, conversation("What is the capital city?"))
+        complete(
+            semantic_cache,
+            conversation("What is the capital city?", system="You are terse."),
+        )
+
+        assert semantic_cache.hits == 0
+
+    def test_close_releases_embedding_model(
+        self, tmp_path, monkeypatch, config: ConfigurationManager
+    ):
+        embedding_model = LetterChatModel()
+        released = []
+        monkeypatch.setattr(
+            ChatModelFactory, "create_embedding_model", lambda self: embedding_model
+        )
+        monkeypatch.setattr(
+            ChatModelFactory,
+            "release_model",
+            lambda self, model: released.append(model),
+        )
+        monkeypatch.setattr(
+            config, "evaluate_path", lambda key, default=None: str(tmp_path)
+        )
+
+        cache = SemanticResponseCache(config, LetterChatModel())
+        assert cache.vector_store.embedding_model is embedding_model
+
+        cache.close()
+        cache.close()
+        assert released == [embedding_model]
@@ -0,0 +1,96 @@
+"""
+tests/unit/storage/test_session.py
+"""
+from typing import List
+
+import pytest
+
+from pygptprompt.config.manager import ConfigurationManager
+from pygptprompt.json.list import JSONListTemplate
+from pygptprompt.model.base import ChatModelResponse
+from pygptprompt.model.sequence.session_manager import SessionManager
+
+
+@pytest.fixture
+def session_factory(
+    tmp_path, monkeypatch, config: ConfigurationManager, mock_chat_model
+):
+    evaluate_path = config.evaluate_path
+    paths = {
+        "app.sessions": str(tmp_path),
+        "app.database.sqlite": str(tmp_path / "static.sqlite3"),
+    }
+    monkeypatch.setattr(
+        config,
+        "evaluate_path",
+        lambda key, default=None: paths.get(key) or evaluate_path(key, default),
+    )
+    monkeypatch.setitem(config._map_template.data["app"], "session", {})
+    config._map_template.data["app"]["session"]["storage"] = "sqlite"
+
+    def create() -> SessionManager:
+        session = SessionManager("test", "llama_cpp", config, mock_chat_model)
+        session.load(
+            ChatModelResponse(role="system", content="You are a helpful assistant.")
+        )
+        return session
+
+    return create
+
+
+class TestSQLiteSessionStore:
+    def test_save_and_load(self, session_factory, messages: List[ChatModelResponse]):
+        session = session_factory()
+        session.enqueue(messages[1])
+        assert session.save()
+
+        for message in messages[2:]:
+            session.enqueue(message)
+        session.dequeue()
+        session.system_message = ChatModelResponse(
+            role="system", content="You are a very helpful assistant."
+        )
+        assert session.save()
+
+        assert session.context_window._log is None
+        assert session.transcript._log is None
+        assert not list(session.context_window.file_path.parent.glob("*.jsonl"))
+
+        store = session.store
+        assert store.Sequence.select().count() == len(session.transcript)
+        assert store.Sequence.select().where(store.Sequence.evicted).count() == 1
+
+        restored = session_factory()
+        assert restored.context_window.sequence == session.context_window.sequence
+        assert restored.transcript.sequence == session.transcript.sequence
+
+    def test_function_call_round_trip(self, session_factory):
+        session = session_factory()
+        function_call = ChatModelResponse(
+            role="assistant",
+            content=None,
+            function_call={"name": "get_weather", "arguments": '{"city": "Paris"}'},
+        )
+        result = ChatModelResponse(role="function", name="get_weather", content="20")
+        session.enqueue(function_call)
+        session.enqueue(result)
+        assert session.save()
+
+        assert session_factory().transcript.sequence[-2:] == [function_call, result]
+
+    def test_migrates_json_session(
+        self, tmp_path, session_factory, messages: List[ChatModelResponse]
+    ):
+        JSONListTemplate(str(tmp_path / "test_context.json")).save_json(
+            [messages[0]] + messages[2:]
+        )
+        JSONListTemplate(str(tmp_path / "test_transcript.json")).save_json(messages)
+
+        session = session_factory()
+        assert session.transcript.sequence == messages
+        assert session.save()
+
+        restored = session_factory()
+        assert restored.context_window.sequence == [messages[0]] + messages[2:]
+        assert restored.transcript.sequence == messages
+        assert restored.store.Sequence.select().count() == len(messages)